@@ -3,6 +3,15 @@ import logging
 import asyncio
 from discord.ext import commands
 from disk0muzik.config import DISCORD_TOKEN
+from disk0muzik.utils.database import open_pool, close_pool, init_db
+from disk0muzik.utils.song_writer import get_song_writer
+from disk0muzik.state.song_catalog import get_catalog
+from disk0muzik.utils.resolution_cache import get_resolution_cache
+from disk0muzik.utils.extraction_service import get_extraction_service
+from disk0muzik.utils.spotify_helper import get_spotify_client
+from disk0muzik.utils.audio_cache import get_audio_cache
+from disk0muzik.utils.ffmpeg_supervisor import get_ffmpeg_supervisor
+from disk0muzik.utils.upstream import upstream_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -29,8 +38,27 @@ async def load_cogs() -> None:
 
 
 async def main() -> None:
-    await load_cogs()
-    await bot.start(DISCORD_TOKEN)
+    await open_pool()
+    song_writer = get_song_writer()
+    catalog = get_catalog()
+    try:
+        await init_db()
+        await catalog.ensure_loaded()
+        catalog.start()
+        song_writer.add_flush_listener(catalog.request_refresh)
+        song_writer.start()
+        await load_cogs()
+        await bot.start(DISCORD_TOKEN)
+    finally:
+        logger.info(f"Upstream stats: {upstream_stats()}")
+        await song_writer.close()
+        await get_resolution_cache().close()
+        await catalog.close()
+        await get_audio_cache().close()
+        await get_ffmpeg_supervisor().close()
+        get_extraction_service().close()
+        await get_spotify_client().close()
+        await close_pool()
 
 
 if __name__ == "__main__":
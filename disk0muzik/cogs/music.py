@@ -1,13 +1,26 @@
+import asyncio
 import logging
 import discord
 from discord.ext import commands
 from disk0muzik.state.guild_music_state import GuildMusicState
-from disk0muzik.utils.song_processing import process_song_query
+from disk0muzik.utils.song_processing import (
+    group_queries,
+    process_song_queries,
+    process_song_query,
+    process_spotify_collection,
+    process_youtube_playlist,
+    split_queries,
+)
+from disk0muzik.utils.spotify_helper import parse_spotify_url
+from disk0muzik.utils.yt_dlp_helper import is_youtube_playlist
 from disk0muzik.utils.voice_channel import join_voice_channel
-from disk0muzik.utils.song_playback import play_song
+from disk0muzik.utils.song_playback import GuildPlayer, apply_enrichment
 from disk0muzik.utils.interaction_handler import on_interaction
-from disk0muzik.utils.embed_helper import create_queued_embed
-from typing import Dict
+from disk0muzik.utils.embed_helper import (
+    create_batch_queued_embed,
+    create_collection_queued_embed,
+)
+from typing import Any, Coroutine, Dict, List, Set
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +39,7 @@ class Music(commands.Cog):
         """
         self.bot = bot
         self.guild_states: Dict[int, GuildMusicState] = {}
+        self.background_tasks: Set[asyncio.Task] = set()
         logger.info("Music cog initialized.")
 
     def get_guild_state(self, guild_id: int) -> GuildMusicState:
@@ -36,9 +50,18 @@ class Music(commands.Cog):
         :return: The GuildMusicState instance for the guild.
         """
         if guild_id not in self.guild_states:
-            self.guild_states[guild_id] = GuildMusicState()
+            guild_state = GuildMusicState()
+            guild_state.player = GuildPlayer(guild_state, guild_id)
+            self.guild_states[guild_id] = guild_state
         return self.guild_states[guild_id]
 
+    async def cog_unload(self) -> None:
+        """
+        Stops every guild's player when the cog is unloaded.
+        """
+        for guild_state in self.guild_states.values():
+            await guild_state.player.close()
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
         """
@@ -56,7 +79,13 @@ class Music(commands.Cog):
                 await message.delete()
             except Exception as e:
                 logger.error(f"Failed to delete message: {e}")
-            await self.handle_song_request(message, query)
+
+            # Collection links keep their own handlers; runs of song queries are resolved together.
+            for group in group_queries(split_queries(query)):
+                if len(group) > 1:
+                    await self.handle_multi_song_request(message, group)
+                else:
+                    await self.handle_song_request(message, group[0])
 
     async def handle_song_request(self, message: discord.Message, query: str) -> None:
         """
@@ -65,6 +94,14 @@ class Music(commands.Cog):
         :param message: The message containing the song request.
         :param query: The query for the song to be played.
         """
+        spotify_link = parse_spotify_url(query)
+        if spotify_link and spotify_link[0] in ("album", "playlist"):
+            await self.handle_collection_request(message, *spotify_link)
+            return
+        if is_youtube_playlist(query):
+            await self.handle_youtube_playlist_request(message, query)
+            return
+
         guild_id = message.guild.id
         guild_state = self.get_guild_state(guild_id)
 
@@ -75,39 +112,183 @@ class Music(commands.Cog):
             ):
                 await join_voice_channel(message, guild_state)
 
-            song = await process_song_query(
+            entry = await process_song_query(
                 query, message.author.display_name, message.author.id
             )
 
-            if not song:
+            if not entry:
                 await message.channel.send(
                     "An error occurred while processing your request."
                 )
                 return
+            if entry.enrichment:
+                self.spawn(apply_enrichment(entry, guild_state))
+            guild_state.player.enqueue(message.channel, [entry], announce=True)
 
-            play_immediately = False
-            async with guild_state.lock:
-                if (
-                    guild_state.current_song
-                    or guild_state.voice_client.is_playing()
-                    or guild_state.is_paused
-                ):
-                    guild_state.queue.append(song)
-                    embed, view = create_queued_embed(song, song["requester"])
-                    song["message"] = await message.channel.send(embed=embed, view=view)
-                    logger.info(f"Queued song: {song['title']}")
-                else:
-                    play_immediately = True
+        except Exception as e:
+            logger.error(f"Error handling song request: {e}")
+            await message.channel.send(
+                "An error occurred while processing your request."
+            )
+
+    async def handle_multi_song_request(self, message: discord.Message, queries: List[str]) -> None:
+        """
+        Resolves several song queries concurrently and queues them in the order they were given.
+
+        :param message: The message containing the song requests.
+        :param queries: The queries for the songs to be played.
+        """
+        guild_state = self.get_guild_state(message.guild.id)
+        requester = message.author.display_name
 
-            if play_immediately:
-                await play_song(message.channel, song, guild_state)
+        try:
+            if (
+                guild_state.voice_client is None
+                or not guild_state.voice_client.is_connected()
+            ):
+                await join_voice_channel(message, guild_state)
+
+            results = await process_song_queries(queries, requester, message.author.id)
+            entries = [entry for entry in results if entry]
+            for entry in entries:
+                if entry.enrichment:
+                    self.spawn(apply_enrichment(entry, guild_state))
+            if not entries:
+                await message.channel.send(
+                    "An error occurred while processing your request."
+                )
+                return
+
+            guild_state.player.enqueue(message.channel, entries)
+            await message.channel.send(
+                embed=create_batch_queued_embed(
+                    [entry.song for entry in entries], len(results) - len(entries), requester
+                )
+            )
+            logger.info(f"Queued {len(entries)} of {len(queries)} requested songs")
 
         except Exception as e:
-            logger.error(f"Error handling song request: {e}")
+            logger.error(f"Error handling multi-song request: {e}")
             await message.channel.send(
                 "An error occurred while processing your request."
             )
 
+    def spawn(self, coro: Coroutine[Any, Any, None]) -> None:
+        """
+        Runs a coroutine in the background, keeping a reference to it until it is done.
+
+        :param coro: The coroutine to run.
+        """
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def handle_youtube_playlist_request(self, message: discord.Message, url: str) -> None:
+        """
+        Queues every video of a YouTube playlist or mix after a single flat extraction.
+
+        :param message: The message containing the request.
+        :param url: The playlist or mix URL.
+        """
+        guild_state = self.get_guild_state(message.guild.id)
+        requester = message.author.display_name
+
+        try:
+            if (
+                guild_state.voice_client is None
+                or not guild_state.voice_client.is_connected()
+            ):
+                await join_voice_channel(message, guild_state)
+
+            entries = await process_youtube_playlist(url, requester, message.author.id)
+            if not entries:
+                await message.channel.send(
+                    "An error occurred while processing your request."
+                )
+                return
+
+            guild_state.player.enqueue(message.channel, entries)
+            await message.channel.send(
+                embed=create_collection_queued_embed("YouTube playlist", len(entries), requester, done=True)
+            )
+            logger.info(f"Queued {len(entries)} videos from YouTube playlist {url}")
+
+        except Exception as e:
+            logger.error(f"Error handling YouTube playlist request: {e}")
+            await message.channel.send(
+                "An error occurred while processing your request."
+            )
+
+    async def handle_collection_request(
+        self, message: discord.Message, kind: str, collection_id: str
+    ) -> None:
+        """
+        Queues every track of a Spotify album or playlist as the tracks resolve.
+
+        The first resolved track starts playing right away if nothing is playing,
+        while the rest of the collection is still being resolved.
+
+        :param message: The message containing the request.
+        :param kind: The kind of collection, album or playlist.
+        :param collection_id: The Spotify ID of the album or playlist.
+        """
+        guild_state = self.get_guild_state(message.guild.id)
+        requester = message.author.display_name
+        source = f"Spotify {kind}"
+
+        try:
+            if (
+                guild_state.voice_client is None
+                or not guild_state.voice_client.is_connected()
+            ):
+                await join_voice_channel(message, guild_state)
+
+            status = await message.channel.send(
+                embed=create_collection_queued_embed(source, 0, requester, done=False)
+            )
+            count = 0
+            async for entry in process_spotify_collection(
+                kind, collection_id, requester, message.author.id
+            ):
+                count += 1
+                guild_state.player.enqueue(message.channel, [entry])
+                if count % 25 == 0:
+                    await status.edit(
+                        embed=create_collection_queued_embed(source, count, requester, done=False)
+                    )
+
+            await status.edit(embed=create_collection_queued_embed(source, count, requester, done=True))
+            logger.info(f"Queued {count} tracks from Spotify {kind} {collection_id}")
+            if count == 0:
+                await message.channel.send(
+                    "An error occurred while processing your request."
+                )
+
+        except Exception as e:
+            logger.error(f"Error handling Spotify {kind} request: {e}")
+            await message.channel.send(
+                "An error occurred while processing your request."
+            )
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(
+        self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState
+    ) -> None:
+        """
+        Stops a guild's playback when the bot leaves or is removed from its voice channel.
+
+        :param member: The member whose voice state changed.
+        :param before: The voice state before the change.
+        :param after: The voice state after the change.
+        """
+        if member.id != self.bot.user.id or before.channel is None or after.channel is not None:
+            return
+        guild_state = self.guild_states.get(member.guild.id)
+        if guild_state is None:
+            return
+        logger.info(f"Disconnected from voice in guild {member.guild.id}, stopping playback.")
+        guild_state.player.stop()
+
     @commands.Cog.listener()
     async def on_interaction(self, interaction: discord.Interaction) -> None:
         """
@@ -11,3 +11,51 @@ POSTGRES_USER: str = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD")
 POSTGRES_HOST: str = os.getenv("POSTGRES_HOST")
 POSTGRES_PORT: str = os.getenv("POSTGRES_PORT")
+POSTGRES_POOL_SIZE: int = int(os.getenv("POSTGRES_POOL_SIZE", "10"))
+SONG_WRITE_BATCH_SIZE: int = int(os.getenv("SONG_WRITE_BATCH_SIZE", "50"))
+SONG_WRITE_FLUSH_INTERVAL: float = float(os.getenv("SONG_WRITE_FLUSH_INTERVAL", "2.0"))
+CATALOG_POLL_INTERVAL: float = float(os.getenv("CATALOG_POLL_INTERVAL", "60"))
+PLAYLIST_HISTORY_SIZE: int = int(os.getenv("PLAYLIST_HISTORY_SIZE", "50"))
+RESOLUTION_CACHE_SIZE: int = int(os.getenv("RESOLUTION_CACHE_SIZE", "10000"))
+RESOLUTION_CACHE_TTL: float = float(os.getenv("RESOLUTION_CACHE_TTL", "604800"))
+STREAM_CACHE_SIZE: int = int(os.getenv("STREAM_CACHE_SIZE", "2000"))
+STREAM_CACHE_MARGIN: float = float(os.getenv("STREAM_CACHE_MARGIN", "900"))
+STREAM_CACHE_DEFAULT_TTL: float = float(os.getenv("STREAM_CACHE_DEFAULT_TTL", "300"))
+EXTRACTION_WORKERS: int = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACTION_TIMEOUT: float = float(os.getenv("EXTRACTION_TIMEOUT", "30"))
+SPOTIFY_API_URL: str = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com/v1")
+SPOTIFY_TOKEN_URL: str = os.getenv("SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
+SPOTIFY_MAX_CONCURRENCY: int = int(os.getenv("SPOTIFY_MAX_CONCURRENCY", "8"))
+SPOTIFY_POOL_SIZE: int = int(os.getenv("SPOTIFY_POOL_SIZE", "16"))
+SPOTIFY_TIMEOUT: float = float(os.getenv("SPOTIFY_TIMEOUT", "10"))
+SPOTIFY_RATE_LIMIT: float = float(os.getenv("SPOTIFY_RATE_LIMIT", "10"))
+SPOTIFY_BURST: int = int(os.getenv("SPOTIFY_BURST", "20"))
+YOUTUBE_RATE_LIMIT: float = float(os.getenv("YOUTUBE_RATE_LIMIT", "2"))
+YOUTUBE_BURST: int = int(os.getenv("YOUTUBE_BURST", "5"))
+UPSTREAM_MAX_RETRIES: int = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE: float = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX: float = float(os.getenv("UPSTREAM_BACKOFF_MAX", "10"))
+UPSTREAM_FAILURE_THRESHOLD: int = int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", "5"))
+UPSTREAM_RESET_TIMEOUT: float = float(os.getenv("UPSTREAM_RESET_TIMEOUT", "30"))
+NEGATIVE_CACHE_SIZE: int = int(os.getenv("NEGATIVE_CACHE_SIZE", "5000"))
+NEGATIVE_CACHE_MISS_TTL: float = float(os.getenv("NEGATIVE_CACHE_MISS_TTL", "600"))
+NEGATIVE_CACHE_ERROR_TTL: float = float(os.getenv("NEGATIVE_CACHE_ERROR_TTL", "30"))
+SONG_MATCH_THRESHOLD: float = float(os.getenv("SONG_MATCH_THRESHOLD", "0.75"))
+SPOTIFY_RESOLVE_CONCURRENCY: int = int(os.getenv("SPOTIFY_RESOLVE_CONCURRENCY", "4"))
+MULTI_QUERY_CONCURRENCY: int = int(os.getenv("MULTI_QUERY_CONCURRENCY", "4"))
+FFMPEG_OPUS_BITRATE: int = int(os.getenv("FFMPEG_OPUS_BITRATE", "128"))
+AUDIO_CACHE_DIR: str = os.getenv("AUDIO_CACHE_DIR", "audio_cache")
+AUDIO_CACHE_MAX_BYTES: int = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(2 * 1024**3)))
+AUDIO_CACHE_MIN_PLAYS: int = int(os.getenv("AUDIO_CACHE_MIN_PLAYS", "2"))
+AUDIO_CACHE_FILL_CONCURRENCY: int = int(os.getenv("AUDIO_CACHE_FILL_CONCURRENCY", "2"))
+AUDIO_CACHE_FILL_TIMEOUT: float = float(os.getenv("AUDIO_CACHE_FILL_TIMEOUT", "300"))
+AUDIO_CACHE_PLAY_HISTORY: int = int(os.getenv("AUDIO_CACHE_PLAY_HISTORY", "10000"))
+GAPLESS_PRELOAD: float = float(os.getenv("GAPLESS_PRELOAD", "10"))
+GAPLESS_PREBUFFER_FRAMES: int = int(os.getenv("GAPLESS_PREBUFFER_FRAMES", "50"))
+GAPLESS_UNKNOWN_PRELOAD_AFTER: float = float(os.getenv("GAPLESS_UNKNOWN_PRELOAD_AFTER", "60"))
+FFMPEG_MAX_PROCESSES: int = int(os.getenv("FFMPEG_MAX_PROCESSES", "64"))
+FFMPEG_MAX_PER_GUILD: int = int(os.getenv("FFMPEG_MAX_PER_GUILD", "3"))
+FFMPEG_SLOT_TIMEOUT: float = float(os.getenv("FFMPEG_SLOT_TIMEOUT", "10"))
+FFMPEG_PROBE_TIMEOUT: float = float(os.getenv("FFMPEG_PROBE_TIMEOUT", "20"))
+FFMPEG_STALL_TIMEOUT: float = float(os.getenv("FFMPEG_STALL_TIMEOUT", "20"))
+FFMPEG_SAMPLE_INTERVAL: float = float(os.getenv("FFMPEG_SAMPLE_INTERVAL", "5"))
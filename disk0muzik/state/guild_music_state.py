@@ -1,9 +1,14 @@
 import discord
 import asyncio
 import logging
-from typing import Optional, Dict, List, Set
-from disk0muzik.utils.database import get_all_songs
-import random
+from typing import TYPE_CHECKING, Optional, List, Set
+from disk0muzik.state.song import Song, QueueEntry
+from disk0muzik.state.song_catalog import get_catalog
+from disk0muzik.state.shuffle import ShufflePlaylist
+from disk0muzik.utils.prefetch import Prefetcher
+
+if TYPE_CHECKING:
+    from disk0muzik.utils.song_playback import GuildPlayer
 
 logger = logging.getLogger(__name__)
 
@@ -15,21 +20,21 @@ class GuildMusicState:
 
     def __init__(self) -> None:
         """
-        Initializes a new instance of GuildMusicState, including loading and shuffling songs.
+        Initializes a new instance of GuildMusicState. The playlist is loaded on first use.
         """
         self.voice_client: Optional[discord.VoiceClient] = None
-        self.queue: List[Dict[str, str]] = []
-        self.current_song: Optional[Dict[str, str]] = None
+        self.queue: List[QueueEntry] = []
+        self.current_song: Optional[QueueEntry] = None
         self.is_paused: bool = False
         self.now_playing_message: Optional[discord.Message] = None
-        self.skip_event = asyncio.Event()
         self.lock = asyncio.Lock()
+        self.player: Optional["GuildPlayer"] = None
 
         self.skip_votes: Set[int] = set()
         self.pause_votes: Set[int] = set()
 
-        self.played_songs: List[Dict[str, str]] = []
-        self.unplayed_songs: List[Dict[str, str]] = self.load_and_shuffle_songs()
+        self.playlist = ShufflePlaylist()
+        self.prefetcher = Prefetcher()
 
     def reset_state(self) -> None:
         """
@@ -39,7 +44,7 @@ class GuildMusicState:
         self.current_song = None
         self.is_paused = False
         self.now_playing_message = None
-        self.skip_event.clear()
+        self.prefetcher.cancel()
         self.reset_votes()
 
     async def __aenter__(self):
@@ -69,10 +74,7 @@ class GuildMusicState:
             bool: True if the skip threshold is reached, otherwise False.
         """
         self.skip_votes.add(user_id)
-        if len(self.skip_votes) >= required_votes or user_id == self.current_song.get(
-            "requester_id", -1
-        ):
-            self.skip_event.set()
+        if len(self.skip_votes) >= required_votes or user_id == self.current_song.requester_id:
             return True
         return False
 
@@ -88,9 +90,7 @@ class GuildMusicState:
             bool: True if the pause threshold is reached, otherwise False.
         """
         self.pause_votes.add(user_id)
-        if len(self.pause_votes) >= required_votes or user_id == self.current_song.get(
-            "requester_id"
-        ):
+        if len(self.pause_votes) >= required_votes or user_id == self.current_song.requester_id:
             return True
         return False
 
@@ -101,42 +101,46 @@ class GuildMusicState:
         self.skip_votes.clear()
         self.pause_votes.clear()
 
-    def load_and_shuffle_songs(self) -> List[Dict[str, str]]:
+    async def get_next_song(self) -> Optional[QueueEntry]:
         """
-        Loads all songs from the database and shuffles the order.
+        Retrieves the next song to play, ensuring no repeats until all songs have been played.
 
         Returns:
-            List[Dict[str, str]]: A shuffled list of song dictionaries.
+            Optional[QueueEntry]: A playlist entry for the next song, or None if no songs are available.
         """
-        songs = get_all_songs()
-        random.shuffle(songs)
-        return songs
+        catalog = get_catalog()
+        await catalog.ensure_loaded()
+        self.playlist.extend(len(catalog))
+
+        index = self.playlist.next()
+        if index is None:
+            return None
+        song = catalog[index]
+        return QueueEntry(song=song, requester=song.requester, from_playlist=True)
 
-    def get_next_song(self) -> Optional[Dict[str, str]]:
+    def peek_next_song(self) -> Optional[Song]:
         """
-        Retrieves the next song to play, ensuring no repeats until all songs have been played.
+        Returns the song that will play next without consuming it.
 
         Returns:
-            Optional[Dict[str, str]]: The next song to play, or None if no songs are available.
-        """
-        if not self.unplayed_songs:
-            self.unplayed_songs = self.load_and_shuffle_songs()
-            if (
-                self.played_songs
-                and self.unplayed_songs[0]["spotify_id"]
-                == self.played_songs[-1]["spotify_id"]
-            ):
-                random.shuffle(self.unplayed_songs)
-
-        if self.unplayed_songs:
-            next_song = self.unplayed_songs.pop(0)
-            self.played_songs.append(next_song)
-            return next_song
-        return None
+            Optional[Song]: The head of the queue, else the next playlist song, or None.
+        """
+        if self.queue:
+            return self.queue[0].song
+
+        catalog = get_catalog()
+        self.playlist.extend(len(catalog))
+        index = self.playlist.peek()
+        return catalog[index] if index is not None else None
+
+    def prefetch_next_song(self) -> None:
+        """
+        Starts resolving the upcoming song in the background, replacing any outdated prefetch.
+        """
+        self.prefetcher.schedule(self.peek_next_song())
 
     def reset_playlist(self) -> None:
         """
         Resets the playlist, allowing all songs to be played again in a new random order.
         """
-        self.played_songs = []
-        self.unplayed_songs = self.load_and_shuffle_songs()
+        self.playlist.reset()
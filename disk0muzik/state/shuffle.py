@@ -0,0 +1,104 @@
+import random
+from array import array
+from collections import deque
+from typing import Deque, Optional
+from disk0muzik.config import PLAYLIST_HISTORY_SIZE
+
+
+class ShufflePlaylist:
+    """
+    A repeat-free shuffled cycle over catalog indices.
+
+    The order is a permutation of ``range(size)`` stored in a compact unsigned
+    int array. It is shuffled lazily with an incremental Fisher-Yates step per
+    draw: everything before the current position has been played this cycle,
+    everything from it onwards has not. New catalog entries are appended to the
+    unplayed part, so the playlist can grow mid-cycle without reshuffling.
+    """
+
+    def __init__(self, size: int = 0, history_size: int = PLAYLIST_HISTORY_SIZE) -> None:
+        """
+        Initializes a playlist over the first ``size`` catalog indices.
+
+        Args:
+            size (int): The number of catalog entries.
+            history_size (int): How many recently played indices to remember.
+        """
+        self._order = array("I", range(size))
+        self._position = 0
+        self._peeked: Optional[int] = None
+        self.history: Deque[int] = deque(maxlen=history_size)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def remaining(self) -> int:
+        """
+        Returns the number of songs left in the current cycle.
+        """
+        return len(self._order) - self._position
+
+    def extend(self, size: int) -> None:
+        """
+        Grows the playlist to cover ``size`` catalog entries.
+
+        Args:
+            size (int): The new number of catalog entries. Smaller sizes are ignored.
+        """
+        if size > len(self._order):
+            self._order.extend(range(len(self._order), size))
+
+    def _draw(self) -> Optional[int]:
+        """
+        Performs one Fisher-Yates step and returns the chosen index.
+        """
+        size = len(self._order)
+        if not size:
+            return None
+
+        end = size
+        if self._position >= size:
+            # A new cycle starts. The song that ended the previous cycle sits at
+            # the end of the array, so leaving that slot out of the first draw
+            # guarantees it is not repeated back to back.
+            self._position = 0
+            if size > 1:
+                end = size - 1
+
+        chosen = random.randrange(self._position, end)
+        order = self._order
+        order[self._position], order[chosen] = order[chosen], order[self._position]
+        index = order[self._position]
+        self._position += 1
+        return index
+
+    def peek(self) -> Optional[int]:
+        """
+        Returns the index that the next call to ``next`` will return, without consuming it.
+
+        Returns:
+            Optional[int]: The upcoming catalog index, or None if the playlist is empty.
+        """
+        if self._peeked is None:
+            self._peeked = self._draw()
+        return self._peeked
+
+    def next(self) -> Optional[int]:
+        """
+        Returns the next catalog index to play and records it in the history.
+
+        Returns:
+            Optional[int]: The catalog index, or None if the playlist is empty.
+        """
+        index = self.peek()
+        self._peeked = None
+        if index is not None:
+            self.history.append(index)
+        return index
+
+    def reset(self) -> None:
+        """
+        Starts a new cycle, making every song eligible again.
+        """
+        self._position = len(self._order)
+        self._peeked = None
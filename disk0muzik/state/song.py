@@ -0,0 +1,135 @@
+import asyncio
+import sys
+import time
+import discord
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """
+    Interns a string so repeated values share one object.
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(frozen=True, slots=True)
+class Song:
+    """
+    An immutable song catalog entry, matching a row of the songs table.
+
+    Instances are shared between the catalog, every guild's playlist and the
+    song writer, so per-play data never lives here; see QueueEntry.
+    """
+
+    spotify_id: str
+    title: str
+    artist: str
+    thumbnail: Optional[str] = None
+    youtube_url: Optional[str] = None
+    requester: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        # Titles, artists and requesters repeat across the catalog.
+        object.__setattr__(self, "title", _intern(self.title))
+        object.__setattr__(self, "artist", _intern(self.artist))
+        object.__setattr__(self, "requester", _intern(self.requester))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Song":
+        """
+        Creates a song from a dictionary with the songs table's column names.
+
+        Args:
+            data (Dict[str, Any]): The song details. Unknown keys are ignored.
+
+        Returns:
+            Song: The song.
+        """
+        return cls(
+            spotify_id=data["spotify_id"],
+            title=data["title"],
+            artist=data["artist"],
+            thumbnail=data.get("thumbnail"),
+            youtube_url=data.get("youtube_url"),
+            requester=data.get("requester"),
+        )
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """
+        Returns the song as a JSON-serializable dictionary.
+
+        Returns:
+            Dict[str, Optional[str]]: The song details keyed by column name.
+        """
+        return {
+            "spotify_id": self.spotify_id,
+            "title": self.title,
+            "artist": self.artist,
+            "thumbnail": self.thumbnail,
+            "youtube_url": self.youtube_url,
+            "requester": self.requester,
+        }
+
+    def as_row(self) -> Tuple[Optional[str], ...]:
+        """
+        Returns the song as a tuple in the songs table's column order.
+
+        Returns:
+            Tuple[Optional[str], ...]: ``(spotify_id, title, artist, thumbnail, youtube_url, requester)``.
+        """
+        return (
+            self.spotify_id,
+            self.title,
+            self.artist,
+            self.thumbnail,
+            self.youtube_url,
+            self.requester,
+        )
+
+    def replace(self, **changes: Any) -> "Song":
+        """
+        Returns a copy of the song with some fields changed.
+
+        Args:
+            **changes: The fields to change.
+
+        Returns:
+            Song: The new song.
+        """
+        return replace(self, **changes)
+
+
+@dataclass(slots=True)
+class QueueEntry:
+    """
+    A single play of a song in a guild: who asked for it and where it is shown.
+
+    An entry may carry the stream that was extracted while resolving it, so
+    playback can start without extracting the same video again, and a task
+    still matching its song's metadata.
+    """
+
+    song: Song
+    requester: Optional[str]
+    requester_id: Optional[int] = None
+    from_playlist: bool = False
+    message: Optional[discord.Message] = None
+    stream: Optional[Dict[str, str]] = None
+    stream_expires_at: Optional[float] = None
+    enrichment: Optional["asyncio.Task[Song]"] = None
+
+    def take_stream(self, margin: float) -> Optional[Dict[str, str]]:
+        """
+        Returns the stream resolved with the entry, at most once.
+
+        Args:
+            margin (float): Seconds of validity the stream URL must have left.
+
+        Returns:
+            Optional[Dict[str, str]]: The stream info, or None if there is none or it is about to expire.
+        """
+        stream, self.stream = self.stream, None
+        if stream is None or (self.stream_expires_at or 0) - margin <= time.time():
+            return None
+        return stream
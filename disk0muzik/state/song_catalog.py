@@ -0,0 +1,214 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from disk0muzik.config import CATALOG_POLL_INTERVAL, SONG_MATCH_THRESHOLD
+from disk0muzik.state.song import Song
+from disk0muzik.state.song_index import SongIndex
+from disk0muzik.utils.database import get_songs_updated_since
+
+logger = logging.getLogger(__name__)
+
+# Rows committed slightly after a poll can carry an updated_at older than the
+# watermark, so every poll re-reads this much history. Re-applying a row is harmless.
+WATERMARK_LOOKBACK = timedelta(seconds=5)
+
+
+class SongCatalog:
+    """
+    Process-wide, in-memory copy of the songs table shared by every guild.
+
+    The catalog is loaded once and then kept fresh incrementally by polling for
+    rows whose updated_at is past the last seen watermark. A refresh can also be
+    requested explicitly, e.g. right after this process wrote new songs.
+
+    Songs are only ever appended or replaced in place, so a song's index is
+    stable for the lifetime of the process. Titles and artists are kept in a
+    trigram index so text queries can be matched locally.
+    """
+
+    def __init__(self, poll_interval: float = CATALOG_POLL_INTERVAL) -> None:
+        """
+        Initializes an empty catalog.
+
+        Args:
+            poll_interval (float): Seconds between incremental refreshes.
+        """
+        self.poll_interval = poll_interval
+        self.songs: List[Song] = []
+        self._index: Dict[str, int] = {}
+        self._search_index = SongIndex()
+        self._watermark: Optional[datetime] = None
+        self._loaded = False
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.refreshes = 0
+        self.rows_applied = 0
+        self.searches = 0
+        self.matches = 0
+
+    def __len__(self) -> int:
+        return len(self.songs)
+
+    def __getitem__(self, index: int) -> Song:
+        return self.songs[index]
+
+    def get(self, spotify_id: str) -> Optional[Song]:
+        """
+        Returns a song by its Spotify ID.
+
+        Args:
+            spotify_id (str): The Spotify ID of the song.
+
+        Returns:
+            Optional[Song]: The song, or None if unknown.
+        """
+        index = self._index.get(spotify_id)
+        return self.songs[index] if index is not None else None
+
+    def index_of(self, spotify_id: str) -> Optional[int]:
+        """
+        Returns the stable catalog index of a song.
+
+        Args:
+            spotify_id (str): The Spotify ID of the song.
+
+        Returns:
+            Optional[int]: The index, or None if unknown.
+        """
+        return self._index.get(spotify_id)
+
+    def search(self, query: str, threshold: float = SONG_MATCH_THRESHOLD) -> Optional[Song]:
+        """
+        Returns the song whose title and artist best match a text query, if the match is confident.
+
+        Args:
+            query (str): The text query.
+            threshold (float): The minimum trigram similarity, from 0.0 to 1.0.
+
+        Returns:
+            Optional[Song]: The matching song, or None if no song matches closely enough.
+        """
+        self.searches += 1
+        match = self._search_index.search(query)
+        if match is None or match[1] < threshold:
+            return None
+        self.matches += 1
+        return self.songs[match[0]]
+
+    def _apply(self, songs: List[Song]) -> None:
+        """
+        Merges fetched rows into the catalog, replacing known songs in place.
+        """
+        for song in songs:
+            index = self._index.get(song.spotify_id)
+            if index is None:
+                index = self._index[song.spotify_id] = len(self.songs)
+                self.songs.append(song)
+            else:
+                self.songs[index] = song
+            self._search_index.put(index, song)
+        self.rows_applied += len(songs)
+
+    async def refresh(self) -> int:
+        """
+        Fetches songs changed since the last refresh. The first call loads everything.
+
+        Returns:
+            int: The number of rows applied.
+        """
+        async with self._refresh_lock:
+            since = self._watermark - WATERMARK_LOOKBACK if self._watermark else None
+            songs, watermark = await get_songs_updated_since(since)
+            self._apply(songs)
+            if watermark is not None:
+                self._watermark = max(watermark, self._watermark or watermark)
+            self._loaded = True
+            self.refreshes += 1
+            return len(songs)
+
+    async def ensure_loaded(self) -> None:
+        """
+        Loads the catalog if it has not been loaded yet.
+        """
+        if not self._loaded:
+            await self.refresh()
+            logger.info(f"Loaded song catalog with {len(self.songs)} songs.")
+
+    def request_refresh(self) -> None:
+        """
+        Asks the background task to refresh now instead of waiting for the next poll.
+        """
+        self._refresh_requested.set()
+
+    def start(self) -> None:
+        """
+        Starts the background refresh task.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        """
+        Refreshes the catalog on every poll interval or explicit request.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._refresh_requested.wait(), timeout=self.poll_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._refresh_requested.clear()
+
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh song catalog: {e}")
+
+    async def close(self) -> None:
+        """
+        Stops the background refresh task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns catalog size and refresh counters.
+
+        Returns:
+            Dict[str, Any]: Song count, refresh count, rows applied, the current watermark
+            and local search counters.
+        """
+        return {
+            "songs": len(self.songs),
+            "refreshes": self.refreshes,
+            "rows_applied": self.rows_applied,
+            "searches": self.searches,
+            "matches": self.matches,
+            "watermark": self._watermark,
+        }
+
+
+_catalog: Optional[SongCatalog] = None
+
+
+def get_catalog() -> SongCatalog:
+    """
+    Returns the process-wide song catalog, creating it on first use.
+
+    Returns:
+        SongCatalog: The shared catalog.
+    """
+    global _catalog
+    if _catalog is None:
+        _catalog = SongCatalog()
+    return _catalog
@@ -0,0 +1,106 @@
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from disk0muzik.state.song import Song
+from disk0muzik.utils.resolution_cache import normalize_query
+
+# Candidates scored exactly per search, picked by how many trigrams they share with the query.
+MAX_CANDIDATES = 32
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """
+    Returns the trigrams of a text's normalized words, padded like pg_trgm.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        FrozenSet[str]: The trigrams, e.g. ``"  b", " ba", "bac", "ack", "ck "`` for ``"Back"``.
+    """
+    grams = set()
+    for word in normalize_query(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """
+    Returns the share of trigrams two texts have in common.
+
+    Args:
+        a (FrozenSet[str]): The first text's trigrams.
+        b (FrozenSet[str]): The second text's trigrams.
+
+    Returns:
+        float: The Jaccard similarity, from 0.0 to 1.0.
+    """
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class SongIndex:
+    """
+    In-memory trigram index over song titles and artists.
+
+    Songs are addressed by their catalog index. A query is scored against both
+    the title alone and the title with the artist, so "back in black" and
+    "ac dc back in black" both match the same song; word order does not matter.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty index.
+        """
+        self._grams: List[Tuple[FrozenSet[str], FrozenSet[str]]] = []
+        self._postings: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    def put(self, index: int, song: Song) -> None:
+        """
+        Indexes a song at a catalog index, replacing what was indexed there before.
+
+        Args:
+            index (int): The song's catalog index.
+            song (Song): The song.
+        """
+        title = trigrams(song.title or "")
+        full = title | trigrams(song.artist or "")
+        if index < len(self._grams):
+            for gram in self._grams[index][1] - full:
+                self._postings[gram].discard(index)
+        else:
+            self._grams.extend([(frozenset(), frozenset())] * (index + 1 - len(self._grams)))
+        self._grams[index] = (title, full)
+        for gram in full:
+            self._postings.setdefault(gram, set()).add(index)
+
+    def search(self, query: str) -> Optional[Tuple[int, float]]:
+        """
+        Returns the best matching song for a query.
+
+        Args:
+            query (str): The query.
+
+        Returns:
+            Optional[Tuple[int, float]]: The catalog index and similarity of the best match,
+            or None if no song shares a trigram with the query.
+        """
+        grams = trigrams(query)
+        overlap: Counter = Counter()
+        for gram in grams:
+            overlap.update(self._postings.get(gram, ()))
+        if not overlap:
+            return None
+
+        best = None
+        for index, _ in overlap.most_common(MAX_CANDIDATES):
+            title, full = self._grams[index]
+            score = max(similarity(grams, title), similarity(grams, full))
+            if best is None or score > best[1]:
+                best = (index, score)
+        return best
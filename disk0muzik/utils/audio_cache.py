@@ -0,0 +1,321 @@
+import asyncio
+import json
+import logging
+import os
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Set
+from disk0muzik.config import (
+    AUDIO_CACHE_DIR,
+    AUDIO_CACHE_MAX_BYTES,
+    AUDIO_CACHE_MIN_PLAYS,
+    AUDIO_CACHE_FILL_CONCURRENCY,
+    AUDIO_CACHE_FILL_TIMEOUT,
+    AUDIO_CACHE_PLAY_HISTORY,
+    FFMPEG_OPUS_BITRATE,
+)
+from disk0muzik.utils.ffmpeg_supervisor import get_ffmpeg_supervisor
+
+logger = logging.getLogger(__name__)
+
+# Least recently used entries considered per eviction; the least hit of them goes.
+EVICTION_SAMPLE = 8
+
+# Play counts of tracks not cached yet and lengths of cached ones, kept across restarts.
+INDEX_FILE = "index.json"
+
+
+class AudioCache:
+    """
+    Keeps Ogg/Opus copies of frequently played tracks on disk, keyed by video ID.
+
+    A track is copied in the background once it has been streamed
+    ``min_plays`` times; later plays read the local file. Play counts are kept
+    for the ``play_history`` most recently played tracks and saved with the
+    cache, so they add up across restarts, as are the lengths of cached
+    tracks. Files are written
+    under a temporary name and renamed into place, so a file in the cache is
+    always complete. Once the cache holds more than ``max_bytes``, the least
+    often hit of the least recently used files are deleted.
+    """
+
+    def __init__(
+        self,
+        directory: str = AUDIO_CACHE_DIR,
+        max_bytes: int = AUDIO_CACHE_MAX_BYTES,
+        min_plays: int = AUDIO_CACHE_MIN_PLAYS,
+        fill_concurrency: int = AUDIO_CACHE_FILL_CONCURRENCY,
+        fill_timeout: float = AUDIO_CACHE_FILL_TIMEOUT,
+        play_history: int = AUDIO_CACHE_PLAY_HISTORY,
+    ) -> None:
+        """
+        Initializes the cache with the files already in its directory.
+
+        Args:
+            directory (str): Where cached files are kept.
+            max_bytes (int): The byte budget for cached files.
+            min_plays (int): Streamed plays after which a track is cached.
+            fill_concurrency (int): Tracks copied at once.
+            fill_timeout (float): Seconds a copy may take before it is abandoned.
+            play_history (int): Tracks whose play counts are remembered.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_plays = min_plays
+        self.fill_timeout = fill_timeout
+        self.play_history = play_history
+        self._fill_slots = asyncio.Semaphore(fill_concurrency)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._hits: Counter = Counter()
+        self._plays: "OrderedDict[str, int]" = OrderedDict()
+        self._durations: Dict[str, float] = {}
+        self._filling: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.fill_failures = 0
+        self.evictions = 0
+        self._load()
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self.directory, f"{video_id}.ogg")
+
+    def _load(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".part"):
+                # Left over from a copy that never finished.
+                os.remove(path)
+            elif name.endswith(".ogg"):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[: -len(".ogg")], stat.st_size))
+        for _, video_id, size in sorted(files):
+            self._entries[video_id] = size
+            self.size += size
+        self._evict()
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE)) as f:
+                index = json.load(f)
+            self._plays.update(index["plays"])
+            self._durations.update(
+                (video_id, duration) for video_id, duration in index["durations"].items() if video_id in self._entries
+            )
+        except FileNotFoundError:
+            pass
+        except (OSError, KeyError, TypeError, ValueError, AttributeError) as e:
+            logger.warning(f"Failed to load the audio cache index: {e}")
+        logger.info(f"Audio cache holds {len(self._entries)} tracks, {self.size} bytes.")
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._entries
+
+    def get(self, video_id: str) -> Optional[str]:
+        """
+        Returns the local file for a video, if it is cached.
+
+        Args:
+            video_id (str): The YouTube video ID.
+
+        Returns:
+            Optional[str]: The path of the Ogg/Opus file, or None on a miss.
+        """
+        if video_id not in self._entries:
+            self.misses += 1
+            return None
+        path = self._path(video_id)
+        if not os.path.exists(path):
+            self._forget(video_id)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(video_id)
+        self._hits[video_id] += 1
+        self.hits += 1
+        return path
+
+    def duration(self, video_id: str) -> Optional[float]:
+        """
+        Returns the length of a cached track.
+
+        Args:
+            video_id (str): The YouTube video ID.
+
+        Returns:
+            Optional[float]: The length in seconds, or None if it is unknown.
+        """
+        return self._durations.get(video_id)
+
+    def record_play(self, video_id: str, audio_info: Dict[str, str]) -> None:
+        """
+        Counts a streamed play, copying the track to the cache once it is played often enough.
+
+        Only tracks that actually started playing should be counted.
+
+        Args:
+            video_id (str): The YouTube video ID.
+            audio_info (Dict[str, str]): The stream info being played, with ``audio_url``, ``acodec`` and ``duration``.
+        """
+        if video_id in self._entries or video_id in self._filling:
+            return
+        plays = self._plays.pop(video_id, 0) + 1
+        if plays < self.min_plays:
+            self._plays[video_id] = plays
+            while len(self._plays) > self.play_history:
+                self._plays.popitem(last=False)
+            return
+        self._filling.add(video_id)
+        task = asyncio.create_task(
+            self.fill(video_id, audio_info["audio_url"], audio_info.get("acodec"), audio_info.get("duration"))
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def fill(
+        self, video_id: str, audio_url: str, acodec: Optional[str], duration: Optional[float] = None
+    ) -> bool:
+        """
+        Copies a stream into the cache as Ogg/Opus.
+
+        Args:
+            video_id (str): The YouTube video ID.
+            audio_url (str): The stream URL.
+            acodec (Optional[str]): The stream's codec; Opus is copied without re-encoding.
+            duration (Optional[float]): The track's length in seconds, if known.
+
+        Returns:
+            bool: True if the track was cached.
+        """
+        self._filling.add(video_id)
+        part = f"{self._path(video_id)}.part"
+        try:
+            async with self._fill_slots:
+                await asyncio.wait_for(self._transcode(audio_url, acodec, part), self.fill_timeout)
+            os.replace(part, self._path(video_id))
+        except Exception as e:
+            self.fill_failures += 1
+            logger.warning(f"Failed to cache {video_id}: {e!r}")
+            if os.path.exists(part):
+                os.remove(part)
+            return False
+        finally:
+            self._filling.discard(video_id)
+
+        size = os.path.getsize(self._path(video_id))
+        self._forget(video_id)
+        self._entries[video_id] = size
+        self.size += size
+        if duration:
+            self._durations[video_id] = duration
+        self.fills += 1
+        logger.info(f"Cached {video_id}, {size} bytes.")
+        self._evict()
+        self._save_index()
+        return video_id in self._entries
+
+    async def _transcode(self, audio_url: str, acodec: Optional[str], output: str) -> None:
+        args = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+        args += ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"]
+        args += ["-i", audio_url, "-vn", "-map_metadata", "-1"]
+        if acodec == "opus":
+            args += ["-c:a", "copy"]
+        else:
+            args += ["-c:a", "libopus", "-b:a", f"{FFMPEG_OPUS_BITRATE}k", "-ar", "48000", "-ac", "2"]
+        args += ["-f", "ogg", "-y", output]
+
+        slot = await get_ffmpeg_supervisor().acquire(None, "cache")
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+            )
+            slot.attach(process)
+            try:
+                _, stderr = await process.communicate()
+            except asyncio.CancelledError:
+                process.kill()
+                await process.wait()
+                raise
+        finally:
+            slot.release()
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with {process.returncode}: {stderr.decode(errors='replace')[-200:]}")
+
+    def _forget(self, video_id: str) -> None:
+        size = self._entries.pop(video_id, None)
+        if size is not None:
+            self.size -= size
+        self._hits.pop(video_id, None)
+        self._durations.pop(video_id, None)
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes and self._entries:
+            newest = next(reversed(self._entries))
+            candidates: List[str] = []
+            for video_id in self._entries:
+                # The newest file goes last, so it gets the chance to be hit.
+                if video_id != newest:
+                    candidates.append(video_id)
+                if len(candidates) == EVICTION_SAMPLE:
+                    break
+            candidates = candidates or [newest]
+            victim = min(candidates, key=lambda video_id: self._hits[video_id])
+            self._forget(victim)
+            try:
+                os.remove(self._path(victim))
+            except OSError as e:
+                logger.warning(f"Failed to delete cached {victim}: {e}")
+            self.evictions += 1
+
+    async def close(self) -> None:
+        """
+        Cancels the copies in progress and saves the index.
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._save_index()
+
+    def _save_index(self) -> None:
+        path = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with open(f"{path}.part", "w") as f:
+                json.dump({"plays": self._plays, "durations": self._durations}, f)
+            os.replace(f"{path}.part", path)
+        except OSError as e:
+            logger.warning(f"Failed to save the audio cache index: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns cache size and hit/fill counters.
+
+        Returns:
+            Dict[str, Any]: Tracks and bytes cached, hits, misses, fills, failed fills and evictions.
+        """
+        return {
+            "tracks": len(self._entries),
+            "bytes": self.size,
+            "filling": len(self._filling),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fills": self.fills,
+            "fill_failures": self.fill_failures,
+            "evictions": self.evictions,
+        }
+
+
+_cache: Optional[AudioCache] = None
+
+
+def get_audio_cache() -> AudioCache:
+    """
+    Returns the process-wide audio cache, creating it on first use.
+
+    Returns:
+        AudioCache: The shared cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = AudioCache()
+    return _cache
@@ -0,0 +1,366 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from discord import AudioSource, FFmpegOpusAudio
+from typing import Any, Callable, Deque, Dict, List, Optional
+from disk0muzik.config import FFMPEG_OPUS_BITRATE, FFMPEG_PROBE_TIMEOUT, GAPLESS_PREBUFFER_FRAMES
+from disk0muzik.utils.ffmpeg_supervisor import FFmpegProcess, get_ffmpeg_supervisor, read_process_cpu
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_OPTIONS = {
+    "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5",
+    "options": "-vn",
+}
+
+# Discord voice frames are 20 ms long.
+FRAME_LENGTH = 0.02
+
+
+class MeteredOpusAudio(FFmpegOpusAudio):
+    """
+    An ffmpeg Opus source that records how much CPU its ffmpeg process used.
+
+    When the input is already Opus, packets are copied through without being
+    decoded or encoded; otherwise ffmpeg transcodes to Opus, which still keeps
+    encoding out of the bot's own process.
+
+    With a supervisor slot, the ffmpeg process is attached to the slot when
+    it starts, reads mark the slot as waiting for a frame, and the slot is
+    released once the process has been cleaned up.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        *,
+        codec: Optional[str] = None,
+        slot: Optional[FFmpegProcess] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Starts ffmpeg for a stream.
+
+        Args:
+            source (str): The stream URL.
+            codec (Optional[str]): The input codec; ``opus`` enables passthrough.
+            slot (Optional[FFmpegProcess]): The supervisor slot to run ffmpeg in.
+            **kwargs: Passed on to FFmpegOpusAudio.
+        """
+        # Set first, as the process is spawned from the base initializer.
+        self.slot = slot
+        super().__init__(source, codec=codec, **kwargs)
+        self.passthrough = codec in ("opus", "libopus")
+        self.started_at = time.monotonic()
+        self.ended_at: Optional[float] = None
+        self.cpu_time: Optional[float] = None
+        # Track length in seconds, if known.
+        self.duration: Optional[float] = None
+        # The stream info a streamed source was opened from.
+        self.audio_info: Optional[Dict[str, str]] = None
+
+    def _spawn_process(self, args: Any, **subprocess_kwargs: Any) -> Any:
+        process = super()._spawn_process(args, **subprocess_kwargs)
+        if self.slot is not None:
+            self.slot.attach(process)
+        return process
+
+    def read(self) -> bytes:
+        slot = self.slot
+        if slot is None:
+            return super().read()
+        slot.reading_since = time.monotonic()
+        try:
+            return super().read()
+        finally:
+            slot.reading_since = None
+
+    def cpu_seconds(self) -> Optional[float]:
+        """
+        Returns the CPU time ffmpeg has used for this stream.
+
+        Returns:
+            Optional[float]: CPU seconds, or None if they are unknown.
+        """
+        if self.cpu_time is not None:
+            return self.cpu_time
+        process = getattr(self, "_process", None)
+        pid = getattr(process, "pid", None)
+        return read_process_cpu(pid) if isinstance(pid, int) else None
+
+    def cleanup(self) -> None:
+        # Sample before the process is killed and reaped.
+        self.cpu_time = self.cpu_seconds()
+        self.ended_at = time.monotonic()
+        super().cleanup()
+        if self.slot is not None:
+            self.slot.release(self.cpu_time)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the stream's mode and CPU usage.
+
+        Returns:
+            Dict[str, Any]: Whether Opus is passed through, CPU and wall seconds, and CPU percent.
+        """
+        cpu = self.cpu_seconds()
+        wall = (self.ended_at or time.monotonic()) - self.started_at
+        return {
+            "passthrough": self.passthrough,
+            "cpu_seconds": cpu,
+            "wall_seconds": round(wall, 1),
+            "cpu_percent": round(100 * cpu / wall, 2) if cpu is not None and wall > 0 else None,
+        }
+
+
+async def create_file_source(
+    path: str, guild: Optional[int] = None, duration: Optional[float] = None
+) -> MeteredOpusAudio:
+    """
+    Creates a Discord audio source for a local Ogg/Opus file, copying its packets through.
+
+    Args:
+        path (str): The file path.
+        guild (Optional[int]): The ID of the guild the source plays in.
+        duration (Optional[float]): The track's length in seconds, if known.
+
+    Returns:
+        MeteredOpusAudio: The audio source.
+
+    Raises:
+        FFmpegCapacityError: If no ffmpeg slot freed up in time.
+    """
+    slot = await get_ffmpeg_supervisor().acquire(guild, "file")
+    try:
+        source = MeteredOpusAudio(path, codec="opus", slot=slot, options="-vn")
+    except BaseException:
+        slot.release()
+        raise
+    source.duration = duration
+    return source
+
+
+async def probe_codec(audio_url: str, guild: Optional[int] = None) -> Optional[str]:
+    """
+    Finds a stream's audio codec with ffprobe, run in a supervisor slot.
+
+    Args:
+        audio_url (str): The stream URL.
+        guild (Optional[int]): The ID of the guild the stream plays in.
+
+    Returns:
+        Optional[str]: The codec name, e.g. ``opus``, or None if probing failed.
+
+    Raises:
+        FFmpegCapacityError: If no ffmpeg slot freed up in time.
+    """
+    slot = await get_ffmpeg_supervisor().acquire(guild, "probe")
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ffprobe", "-v", "quiet", "-print_format", "json", "-show_streams", "-select_streams", "a:0", audio_url,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        slot.attach(process)
+        try:
+            output, _ = await asyncio.wait_for(process.communicate(), FFMPEG_PROBE_TIMEOUT)
+        except BaseException:
+            process.kill()
+            await process.wait()
+            raise
+    except (OSError, asyncio.TimeoutError) as e:
+        logger.warning(f"Failed to probe {audio_url}: {e!r}")
+        return None
+    finally:
+        slot.release()
+
+    try:
+        return json.loads(output)["streams"][0]["codec_name"]
+    except (ValueError, KeyError, IndexError) as e:
+        logger.warning(f"Failed to probe {audio_url}: {e!r}")
+        return None
+
+
+async def create_audio_source(audio_info: Dict[str, str], guild: Optional[int] = None) -> MeteredOpusAudio:
+    """
+    Creates a Discord audio source for a stream, copying Opus audio through when possible.
+
+    The codec reported by yt-dlp decides between passthrough and transcoding;
+    streams without one are probed with ffprobe first, and transcoded if
+    probing fails.
+
+    Args:
+        audio_info (Dict[str, str]): The stream info, with ``audio_url`` and optionally ``acodec``.
+        guild (Optional[int]): The ID of the guild the source plays in.
+
+    Returns:
+        MeteredOpusAudio: The audio source.
+
+    Raises:
+        FFmpegCapacityError: If no ffmpeg slot freed up in time.
+    """
+    audio_url = audio_info["audio_url"]
+    acodec = audio_info.get("acodec")
+    probed = not acodec or acodec == "none"
+    if probed:
+        acodec = await probe_codec(audio_url, guild)
+    slot = await get_ffmpeg_supervisor().acquire(guild, "stream")
+    try:
+        source = MeteredOpusAudio(
+            audio_url,
+            codec="opus" if acodec == "opus" else None,
+            bitrate=FFMPEG_OPUS_BITRATE,
+            slot=slot,
+            **FFMPEG_OPTIONS,
+        )
+    except BaseException:
+        slot.release()
+        raise
+    source.duration = audio_info.get("duration")
+    source.audio_info = audio_info
+    logger.info(f"Streaming {acodec or 'unknown'} audio, probed: {probed}, passthrough: {source.passthrough}")
+    return source
+
+
+async def prebuffer(source: AudioSource, frames: int = GAPLESS_PREBUFFER_FRAMES) -> List[bytes]:
+    """
+    Reads the first frames of a source ahead of playback, so it starts without waiting for ffmpeg.
+
+    Args:
+        source (AudioSource): The source, not yet playing.
+        frames (int): The number of frames to read.
+
+    Returns:
+        List[bytes]: The frames read, fewer if the source ended early.
+    """
+
+    def read() -> List[bytes]:
+        buffered = []
+        while len(buffered) < frames:
+            frame = source.read()
+            if not frame:
+                break
+            buffered.append(frame)
+        return buffered
+
+    return await asyncio.to_thread(read)
+
+
+class GaplessSource(AudioSource):
+    """
+    Plays a sequence of Opus sources back to back as one source.
+
+    The voice client plays this source for as long as tracks follow each
+    other. The next track is handed over with its first frames already
+    buffered, and the switch happens between two 20 ms frames, so there is no
+    gap and no new ffmpeg startup wait between tracks. The source only ends
+    when a track ends with nothing queued after it.
+
+    ``on_switch`` is called from the audio thread with the next track's tag
+    whenever playback moves on to it.
+    """
+
+    def __init__(self, source: AudioSource, on_switch: Callable[[Any], None]) -> None:
+        """
+        Starts with a first track.
+
+        Args:
+            source (AudioSource): The first track's Opus source.
+            on_switch (Callable[[Any], None]): Called with the tag of each track played after the first.
+        """
+        self.current = source
+        self.frames_read = 0
+        self.switches = 0
+        self._buffered: Deque[bytes] = deque()
+        self._next: Optional[AudioSource] = None
+        self._next_frames: List[bytes] = []
+        self._next_tag: Any = None
+        self._skip = False
+        self._on_switch = on_switch
+        self._lock = threading.Lock()
+
+    def is_opus(self) -> bool:
+        return True
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds of the current track played so far.
+        """
+        return self.frames_read * FRAME_LENGTH
+
+    @property
+    def has_next(self) -> bool:
+        return self._next is not None
+
+    def queue_next(self, source: AudioSource, frames: List[bytes], tag: Any) -> None:
+        """
+        Sets the track to switch to when the current one ends, replacing any other.
+
+        Args:
+            source (AudioSource): The next track's Opus source.
+            frames (List[bytes]): Its first frames, already read from the source.
+            tag (Any): Passed to ``on_switch`` when the switch happens.
+        """
+        with self._lock:
+            previous, self._next = self._next, source
+            self._next_frames, self._next_tag = frames, tag
+        if previous is not None:
+            previous.cleanup()
+
+    def clear_next(self) -> None:
+        """
+        Drops the queued next track.
+        """
+        with self._lock:
+            previous, self._next = self._next, None
+            self._next_frames, self._next_tag = [], None
+        if previous is not None:
+            previous.cleanup()
+
+    def skip(self) -> bool:
+        """
+        Ends the current track at the next frame, switching to the queued next track.
+
+        Returns:
+            bool: False if no next track is queued; the caller has to stop playback itself.
+        """
+        with self._lock:
+            if self._next is None:
+                return False
+            self._skip = True
+            return True
+
+    def read(self) -> bytes:
+        if self._buffered:
+            frame = self._buffered.popleft()
+        elif self._skip:
+            frame = b""
+        else:
+            frame = self.current.read()
+        if frame and not self._skip:
+            self.frames_read += 1
+            return frame
+
+        with self._lock:
+            if self._next is None:
+                self._skip = False
+                return b""
+            finished, self.current = self.current, self._next
+            self._buffered = deque(self._next_frames)
+            tag = self._next_tag
+            self._next, self._next_frames, self._next_tag = None, [], None
+            self._skip = False
+            self.frames_read = 0
+            self.switches += 1
+        finished.cleanup()
+        self._on_switch(tag)
+        return self.read()
+
+    def cleanup(self) -> None:
+        self.current.cleanup()
+        self.clear_next()
+
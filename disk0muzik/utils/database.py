@@ -1,15 +1,23 @@
 import psycopg2
-from psycopg2 import OperationalError
-from typing import Optional, Dict, Any, List
+from psycopg2 import OperationalError, InterfaceError
+from psycopg2.extras import execute_values
+from typing import Optional, Dict, Any, List, Callable, AsyncIterator, Sequence, Tuple
+from datetime import datetime, timezone
 import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from disk0muzik.state.song import Song
 from disk0muzik.config import (
     POSTGRES_DB,
     POSTGRES_USER,
     POSTGRES_HOST,
     POSTGRES_PASSWORD,
     POSTGRES_PORT,
+    POSTGRES_POOL_SIZE,
 )
-import random
+
+logger = logging.getLogger(__name__)
 
 CREATE_SONGS_TABLE = """
 CREATE TABLE IF NOT EXISTS songs (
@@ -18,7 +26,8 @@ CREATE TABLE IF NOT EXISTS songs (
     artist TEXT,
     thumbnail TEXT,
     youtube_url TEXT,
-    requester TEXT   
+    requester TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 )
 """
 
@@ -26,6 +35,14 @@ CREATE_SPOTIFY_ID_INDEX = (
     "CREATE INDEX IF NOT EXISTS idx_spotify_id ON songs (spotify_id)"
 )
 
+ADD_SONGS_UPDATED_AT_COLUMN = (
+    "ALTER TABLE songs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()"
+)
+
+CREATE_SONGS_UPDATED_AT_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_songs_updated_at ON songs (updated_at)"
+)
+
 CREATE_GUILD_STATES_TABLE = """
 CREATE TABLE IF NOT EXISTS guild_states (
     guild_id BIGINT PRIMARY KEY,
@@ -43,11 +60,44 @@ CREATE TABLE IF NOT EXISTS user_sessions (
 )
 """
 
+CREATE_QUERY_RESOLUTIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS query_resolutions (
+    query_key TEXT PRIMARY KEY,
+    spotify_id TEXT NOT NULL,
+    resolved_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+INSERT_SONG_OR_FILL_URL = """
+INSERT INTO songs (spotify_id, title, artist, thumbnail, youtube_url, requester)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON CONFLICT (spotify_id) DO UPDATE 
+SET youtube_url = EXCLUDED.youtube_url, thumbnail = EXCLUDED.thumbnail, updated_at = now()
+WHERE songs.youtube_url IS NULL OR songs.youtube_url = ''
+"""
+
 INSERT_OR_UPDATE_SONG = """
 INSERT INTO songs (spotify_id, title, artist, thumbnail, youtube_url, requester)
 VALUES (%s, %s, %s, %s, %s, %s)
 ON CONFLICT (spotify_id) DO UPDATE 
-SET youtube_url = EXCLUDED.youtube_url, thumbnail = EXCLUDED.thumbnail
+SET youtube_url = EXCLUDED.youtube_url, thumbnail = EXCLUDED.thumbnail, updated_at = now()
+"""
+
+INSERT_SONGS_OR_FILL_URL = """
+INSERT INTO songs (spotify_id, title, artist, thumbnail, youtube_url, requester)
+VALUES %s
+ON CONFLICT (spotify_id) DO UPDATE 
+SET youtube_url = EXCLUDED.youtube_url, thumbnail = EXCLUDED.thumbnail, updated_at = now()
+WHERE songs.youtube_url IS NULL OR songs.youtube_url = ''
+RETURNING spotify_id
+"""
+
+INSERT_OR_UPDATE_SONGS = """
+INSERT INTO songs (spotify_id, title, artist, thumbnail, youtube_url, requester)
+VALUES %s
+ON CONFLICT (spotify_id) DO UPDATE 
+SET youtube_url = EXCLUDED.youtube_url, thumbnail = EXCLUDED.thumbnail, updated_at = now()
+RETURNING spotify_id
 """
 
 INSERT_OR_UPDATE_GUILD_STATE = """
@@ -67,10 +117,31 @@ ON CONFLICT (user_id) DO UPDATE
 SET session_data = EXCLUDED.session_data
 """
 
+INSERT_OR_UPDATE_QUERY_RESOLUTION = """
+INSERT INTO query_resolutions (query_key, spotify_id)
+VALUES (%s, %s)
+ON CONFLICT (query_key) DO UPDATE 
+SET spotify_id = EXCLUDED.spotify_id, resolved_at = now()
+"""
+
 SELECT_SONG_BY_SPOTIFY_ID = "SELECT * FROM songs WHERE spotify_id = %s"
 
 SELECT_ALL_SONGS = "SELECT * FROM songs"
 
+SELECT_RANDOM_SONG = "SELECT * FROM songs ORDER BY RANDOM() LIMIT 1"
+
+SELECT_SONGS_UPDATED_SINCE = """
+SELECT spotify_id, title, artist, thumbnail, youtube_url, requester, updated_at
+FROM songs
+WHERE updated_at >= %s
+ORDER BY updated_at
+"""
+
+SELECT_QUERY_RESOLUTION = """
+SELECT spotify_id FROM query_resolutions
+WHERE query_key = %s AND resolved_at > now() - make_interval(secs => %s)
+"""
+
 SELECT_GUILD_STATE_BY_ID = "SELECT * FROM guild_states WHERE guild_id = %s"
 
 SELECT_USER_SESSION_BY_ID = "SELECT session_data FROM user_sessions WHERE user_id = %s"
@@ -99,50 +170,308 @@ def get_db_connection():
         raise RuntimeError(f"Error connecting to the database: {e}")
 
 
-def init_db():
+class ConnectionPool:
     """
-    Initializes the database by creating the necessary tables and indexes if they do not already exist.
+    A bounded pool of PostgreSQL connections shared by every guild.
+
+    Connections are opened lazily up to ``max_size`` and reused across calls.
+    Queries run on a worker thread so a slow round trip never blocks the event loop.
     """
-    conn = get_db_connection()
-    if conn:
+
+    def __init__(self, max_size: int = POSTGRES_POOL_SIZE) -> None:
+        """
+        Initializes an empty pool.
+
+        Args:
+            max_size (int): The maximum number of open connections.
+        """
+        self.max_size = max_size
+        self._idle: List[Any] = []
+        self._size = 0
+        self._semaphore = asyncio.Semaphore(max_size)
+        self._closed = False
+
+        self.checkouts = 0
+        self.connects = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def _checkout(self):
+        """
+        Returns an idle connection, opening a new one if none are available.
+        """
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.closed:
+                return conn
+            self._size -= 1
+        conn = await asyncio.to_thread(get_db_connection)
+        self._size += 1
+        self.connects += 1
+        return conn
+
+    def _discard(self, conn) -> None:
+        """
+        Closes a connection and forgets about it.
+        """
+        self._size -= 1
         try:
-            with conn.cursor() as cur:
-                cur.execute(CREATE_SONGS_TABLE)
-                cur.execute(CREATE_SPOTIFY_ID_INDEX)
-                cur.execute(CREATE_GUILD_STATES_TABLE)
-                cur.execute(CREATE_USER_SESSIONS_TABLE)
-                conn.commit()
-        finally:
             conn.close()
+        except Exception as e:
+            logger.error(f"Error closing database connection: {e}")
 
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Any]:
+        """
+        Checks a connection out of the pool for the duration of the block.
+
+        Broken connections are discarded instead of being returned to the pool.
+
+        Raises:
+            RuntimeError: If the pool has been closed.
+        """
+        if self._closed:
+            raise RuntimeError("Database pool is closed.")
+
+        started = time.perf_counter()
+        await self._semaphore.acquire()
+        waited = time.perf_counter() - started
+        self.checkouts += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+        try:
+            conn = await self._checkout()
+        except BaseException:
+            self._semaphore.release()
+            raise
 
-def add_song(song: Dict[str, str]):
-    conn = get_db_connection()
-    if conn:
         try:
-            with conn.cursor() as cur:
-                existing_song = get_song(song["spotify_id"])
-                
-                # Insert a new song entry if it doesn't exist
-                # or update if youtube_url is missing or broken
-                if not existing_song or not existing_song["youtube_url"]:
-                    cur.execute(
-                        INSERT_OR_UPDATE_SONG,
-                        (
-                            song["spotify_id"],
-                            song["title"],
-                            song["artist"],
-                            song["thumbnail"],
-                            song["youtube_url"],
-                            song["requester"],
-                        ),
-                    )
-                conn.commit()
+            yield conn
+        except (OperationalError, InterfaceError):
+            self._discard(conn)
+            raise
+        except BaseException:
+            try:
+                await asyncio.to_thread(conn.rollback)
+            except Exception:
+                self._discard(conn)
+            else:
+                self._idle.append(conn)
+            raise
+        else:
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append(conn)
         finally:
-            conn.close()
+            self._semaphore.release()
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs ``func(conn, *args)`` on a worker thread with a pooled connection.
+
+        The transaction psycopg2 opens implicitly is rolled back afterwards, so
+        read-only functions that never commit do not return the connection to
+        the pool idle in transaction, holding locks and a stale snapshot.
+        Functions that write commit their own work first.
+
+        Args:
+            func (Callable): A blocking function taking a connection as its first argument.
+            *args: Additional arguments for ``func``.
+
+        Returns:
+            Any: Whatever ``func`` returns.
+        """
+        def call() -> Any:
+            result = func(conn, *args)
+            # A no-op without a transaction in progress, e.g. after a commit.
+            conn.rollback()
+            return result
+
+        async with self.connection() as conn:
+            task = asyncio.ensure_future(asyncio.to_thread(call))
+            try:
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # The worker thread still owns the connection; let it finish
+                # before the connection goes back to the pool.
+                await asyncio.wait({task})
+                raise
+
+    async def close(self) -> None:
+        """
+        Closes every idle connection. Connections still checked out are closed on return.
+        """
+        self._closed = True
+        while self._idle:
+            self._discard(self._idle.pop())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns pool usage counters.
+
+        Returns:
+            Dict[str, Any]: Pool size, checkout counts and wait times in seconds.
+        """
+        return {
+            "max_size": self.max_size,
+            "open": self._size,
+            "idle": len(self._idle),
+            "in_use": self._size - len(self._idle),
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "avg_wait": self.total_wait / self.checkouts if self.checkouts else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+_pool: Optional[ConnectionPool] = None
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the process-wide connection pool, creating it on first use.
+
+    Returns:
+        ConnectionPool: The shared pool.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool()
+    return _pool
+
+
+async def open_pool(max_size: int = POSTGRES_POOL_SIZE) -> ConnectionPool:
+    """
+    Creates the process-wide connection pool. Called once at bot startup.
+
+    Args:
+        max_size (int): The maximum number of open connections.
+
+    Returns:
+        ConnectionPool: The shared pool.
+    """
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+    _pool = ConnectionPool(max_size)
+    logger.info(f"Opened database pool with up to {max_size} connections.")
+    return _pool
+
+
+async def close_pool() -> None:
+    """
+    Closes the process-wide connection pool. Called once at bot shutdown.
+    """
+    global _pool
+    if _pool is not None:
+        logger.info(f"Closing database pool: {_pool.stats()}")
+        await _pool.close()
+        _pool = None
+
+
+def _row_to_song(row) -> Song:
+    """
+    Maps a row of the songs table to a Song.
+    """
+    return Song(*row[:6])
+
 
+def _init_db(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute(CREATE_SONGS_TABLE)
+        cur.execute(CREATE_SPOTIFY_ID_INDEX)
+        cur.execute(ADD_SONGS_UPDATED_AT_COLUMN)
+        cur.execute(CREATE_SONGS_UPDATED_AT_INDEX)
+        cur.execute(CREATE_GUILD_STATES_TABLE)
+        cur.execute(CREATE_USER_SESSIONS_TABLE)
+        cur.execute(CREATE_QUERY_RESOLUTIONS_TABLE)
+        conn.commit()
 
-def get_song(spotify_id: str) -> Optional[Dict[str, str]]:
+
+async def init_db() -> None:
+    """
+    Initializes the database by creating the necessary tables and indexes if they do not already exist.
+    """
+    await get_pool().run(_init_db)
+
+
+def _add_song(conn, song: Song, replace_url: bool) -> bool:
+    with conn.cursor() as cur:
+        cur.execute(
+            INSERT_OR_UPDATE_SONG if replace_url else INSERT_SONG_OR_FILL_URL,
+            song.as_row(),
+        )
+        changed = cur.rowcount > 0
+        conn.commit()
+        return changed
+
+
+async def add_song(song: Song, replace_url: bool = False) -> bool:
+    """
+    Inserts a song, or fills in its youtube_url if the stored one is missing.
+
+    The decision is made by the database in a single conditional upsert.
+
+    Args:
+        song (Song): The song.
+        replace_url (bool): Overwrite the stored youtube_url even if present,
+            used when the stored URL is known to be broken.
+
+    Returns:
+        bool: True if a row was inserted or updated.
+    """
+    return await get_pool().run(_add_song, song, replace_url)
+
+
+def _add_songs(
+    conn,
+    fill_rows: Sequence[Tuple[str, ...]],
+    replace_rows: Sequence[Tuple[str, ...]],
+) -> int:
+    changed = 0
+    with conn.cursor() as cur:
+        if fill_rows:
+            changed += len(
+                execute_values(cur, INSERT_SONGS_OR_FILL_URL, fill_rows, fetch=True)
+            )
+        if replace_rows:
+            changed += len(
+                execute_values(cur, INSERT_OR_UPDATE_SONGS, replace_rows, fetch=True)
+            )
+        conn.commit()
+    return changed
+
+
+async def add_songs(
+    fill_rows: Sequence[Tuple[str, ...]],
+    replace_rows: Sequence[Tuple[str, ...]] = (),
+) -> int:
+    """
+    Upserts many songs in one transaction using multi-row VALUES statements.
+
+    Rows are ``(spotify_id, title, artist, thumbnail, youtube_url, requester)``
+    tuples and must not repeat a spotify_id within the same list.
+
+    Args:
+        fill_rows (Sequence[Tuple[str, ...]]): Songs to insert, filling in youtube_url only if missing.
+        replace_rows (Sequence[Tuple[str, ...]]): Songs whose stored youtube_url should be overwritten.
+
+    Returns:
+        int: The number of rows inserted or updated.
+    """
+    return await get_pool().run(_add_songs, fill_rows, replace_rows)
+
+
+def _get_song(conn, spotify_id: str) -> Optional[Song]:
+    with conn.cursor() as cur:
+        cur.execute(SELECT_SONG_BY_SPOTIFY_ID, (spotify_id,))
+        row = cur.fetchone()
+        return _row_to_song(row) if row else None
+
+
+async def get_song(spotify_id: str) -> Optional[Song]:
     """
     Retrieves a song from the database by its Spotify ID.
 
@@ -150,130 +479,128 @@ def get_song(spotify_id: str) -> Optional[Dict[str, str]]:
         spotify_id (str): The Spotify ID of the song.
 
     Returns:
-        Optional[Dict[str, str]]: A dictionary containing the song details if found, else None.
+        Optional[Song]: The song if found, else None.
     """
-    conn = get_db_connection()
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                cur.execute(SELECT_SONG_BY_SPOTIFY_ID, (spotify_id,))
-                row = cur.fetchone()
-                if row:
-                    return {
-                        "spotify_id": row[0],
-                        "title": row[1],
-                        "artist": row[2],
-                        "youtube_url": row[4],
-                        "requester": row[5],
-                        "thumbnail": row[3],
-                    }
-        finally:
-            conn.close()
-    return None
+    return await get_pool().run(_get_song, spotify_id)
+
+
+def _get_random_song(conn) -> Optional[Song]:
+    with conn.cursor() as cur:
+        cur.execute(SELECT_RANDOM_SONG)
+        row = cur.fetchone()
+        return _row_to_song(row) if row else None
+
 
+async def get_random_song() -> Optional[Song]:
+    """
+    Retrieves a random song from the database.
 
-def get_all_songs() -> List[Dict[str, str]]:
+    Returns:
+        Optional[Song]: A song if any song exists, else None.
+    """
+    return await get_pool().run(_get_random_song)
+
+
+def _get_all_songs(conn) -> List[Song]:
+    with conn.cursor() as cur:
+        cur.execute(SELECT_ALL_SONGS)
+        return [_row_to_song(row) for row in cur.fetchall()]
+
+
+async def get_all_songs() -> List[Song]:
     """
     Retrieves all songs from the database.
 
     Returns:
-        List[Dict[str, str]]: A list of dictionaries containing song details.
+        List[Song]: Every song in the catalog.
     """
-    conn = get_db_connection()
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                cur.execute(SELECT_ALL_SONGS)
-                rows = cur.fetchall()
-                return [
-                    {
-                        "spotify_id": row[0],
-                        "title": row[1],
-                        "artist": row[2],
-                        "youtube_url": row[4],
-                        "requester": row[5],
-                        "thumbnail": row[3],
-                    }
-                    for row in rows
-                ]
-        finally:
-            conn.close()
-    return []
+    return await get_pool().run(_get_all_songs)
+
 
+def _get_songs_updated_since(
+    conn, since: datetime
+) -> Tuple[List[Song], Optional[datetime]]:
+    with conn.cursor() as cur:
+        cur.execute(SELECT_SONGS_UPDATED_SINCE, (since,))
+        rows = cur.fetchall()
+    conn.commit()
+    songs = [_row_to_song(row) for row in rows]
+    return songs, rows[-1][6] if rows else None
 
-class GuildMusicState:
+
+async def get_songs_updated_since(
+    since: Optional[datetime] = None,
+) -> Tuple[List[Song], Optional[datetime]]:
     """
-    Manages the state for a guild's music session, including the voice client,
-    current queue, current song, and related state information.
+    Retrieves songs inserted or updated at or after a point in time.
+
+    Args:
+        since (Optional[datetime]): The watermark to read from, or None for every song.
+
+    Returns:
+        Tuple[List[Song], Optional[datetime]]: The songs in update order and the
+        newest updated_at among them, or None if there were no rows.
     """
+    if since is None:
+        since = datetime.min.replace(tzinfo=timezone.utc)
+    return await get_pool().run(_get_songs_updated_since, since)
 
-    def __init__(self):
-        """
-        Initializes a new instance of GuildMusicState, including loading and shuffling songs.
-        """
-        self.voice_client = None
-        self.queue = []
-        self.current_song = None
-        self.is_paused = False
-        self.now_playing_message = None
-        self.skip_event = asyncio.Event()
-        self.lock = asyncio.Lock()
-        self.played_songs = []
-        self.unplayed_songs = self.load_and_shuffle_songs()
-
-    def load_and_shuffle_songs(self) -> List[Dict[str, str]]:
-        """
-        Loads all songs from the database, shuffles the order, and ensures that the first song 
-        in the shuffled playlist is not the same as the last played song.
 
-        Returns:
-            List[Dict[str, str]]: A shuffled list of song dictionaries.
-        """
-        songs = get_all_songs()
-        if not songs:
-            return []
+def _save_query_resolution(conn, query_key: str, spotify_id: str) -> None:
+    with conn.cursor() as cur:
+        cur.execute(INSERT_OR_UPDATE_QUERY_RESOLUTION, (query_key, spotify_id))
+        conn.commit()
 
-        last_song = self.played_songs[-1] if self.played_songs else None
 
-        # Remove the last played song from the list before shuffling
-        if last_song:
-            songs.remove(last_song)
+async def save_query_resolution(query_key: str, spotify_id: str) -> None:
+    """
+    Records which Spotify track a normalized query resolved to.
 
-        # Shuffle the songs
-        random.shuffle(songs)
+    Args:
+        query_key (str): The normalized query.
+        spotify_id (str): The Spotify ID of the matched track.
+    """
+    await get_pool().run(_save_query_resolution, query_key, spotify_id)
 
-        # Insert the last played song back into the playlist at a random position that is not the start
-        if last_song:
-            insert_position = random.randint(1, len(songs))
-            songs.insert(insert_position, last_song)
 
-        return songs
+def _get_query_resolution(conn, query_key: str, max_age: float) -> Optional[str]:
+    with conn.cursor() as cur:
+        cur.execute(SELECT_QUERY_RESOLUTION, (query_key, max_age))
+        row = cur.fetchone()
+    conn.commit()
+    return row[0] if row else None
 
-    def get_next_song(self) -> Optional[Dict[str, str]]:
-        """
-        Retrieves the next song to play, ensuring no repeats until all songs have been played.
 
-        Returns:
-            Optional[Dict[str, str]]: The next song to play, or None if no songs are available.
-        """
-        if not self.unplayed_songs:
-            self.unplayed_songs = self.load_and_shuffle_songs()
+async def get_query_resolution(query_key: str, max_age: float) -> Optional[str]:
+    """
+    Retrieves the Spotify ID a normalized query resolved to, if recent enough.
 
-        if self.unplayed_songs:
-            next_song = self.unplayed_songs.pop(0)
-            self.played_songs.append(next_song)
-            return next_song
-        return None
+    Args:
+        query_key (str): The normalized query.
+        max_age (float): The maximum age of the resolution in seconds.
 
-    def reset_playlist(self):
-        """
-        Resets the playlist, allowing all songs to be played again in a new random order.
-        """
-        self.played_songs = []
-        self.unplayed_songs = self.load_and_shuffle_songs()
+    Returns:
+        Optional[str]: The Spotify ID if a fresh resolution exists, else None.
+    """
+    return await get_pool().run(_get_query_resolution, query_key, max_age)
+
+
+def _save_guild_state(conn, guild_id: int, state: Dict[str, Any]) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            INSERT_OR_UPDATE_GUILD_STATE,
+            (
+                guild_id,
+                state["current_song"],
+                state["queue"],
+                state["is_paused"],
+                state["now_playing_message_id"],
+            ),
+        )
+        conn.commit()
 
 
-def save_guild_state(guild_id: int, state: Dict[str, Any]):
+async def save_guild_state(guild_id: int, state: Dict[str, Any]) -> None:
     """
     Saves the current state of a guild's music session to the database.
 
@@ -281,26 +608,25 @@ def save_guild_state(guild_id: int, state: Dict[str, Any]):
         guild_id (int): The ID of the guild.
         state (Dict[str, Any]): The current state of the guild's music session.
     """
-    conn = get_db_connection()
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                cur.execute(
-                    INSERT_OR_UPDATE_GUILD_STATE,
-                    (
-                        guild_id,
-                        state["current_song"],
-                        state["queue"],
-                        state["is_paused"],
-                        state["now_playing_message_id"],
-                    ),
-                )
-                conn.commit()
-        finally:
-            conn.close()
+    await get_pool().run(_save_guild_state, guild_id, state)
+
+
+def _load_guild_state(conn, guild_id: int) -> Optional[Dict[str, Any]]:
+    with conn.cursor() as cur:
+        cur.execute(SELECT_GUILD_STATE_BY_ID, (guild_id,))
+        row = cur.fetchone()
+        if row:
+            return {
+                "guild_id": row[0],
+                "current_song": row[1],
+                "queue": row[2],
+                "is_paused": row[3],
+                "now_playing_message_id": row[4],
+            }
+    return None
 
 
-def load_guild_state(guild_id: int) -> Optional[Dict[str, Any]]:
+async def load_guild_state(guild_id: int) -> Optional[Dict[str, Any]]:
     """
     Loads the saved state of a guild's music session from the database.
 
@@ -310,26 +636,22 @@ def load_guild_state(guild_id: int) -> Optional[Dict[str, Any]]:
     Returns:
         Optional[Dict[str, Any]]: A dictionary containing the state of the guild's music session if found, else None.
     """
-    conn = get_db_connection()
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                cur.execute(SELECT_GUILD_STATE_BY_ID, (guild_id,))
-                row = cur.fetchone()
-                if row:
-                    return {
-                        "guild_id": row[0],
-                        "current_song": row[1],
-                        "queue": row[2],
-                        "is_paused": row[3],
-                        "now_playing_message_id": row[4],
-                    }
-        finally:
-            conn.close()
-    return None
+    return await get_pool().run(_load_guild_state, guild_id)
+
+
+def _save_user_session(conn, user_id: int, session_data: Dict[str, Any]) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            INSERT_OR_UPDATE_USER_SESSION,
+            (
+                user_id,
+                session_data,
+            ),
+        )
+        conn.commit()
 
 
-def save_user_session(user_id: int, session_data: Dict[str, Any]):
+async def save_user_session(user_id: int, session_data: Dict[str, Any]) -> None:
     """
     Saves a user's session data to the database.
 
@@ -337,23 +659,19 @@ def save_user_session(user_id: int, session_data: Dict[str, Any]):
         user_id (int): The ID of the user.
         session_data (Dict[str, Any]): The session data to save.
     """
-    conn = get_db_connection()
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                cur.execute(
-                    INSERT_OR_UPDATE_USER_SESSION,
-                    (
-                        user_id,
-                        session_data,
-                    ),
-                )
-                conn.commit()
-        finally:
-            conn.close()
+    await get_pool().run(_save_user_session, user_id, session_data)
+
 
+def _load_user_session(conn, user_id: int) -> Optional[Dict[str, Any]]:
+    with conn.cursor() as cur:
+        cur.execute(SELECT_USER_SESSION_BY_ID, (user_id,))
+        row = cur.fetchone()
+        if row:
+            return row[0]
+    return None
 
-def load_user_session(user_id: int) -> Optional[Dict[str, Any]]:
+
+async def load_user_session(user_id: int) -> Optional[Dict[str, Any]]:
     """
     Loads a user's session data from the database.
 
@@ -363,14 +681,4 @@ def load_user_session(user_id: int) -> Optional[Dict[str, Any]]:
     Returns:
         Optional[Dict[str, Any]]: The session data if found, else None.
     """
-    conn = get_db_connection()
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                cur.execute(SELECT_USER_SESSION_BY_ID, (user_id,))
-                row = cur.fetchone()
-                if row:
-                    return row[0]
-        finally:
-            conn.close()
-    return None
+    return await get_pool().run(_load_user_session, user_id)
@@ -1,6 +1,7 @@
 import discord
 from discord.ui import Button, View
-from typing import Tuple, Dict, Optional
+from typing import List, Tuple, Optional
+from disk0muzik.state.song import Song
 
 BLANK_CHAR = "\u2003\u2800"
 
@@ -12,6 +13,9 @@ FOOTER_IMAGES = {
     "skipped": "https://i.ibb.co/9Wc3xNw/check.png",  # Reusing the played image for skipped
 }
 
+# Songs listed individually in a batch embed, keeping it well under Discord's size limit.
+MAX_BATCH_LINES = 20
+
 EMBED_COLORS = {
     "now_playing": 0x1DB954,
     "paused": 0xFFA500,
@@ -62,18 +66,18 @@ def create_button(
     )
 
 
-def create_description(song: Dict[str, str]) -> str:
+def create_description(song: Song) -> str:
     """
     Generates a formatted description for the embed using song details.
 
-    :param song: Dictionary containing song details.
+    :param song: The song to display.
     :return: Formatted description string.
     """
-    return f"# {song['title']}\n**{song['artist']}**\n\u2800\n{BLANK_CHAR * 17}"
+    return f"# {song.title}\n**{song.artist}**\n\u2800\n{BLANK_CHAR * 17}"
 
 
 def create_embed_and_view(
-    song: Dict[str, str],
+    song: Song,
     requester: str,
     footer_text: str,
     footer_type: str,
@@ -82,7 +86,7 @@ def create_embed_and_view(
     """
     Generates an embed and view for different states like now playing, paused, queued, played, and skipped.
 
-    :param song: Dictionary containing song details.
+    :param song: The song to display.
     :param requester: The user who requested the song.
     :param footer_text: Text to be displayed in the footer.
     :param footer_type: Type of the footer (now_playing, paused, queued, played, skipped).
@@ -92,7 +96,7 @@ def create_embed_and_view(
     description = create_description(song)
     embed = create_embed(
         description,
-        song.get("thumbnail", "default_thumbnail_url"),
+        song.thumbnail,
         footer_text,
         footer_type,
     )
@@ -118,14 +122,14 @@ def create_embed_and_view(
 
 
 def create_now_playing_embed(
-    song: Dict[str, str],
+    song: Song,
     requester: str,
     play_pause_label: str,
 ) -> Tuple[discord.Embed, View]:
     """
     Creates an embed for the 'Now Playing' state.
 
-    :param song: Dictionary containing song details.
+    :param song: The song to display.
     :param requester: The user who requested the song.
     :param play_pause_label: Label for the play/pause button.
     :return: The generated embed and view objects.
@@ -135,14 +139,14 @@ def create_now_playing_embed(
 
 
 def create_now_playing_from_playlist_embed(
-    song: Dict[str, str],
+    song: Song,
     requester: str,
     play_pause_label: str,
 ) -> Tuple[discord.Embed, View]:
     """
     Creates an embed for the 'Now Playing from Playlist' state.
 
-    :param song: Dictionary containing song details.
+    :param song: The song to display.
     :param requester: The user who requested the song.
     :param play_pause_label: Label for the play/pause button.
     :return: The generated embed and view objects.
@@ -152,12 +156,12 @@ def create_now_playing_from_playlist_embed(
 
 
 def create_paused_embed(
-    song: Dict[str, str], requester: str
+    song: Song, requester: str
 ) -> Tuple[discord.Embed, View]:
     """
     Creates an embed for the 'Paused' state.
 
-    :param song: Dictionary containing song details.
+    :param song: The song to display.
     :param requester: The user who requested the song.
     :return: The generated embed and view objects.
     """
@@ -166,12 +170,12 @@ def create_paused_embed(
 
 
 def create_queued_embed(
-    song: Dict[str, str], requester: str
+    song: Song, requester: str
 ) -> Tuple[discord.Embed, View]:
     """
     Creates an embed for the 'Queued' state.
 
-    :param song: Dictionary containing song details.
+    :param song: The song to display.
     :param requester: The user who requested the song.
     :return: The generated embed and view objects.
     """
@@ -180,11 +184,11 @@ def create_queued_embed(
     return embed, View()
 
 
-def create_played_embed(song: Dict[str, str], requester: str) -> discord.Embed:
+def create_played_embed(song: Song, requester: str) -> discord.Embed:
     """
     Creates an embed for the 'Played' state.
 
-    :param song: Dictionary containing song details.
+    :param song: The song to display.
     :param requester: The user who requested the song.
     :return: The generated embed object.
     """
@@ -193,11 +197,11 @@ def create_played_embed(song: Dict[str, str], requester: str) -> discord.Embed:
     return embed
 
 
-def create_played_from_playlist_embed(song: Dict[str, str], requester: str) -> discord.Embed:
+def create_played_from_playlist_embed(song: Song, requester: str) -> discord.Embed:
     """
     Creates an embed for the 'Played from Playlist' state.
 
-    :param song: Dictionary containing song details.
+    :param song: The song to display.
     :param requester: The user who requested the song.
     :return: The generated embed object.
     """
@@ -206,11 +210,11 @@ def create_played_from_playlist_embed(song: Dict[str, str], requester: str) -> d
     return embed
 
 
-def create_skipped_embed(song: Dict[str, str], requester: str) -> discord.Embed:
+def create_skipped_embed(song: Song, requester: str) -> discord.Embed:
     """
     Creates an embed for the 'Skipped' state.
 
-    :param song: Dictionary containing song details.
+    :param song: The song to display.
     :param requester: The user who requested the song.
     :return: The generated embed object.
     """
@@ -219,14 +223,54 @@ def create_skipped_embed(song: Dict[str, str], requester: str) -> discord.Embed:
     return embed
 
 
-def create_skipped_from_playlist_embed(song: Dict[str, str], requester: str) -> discord.Embed:
+def create_skipped_from_playlist_embed(song: Song, requester: str) -> discord.Embed:
     """
     Creates an embed for the 'Skipped from Playlist' state.
 
-    :param song: Dictionary containing song details.
+    :param song: The song to display.
     :param requester: The user who requested the song.
     :return: The generated embed object.
     """
     footer_text = f"Skipped from Playlist\u2800•\u2800@{requester}"
     embed, _ = create_embed_and_view(song, requester, footer_text, "skipped")
     return embed
+
+
+def create_collection_queued_embed(
+    source: str, count: int, requester: str, done: bool
+) -> discord.Embed:
+    """
+    Creates an embed for an album or playlist being queued.
+
+    :param source: A label for the collection, e.g. Spotify playlist.
+    :param count: The number of tracks queued so far.
+    :param requester: The user who requested the collection.
+    :param done: Whether every track of the collection has been processed.
+    :return: The generated embed object.
+    """
+    status = "Queued" if done else "Queuing"
+    description = f"# {source}\n**{count} tracks {status.lower()}**\n\u2800\n{BLANK_CHAR * 17}"
+    footer_text = f"{status}\u2800•\u2800@{requester}"
+    return create_embed(description, None, footer_text, "queued")
+
+
+def create_batch_queued_embed(
+    songs: List[Song], failed: int, requester: str
+) -> discord.Embed:
+    """
+    Creates a single embed for several songs queued from one message.
+
+    :param songs: The queued songs, in queue order.
+    :param failed: The number of queries that could not be resolved.
+    :param requester: The user who requested the songs.
+    :return: The generated embed object.
+    """
+    lines = [f"{i}. {song.title} • {song.artist}" for i, song in enumerate(songs[:MAX_BATCH_LINES], start=1)]
+    if len(songs) > MAX_BATCH_LINES:
+        lines.append(f"… and {len(songs) - MAX_BATCH_LINES} more")
+    if failed:
+        lines.append(f"\u2800\n{failed} not found")
+    description = f"# {len(songs)} songs queued\n" + "\n".join(lines) + f"\n\u2800\n{BLANK_CHAR * 17}"
+    footer_text = f"Queued\u2800•\u2800@{requester}"
+    thumbnail = songs[0].thumbnail if songs else None
+    return create_embed(description, thumbnail, footer_text, "queued")
@@ -0,0 +1,290 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+import weakref
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from disk0muzik.config import EXTRACTION_WORKERS, EXTRACTION_TIMEOUT
+from disk0muzik.utils.upstream import UpstreamUnavailable
+from disk0muzik.utils.yt_dlp_helper import extract_youtube_info, extract_youtube_playlist, warm_up
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionError(Exception):
+    """
+    Raised when an extraction could not finish, as opposed to finding nothing.
+    """
+
+
+class ExtractionUnavailable(ExtractionError, UpstreamUnavailable):
+    """
+    Raised when an extraction timed out or lost its worker; worth retrying, and counted against YouTube's breaker.
+    """
+
+
+class ExtractionService:
+    """
+    Runs yt-dlp extractions on a bounded pool of worker processes.
+
+    Extraction is CPU-bound and holds the GIL, so it runs outside the bot's
+    process. Each worker keeps a warm, reusable YoutubeDL instance. At most
+    ``max_workers`` jobs are handed to the pool at once; further requests wait
+    in line, which is what the queue depth metric reports.
+
+    A running job cannot be cancelled, so when one times out the worker
+    processes are killed and the pool is replaced; jobs that were running
+    alongside it are submitted once more to the new pool.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = EXTRACTION_WORKERS,
+        timeout: float = EXTRACTION_TIMEOUT,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """
+        Initializes the service. Worker processes are started on first use.
+
+        Args:
+            max_workers (int): The number of worker processes.
+            timeout (float): The default per-job timeout in seconds.
+            executor (Optional[Executor]): An executor to use instead of a process pool.
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = executor
+        # Pools whose workers were killed here; their broken jobs are not YouTube's fault.
+        self._recycled = weakref.WeakSet()
+        self._slots = asyncio.Semaphore(max_workers)
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.no_match = 0
+        self.cancelled = 0
+        self.recycles = 0
+        self.resubmits = 0
+        self.total_latency = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_up,
+            )
+        return self._executor
+
+    def _reset_executor(self, executor: Optional[Executor]) -> None:
+        """
+        Discards a broken pool so the next job starts fresh worker processes.
+
+        Args:
+            executor (Optional[Executor]): The pool to discard; left alone if it was already replaced.
+        """
+        if executor is None or executor is not self._executor:
+            return
+        self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _recycle_executor(self, executor: Executor) -> None:
+        """
+        Kills the workers of a process pool with a hung job so their slots free up.
+
+        Args:
+            executor (Executor): The pool the hung job was submitted to.
+        """
+        if not isinstance(executor, ProcessPoolExecutor) or executor is not self._executor:
+            # Threads cannot be killed, so the job keeps its slot until it returns; a replaced pool was already recycled.
+            return
+        # Taken before shutdown, which forgets the processes.
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        self._recycled.add(executor)
+        self._reset_executor(executor)
+        for process in processes:
+            process.kill()
+        self.recycles += 1
+        logger.warning(f"Killed {len(processes)} YouTube extraction workers after a job hung.")
+
+    def _release(self) -> None:
+        self.running -= 1
+        self._slots.release()
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Called from the executor's thread.
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # The event loop was closed while the job ran; nothing waits on the slot.
+            pass
+
+    async def extract(self, query: str, timeout: Optional[float] = None) -> Optional[Dict[str, str]]:
+        """
+        Extracts video and audio information for a YouTube URL or search query.
+
+        A job whose caller is cancelled keeps its worker slot until the worker
+        actually finishes, so the pool is never oversubscribed. A job that times
+        out has its worker killed.
+
+        Args:
+            query (str): The search query or YouTube URL.
+            timeout (Optional[float]): Seconds to wait for the result, defaults to the service timeout.
+
+        Returns:
+            Optional[Dict[str, str]]: The extracted details, or None if YouTube had no match.
+
+        Raises:
+            ExtractionError: If the job failed; ExtractionUnavailable if it timed out or its worker died.
+            UpstreamUnavailable: If YouTube is throttling us or could not be reached.
+        """
+        return await self._run(extract_youtube_info, query, timeout)
+
+    async def extract_playlist(
+        self, url: str, timeout: Optional[float] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Lists the videos of a YouTube playlist or mix with a single flat extraction.
+
+        Args:
+            url (str): The playlist or mix URL.
+            timeout (Optional[float]): Seconds to wait for the result, defaults to the service timeout.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: The playlist entries, or None if extraction failed.
+
+        Raises:
+            ExtractionError: If the job failed; ExtractionUnavailable if it timed out or its worker died.
+            UpstreamUnavailable: If YouTube is throttling us or could not be reached.
+        """
+        return await self._run(extract_youtube_playlist, url, timeout)
+
+    async def _submit(self, func: Callable[[str], Any], query: str) -> Tuple[Executor, Future]:
+        """
+        Waits for a worker slot and hands the job to the pool.
+
+        Args:
+            func (Callable[[str], Any]): The extraction to run.
+            query (str): Its argument.
+
+        Returns:
+            Tuple[Executor, Future]: The pool the job went to and its future, which frees the slot when done.
+        """
+        loop = asyncio.get_running_loop()
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        executor = None
+        try:
+            executor = self._get_executor()
+            job = executor.submit(func, query)
+        except BrokenProcessPool as e:
+            self._release()
+            self.failures += 1
+            logger.error(f"YouTube extraction pool is broken - Query: '{query}' - Error: {e}")
+            self._reset_executor(executor)
+            raise ExtractionUnavailable(f"Extraction pool is broken: {e}") from e
+        except Exception:
+            self._release()
+            raise
+        job.add_done_callback(lambda _: self._job_done(loop))
+        return executor, job
+
+    async def _run(self, func: Callable[[str], Any], query: str, timeout: Optional[float]) -> Any:
+        started = time.perf_counter()
+        resubmitted = False
+        while True:
+            executor, job = await self._submit(func, query)
+            future = asyncio.wrap_future(job)
+            # Outlives a caller that timed out or was cancelled, which never sees its error.
+            future.add_done_callback(lambda done: done.cancelled() or done.exception())
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                logger.error(f"YouTube extraction timed out - Query: '{query}'")
+                self._recycle_executor(executor)
+                raise ExtractionUnavailable("Extraction timed out")
+            except asyncio.CancelledError:
+                job.cancel()
+                self.cancelled += 1
+                raise
+            except BrokenProcessPool as e:
+                if executor in self._recycled:
+                    # Killed along with another job that hung, not because of this one.
+                    if not resubmitted:
+                        resubmitted = True
+                        self.resubmits += 1
+                        logger.info(f"Resubmitting YouTube extraction after its workers were recycled - Query: '{query}'")
+                        continue
+                    self.failures += 1
+                    raise ExtractionError("Extraction workers were recycled twice") from e
+                self.failures += 1
+                logger.error(f"YouTube extraction worker died - Query: '{query}' - Error: {e}")
+                self._reset_executor(executor)
+                raise ExtractionUnavailable(f"Extraction worker died: {e}") from e
+            except UpstreamUnavailable:
+                self.failures += 1
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"YouTube extraction failed - Query: '{query}' - Error: {e}")
+                raise ExtractionError(f"Extraction failed: {e}") from e
+            break
+
+        self.completed += 1
+        self.total_latency += time.perf_counter() - started
+        if result is None:
+            self.no_match += 1
+        return result
+
+    def close(self) -> None:
+        """
+        Shuts the worker processes down, dropping jobs that have not started.
+        """
+        self._reset_executor(self._executor)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns queue depth and job counters.
+
+        Returns:
+            Dict[str, Any]: Waiting and running jobs, outcome counts and average latency in seconds.
+        """
+        return {
+            "workers": self.max_workers,
+            "queue_depth": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failures": self.failures,
+            "no_match": self.no_match,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "recycles": self.recycles,
+            "resubmits": self.resubmits,
+            "avg_latency": self.total_latency / self.completed if self.completed else 0.0,
+        }
+
+
+_service: Optional[ExtractionService] = None
+
+
+def get_extraction_service() -> ExtractionService:
+    """
+    Returns the process-wide extraction service, creating it on first use.
+
+    Returns:
+        ExtractionService: The shared service.
+    """
+    global _service
+    if _service is None:
+        _service = ExtractionService()
+    return _service
@@ -0,0 +1,422 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Hashable, List, Optional, Set
+from disk0muzik.config import (
+    FFMPEG_MAX_PROCESSES,
+    FFMPEG_MAX_PER_GUILD,
+    FFMPEG_SLOT_TIMEOUT,
+    FFMPEG_STALL_TIMEOUT,
+    FFMPEG_SAMPLE_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def read_process_cpu(pid: int) -> Optional[float]:
+    """
+    Reads the CPU time a process has used so far from /proc.
+
+    Args:
+        pid (int): The process ID.
+
+    Returns:
+        Optional[float]: User plus system CPU time in seconds, or None if it cannot be read.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Fields after the parenthesised command name start at field 3, state.
+    fields = stat[stat.rindex(")") + 2 :].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def read_process_rss(pid: int) -> Optional[int]:
+    """
+    Reads a process's resident memory from /proc.
+
+    Args:
+        pid (int): The process ID.
+
+    Returns:
+        Optional[int]: Resident set size in bytes, or None if it cannot be read.
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class FFmpegCapacityError(Exception):
+    """
+    Raised when no ffmpeg slot frees up within the slot timeout.
+    """
+
+
+class FFmpegProcess:
+    """
+    A slot for one ffmpeg process, labelled with the guild it works for.
+
+    The slot is taken before ffmpeg is started and released once the process
+    has been killed and reaped. In between, the supervisor samples the
+    process's CPU time and memory, and the owner marks when it is waiting on
+    ffmpeg for a frame, so a process that stops producing audio can be told
+    apart from one that is merely paused.
+    """
+
+    def __init__(self, supervisor: "FFmpegSupervisor", guild: Optional[Hashable], kind: str) -> None:
+        """
+        Initializes a slot without a process.
+
+        Args:
+            supervisor (FFmpegSupervisor): The supervisor the slot belongs to.
+            guild (Optional[Hashable]): The guild the process works for, or None for bot-wide work.
+            kind (str): What the process does, e.g. ``stream`` or ``cache``.
+        """
+        self.supervisor = supervisor
+        self.guild = guild
+        self.kind = kind
+        self.pid: Optional[int] = None
+        self.started_at = time.monotonic()
+        self.cpu_seconds: Optional[float] = None
+        self.rss_bytes: Optional[int] = None
+        self.peak_rss_bytes = 0
+        # Set while the owner is blocked reading from the process.
+        self.reading_since: Optional[float] = None
+        self.exited_at: Optional[float] = None
+        self.killed = False
+        self.released = False
+        self._process: Any = None
+
+    def attach(self, process: Any) -> None:
+        """
+        Attaches the started process to the slot.
+
+        Args:
+            process (Any): A ``subprocess.Popen`` or ``asyncio.subprocess.Process``.
+        """
+        self._process = process
+        self.pid = process.pid
+
+    @property
+    def exited(self) -> bool:
+        if self._process is None:
+            return False
+        poll = getattr(self._process, "poll", None)
+        # Polling a Popen also reaps it if it has exited.
+        return (poll() if poll else self._process.returncode) is not None
+
+    def sample(self) -> None:
+        """
+        Reads the process's CPU time and resident memory, keeping the last values once it is gone.
+        """
+        if self.pid is None:
+            return
+        cpu = read_process_cpu(self.pid)
+        if cpu is not None:
+            self.cpu_seconds = cpu
+        rss = read_process_rss(self.pid)
+        if rss is not None:
+            self.rss_bytes = rss
+            self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+
+    def kill(self) -> None:
+        """
+        Kills the process; its owner sees the end of its output.
+        """
+        if self._process is None or self.exited:
+            return
+        self.killed = True
+        try:
+            self._process.kill()
+        except (ProcessLookupError, OSError) as e:
+            logger.warning(f"Failed to kill ffmpeg process {self.pid}: {e}")
+
+    def release(self, cpu_seconds: Optional[float] = None) -> None:
+        """
+        Frees the slot and adds the process's usage to its guild's totals. Safe to call twice and from any thread.
+
+        Args:
+            cpu_seconds (Optional[float]): The final CPU time, if the owner sampled it before killing the process.
+        """
+        if cpu_seconds is not None:
+            self.cpu_seconds = cpu_seconds
+        self.supervisor._release(self)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the process's label and resource usage.
+
+        Returns:
+            Dict[str, Any]: Guild, kind, PID, age, CPU seconds and current and peak RSS.
+        """
+        return {
+            "guild": self.guild,
+            "kind": self.kind,
+            "pid": self.pid,
+            "age": round(time.monotonic() - self.started_at, 1),
+            "cpu_seconds": self.cpu_seconds,
+            "rss_bytes": self.rss_bytes,
+            "peak_rss_bytes": self.peak_rss_bytes,
+        }
+
+
+class FFmpegSupervisor:
+    """
+    Owns every ffmpeg process the bot starts.
+
+    Each process needs a slot first. At most ``max_processes`` run at once,
+    and at most ``max_per_guild`` for any one guild; callers wait up to
+    ``slot_timeout`` seconds for a slot to free up. Every ``sample_interval``
+    seconds the supervisor samples the processes' CPU time and memory from
+    /proc, kills processes their owner has been waiting on for a frame for
+    more than ``stall_timeout`` seconds, and frees the slots of processes
+    that exited without their owner cleaning up. Usage is summed per guild.
+    """
+
+    def __init__(
+        self,
+        max_processes: int = FFMPEG_MAX_PROCESSES,
+        max_per_guild: int = FFMPEG_MAX_PER_GUILD,
+        slot_timeout: float = FFMPEG_SLOT_TIMEOUT,
+        stall_timeout: float = FFMPEG_STALL_TIMEOUT,
+        sample_interval: float = FFMPEG_SAMPLE_INTERVAL,
+    ) -> None:
+        """
+        Initializes a supervisor with no processes.
+
+        Args:
+            max_processes (int): Processes allowed at once.
+            max_per_guild (int): Processes allowed at once for one guild.
+            slot_timeout (float): Seconds to wait for a free slot.
+            stall_timeout (float): Seconds a process may keep its owner waiting for a frame.
+            sample_interval (float): Seconds between checks of the running processes.
+        """
+        self.max_processes = max_processes
+        self.max_per_guild = max_per_guild
+        self.slot_timeout = slot_timeout
+        self.stall_timeout = stall_timeout
+        self.sample_interval = sample_interval
+        self._processes: Set[FFmpegProcess] = set()
+        self._per_guild: Counter = Counter()
+        # Slots are released from discord.py's audio thread as well as the event loop.
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._waiting = 0
+        self._totals: Dict[Optional[Hashable], Dict[str, float]] = {}
+
+        self.started = 0
+        self.waits = 0
+        self.rejected = 0
+        self.stalls = 0
+        self.reaped = 0
+
+    def _has_room(self, guild: Optional[Hashable]) -> bool:
+        if len(self._processes) >= self.max_processes:
+            return False
+        return guild is None or self._per_guild[guild] < self.max_per_guild
+
+    async def acquire(self, guild: Optional[Hashable], kind: str) -> FFmpegProcess:
+        """
+        Takes a slot for a new ffmpeg process, waiting for one to free up if the caps are reached.
+
+        Args:
+            guild (Optional[Hashable]): The guild the process works for, or None for bot-wide work.
+            kind (str): What the process does, e.g. ``stream`` or ``cache``.
+
+        Returns:
+            FFmpegProcess: The slot; the caller attaches the process and releases the slot when done.
+
+        Raises:
+            FFmpegCapacityError: If no slot freed up within the slot timeout.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._changed = loop, asyncio.Event()
+            self._monitor_task = loop.create_task(self._monitor())
+
+        deadline = loop.time() + self.slot_timeout
+        waited = False
+        while True:
+            with self._lock:
+                if self._has_room(guild):
+                    process = FFmpegProcess(self, guild, kind)
+                    self._processes.add(process)
+                    self._per_guild[guild] += 1
+                    self.started += 1
+                    return process
+                self._changed.clear()
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.rejected += 1
+                raise FFmpegCapacityError(f"No ffmpeg slot for guild {guild} within {self.slot_timeout}s")
+            if not waited:
+                waited = True
+                self.waits += 1
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiting -= 1
+
+    def _release(self, process: FFmpegProcess) -> None:
+        with self._lock:
+            if process.released:
+                return
+            process.released = True
+            self._processes.discard(process)
+            self._per_guild[process.guild] -= 1
+            if self._per_guild[process.guild] <= 0:
+                del self._per_guild[process.guild]
+            totals = self._totals.setdefault(process.guild, {"processes": 0, "cpu_seconds": 0.0})
+            totals["processes"] += 1
+            totals["cpu_seconds"] += process.cpu_seconds or 0.0
+
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._changed.set)
+
+    def check(self) -> None:
+        """
+        Samples the running processes, kills stalled ones and frees the slots of abandoned ones.
+        """
+        now = time.monotonic()
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            if process.pid is None:
+                continue
+            process.sample()
+            if process.exited:
+                # The owner normally releases the slot right after the process ends.
+                if process.exited_at is None:
+                    process.exited_at = now
+                elif now - process.exited_at > self.stall_timeout:
+                    logger.warning(f"Freeing the slot of exited ffmpeg process {process.pid} (guild {process.guild}).")
+                    self.reaped += 1
+                    process.release()
+            elif process.reading_since is not None and now - process.reading_since > self.stall_timeout:
+                logger.warning(
+                    f"Killing ffmpeg process {process.pid} (guild {process.guild}), "
+                    f"no frame for {now - process.reading_since:.0f}s."
+                )
+                self.stalls += 1
+                process.kill()
+
+    async def _monitor(self) -> None:
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Failed to check ffmpeg processes: {e}")
+
+    def kill_guild(self, guild: Hashable) -> int:
+        """
+        Kills every ffmpeg process still running for a guild, e.g. once it stopped playing.
+
+        Args:
+            guild (Hashable): The guild.
+
+        Returns:
+            int: The number of processes killed.
+        """
+        with self._lock:
+            processes = [process for process in self._processes if process.guild == guild]
+        killed = 0
+        for process in processes:
+            if process.pid is not None and not process.exited:
+                process.kill()
+                killed += 1
+        if killed:
+            logger.info(f"Killed {killed} ffmpeg processes left running for guild {guild}.")
+        return killed
+
+    async def close(self) -> None:
+        """
+        Stops sampling and kills every process still running.
+        """
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            try:
+                await self._monitor_task
+            except asyncio.CancelledError:
+                pass
+            self._monitor_task = None
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            process.kill()
+        self._loop = None
+
+    def guild_stats(self, guild: Optional[Hashable]) -> Dict[str, Any]:
+        """
+        Returns a guild's running processes and their resource usage.
+
+        Args:
+            guild (Optional[Hashable]): The guild, or None for bot-wide work.
+
+        Returns:
+            Dict[str, Any]: Running processes, their current RSS, and CPU seconds of running and finished ones.
+        """
+        with self._lock:
+            processes = [process for process in self._processes if process.guild == guild]
+            totals = dict(self._totals.get(guild, {"processes": 0, "cpu_seconds": 0.0}))
+        return {
+            "running": len(processes),
+            "finished": totals["processes"],
+            "rss_bytes": sum(process.rss_bytes or 0 for process in processes),
+            "cpu_seconds": round(totals["cpu_seconds"] + sum(process.cpu_seconds or 0.0 for process in processes), 2),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns process counts, cap counters and usage per guild.
+
+        Returns:
+            Dict[str, Any]: Running and waiting processes, slots started, waited for and refused,
+            stalled processes killed, abandoned slots freed, total RSS, and usage per guild.
+        """
+        with self._lock:
+            guilds: List[Optional[Hashable]] = list(set(self._per_guild) | set(self._totals))
+            processes = list(self._processes)
+        return {
+            "running": len(processes),
+            "waiting": self._waiting,
+            "started": self.started,
+            "waits": self.waits,
+            "rejected": self.rejected,
+            "stalls": self.stalls,
+            "reaped": self.reaped,
+            "rss_bytes": sum(process.rss_bytes or 0 for process in processes),
+            "guilds": {guild: self.guild_stats(guild) for guild in guilds},
+        }
+
+
+_supervisor: Optional[FFmpegSupervisor] = None
+
+
+def get_ffmpeg_supervisor() -> FFmpegSupervisor:
+    """
+    Returns the process-wide ffmpeg supervisor, creating it on first use.
+
+    Returns:
+        FFmpegSupervisor: The shared supervisor.
+    """
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = FFmpegSupervisor()
+    return _supervisor
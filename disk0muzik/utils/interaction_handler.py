@@ -1,6 +1,5 @@
 import logging
 import discord
-from disk0muzik.utils.embed_helper import create_now_playing_embed, create_paused_embed
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +25,7 @@ async def handle_button_click(
     logger.info(f"Button clicked: {button_id} by user: {user_id}")
 
     if guild_state.current_song:
-        requester_id = guild_state.current_song.get("requester_id")
+        requester_id = guild_state.current_song.requester_id
 
         voice_channel = guild_state.voice_client.channel
         user_count = (
@@ -72,25 +71,10 @@ async def toggle_pause(guild_state) -> None:
     Args:
         guild_state (GuildMusicState): The current guild's music state.
     """
-    if guild_state.voice_client.is_playing():
-        guild_state.voice_client.pause()
-        guild_state.is_paused = True
-        embed, view = create_paused_embed(
-            guild_state.current_song, guild_state.current_song["requester"]
-        )
-        await guild_state.now_playing_message.edit(embed=embed, view=view)
-        logger.info("Paused song.")
-    elif guild_state.is_paused:
-        guild_state.voice_client.resume()
-        guild_state.is_paused = False
-        embed, view = create_now_playing_embed(
-            guild_state.current_song,
-            guild_state.current_song["requester"],
-            "❚❚",
-        )
-        await guild_state.now_playing_message.edit(embed=embed, view=view)
-        logger.info("Resumed song.")
-    guild_state.reset_votes()
+    if guild_state.is_paused:
+        guild_state.player.resume()
+    else:
+        guild_state.player.pause()
 
 
 async def skip_song(guild_state) -> None:
@@ -100,18 +84,7 @@ async def skip_song(guild_state) -> None:
     Args:
         guild_state (GuildMusicState): The current guild's music state.
     """
-    try:
-        if guild_state.voice_client.is_playing() or guild_state.is_paused:
-            guild_state.voice_client.stop()
-    except Exception as e:
-        logger.error(f"Error occurred while trying to stop the voice client: {e}")    
-    else:    
-        guild_state.is_paused = False
-        guild_state.skip_event.set()
-        logger.info("Skipped song.")
-    finally:    
-        guild_state.reset_votes()
-
+    guild_state.player.skip()
 
 
 async def add_reaction(message: discord.Message, emoji: str, count: int) -> None:
@@ -0,0 +1,124 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from disk0muzik.config import NEGATIVE_CACHE_SIZE, NEGATIVE_CACHE_MISS_TTL, NEGATIVE_CACHE_ERROR_TTL
+
+# Why a lookup came back empty.
+NO_MATCH = "no_match"
+ERROR = "error"
+
+
+class NegativeCache:
+    """
+    Remembers lookups that recently resolved to nothing, so repeats are answered locally.
+
+    A lookup is identified by its stage (e.g. ``spotify``) and a key within that
+    stage. Lookups that found no match are remembered for ``miss_ttl`` seconds;
+    lookups that failed with a transient error only for the shorter
+    ``error_ttl``. The least recently used entry is evicted once ``max_size``
+    entries are cached.
+    """
+
+    def __init__(
+        self,
+        max_size: int = NEGATIVE_CACHE_SIZE,
+        miss_ttl: float = NEGATIVE_CACHE_MISS_TTL,
+        error_ttl: float = NEGATIVE_CACHE_ERROR_TTL,
+    ) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (int): The maximum number of entries.
+            miss_ttl (float): How long a "no match" answer is kept, in seconds.
+            error_ttl (float): How long a transient error is kept, in seconds.
+        """
+        self.max_size = max_size
+        self.ttls = {NO_MATCH: miss_ttl, ERROR: error_ttl}
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[str, float]]" = OrderedDict()
+
+        self.hits = {NO_MATCH: 0, ERROR: 0}
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, stage: str, key: Hashable) -> Optional[str]:
+        """
+        Returns why a lookup recently came back empty.
+
+        Args:
+            stage (str): The lookup stage.
+            key (Hashable): The lookup key within the stage.
+
+        Returns:
+            Optional[str]: NO_MATCH or ERROR, or None if the lookup should be made.
+        """
+        entry = self._entries.get((stage, key))
+        if entry is None:
+            self.misses += 1
+            return None
+
+        reason, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[(stage, key)]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end((stage, key))
+        self.hits[reason] += 1
+        return reason
+
+    def put(self, stage: str, key: Hashable, reason: str) -> None:
+        """
+        Remembers that a lookup came back empty.
+
+        Args:
+            stage (str): The lookup stage.
+            key (Hashable): The lookup key within the stage.
+            reason (str): NO_MATCH or ERROR.
+        """
+        self._entries[(stage, key)] = (reason, time.monotonic() + self.ttls[reason])
+        self._entries.move_to_end((stage, key))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, stage: str, key: Hashable) -> None:
+        """
+        Forgets a lookup, e.g. after it succeeded through another path.
+
+        Args:
+            stage (str): The lookup stage.
+            key (Hashable): The lookup key within the stage.
+        """
+        self._entries.pop((stage, key), None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns cache size and hit/miss counters.
+
+        Returns:
+            Dict[str, Any]: Entry count, hits per reason, misses and evictions.
+        """
+        return {
+            "size": len(self._entries),
+            "no_match_hits": self.hits[NO_MATCH],
+            "error_hits": self.hits[ERROR],
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_cache: Optional[NegativeCache] = None
+
+
+def get_negative_cache() -> NegativeCache:
+    """
+    Returns the process-wide negative cache, creating it on first use.
+
+    Returns:
+        NegativeCache: The shared cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = NegativeCache()
+    return _cache
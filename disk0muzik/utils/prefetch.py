@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+from disk0muzik.state.song import Song
+from disk0muzik.utils.audio_cache import get_audio_cache
+from disk0muzik.utils.stream_cache import get_stream_info, get_video_id
+from disk0muzik.utils.song_writer import get_song_writer
+
+logger = logging.getLogger(__name__)
+
+StreamResult = Tuple[Optional[Dict[str, str]], Song]
+
+
+async def resolve_song_stream(song: Song) -> StreamResult:
+    """
+    Resolves a playable stream for a song, repairing its youtube_url if the stored one is broken.
+
+    Args:
+        song (Song): The song to resolve.
+
+    Returns:
+        Tuple[Optional[Dict[str, str]], Song]: The stream info (None if nothing playable was found)
+        and the song, replaced by a repaired copy if its youtube_url had to change.
+    """
+    info = await get_stream_info(song.youtube_url) if song.youtube_url else None
+    if info:
+        return info, song
+
+    logger.error(f"Error with youtube_url of {song.title}, searching for a new one.")
+    info = await get_stream_info(f"{song.title} {song.artist}")
+    if not info:
+        return None, song
+
+    repaired = song.replace(youtube_url=info["video_url"])
+    get_song_writer().enqueue(repaired, replace_url=True)  # Update the database with the new youtube_url
+    return info, repaired
+
+
+class Prefetcher:
+    """
+    Resolves a guild's upcoming track in the background while the current one plays.
+
+    Only one track is prefetched at a time. Scheduling a different track cancels
+    the previous prefetch, and resolving the prefetched track joins the work
+    already in flight instead of starting over.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an idle prefetcher.
+        """
+        self._url: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def schedule(self, song: Optional[Song]) -> None:
+        """
+        Starts prefetching a song, unless it is already being prefetched.
+
+        Args:
+            song (Optional[Song]): The upcoming song, or None to stop prefetching. Songs in
+                the audio cache are not prefetched.
+        """
+        url = song.youtube_url if song else None
+        if url == self._url and self._task is not None:
+            return
+
+        self.cancel()
+        if song is None:
+            return
+        video_id = get_video_id(url)
+        if video_id and video_id in get_audio_cache():
+            # Cached tracks play from disk and need no stream.
+            return
+        self._url = url
+        self._task = asyncio.create_task(self._prefetch(song))
+
+    async def _prefetch(self, song: Song) -> StreamResult:
+        result = await resolve_song_stream(song)
+        if result[0] is None:
+            logger.warning(f"Prefetch found no playable stream for {song.title}.")
+        else:
+            logger.info(f"Prefetched stream for {song.title}.")
+        return result
+
+    async def resolve(self, song: Song) -> StreamResult:
+        """
+        Resolves a song's stream, reusing the prefetch for it if there is one.
+
+        Args:
+            song (Song): The song about to be played.
+
+        Returns:
+            Tuple[Optional[Dict[str, str]], Song]: See resolve_song_stream.
+        """
+        task = self._task
+        if task is None or song.youtube_url != self._url:
+            self.misses += 1
+            self.cancel()
+            return await resolve_song_stream(song)
+
+        self.hits += 1
+        self._task = None
+        self._url = None
+        try:
+            info, song = await task
+        except Exception as e:
+            logger.error(f"Prefetch failed for {song.title}: {e}")
+            return await resolve_song_stream(song)
+        if info is None:
+            return info, song
+        # Re-check through the stream cache in case the prefetched URL has
+        # since come too close to its expiry.
+        return await resolve_song_stream(song)
+
+    def cancel(self) -> None:
+        """
+        Cancels the prefetch in flight, if any.
+        """
+        if self._task is not None:
+            self._task.cancel()
+        self._task = None
+        self._url = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns prefetch hit/miss counters.
+
+        Returns:
+            Dict[str, Any]: Whether a prefetch is in flight, and how often playback reused one.
+        """
+        return {
+            "in_flight": self._task is not None and not self._task.done(),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
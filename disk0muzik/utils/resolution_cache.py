@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+from disk0muzik.config import RESOLUTION_CACHE_SIZE, RESOLUTION_CACHE_TTL
+from disk0muzik.utils.database import get_query_resolution, save_query_resolution
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Folds case, Unicode compatibility forms, punctuation and whitespace out of a query.
+
+    Args:
+        query (str): The raw query.
+
+    Returns:
+        str: The normalized query, e.g. ``"AC/DC - Back In Black!"`` becomes ``"ac dc back in black"``.
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(_NON_WORD.sub(" ", query).split())
+
+
+class ResolutionCache:
+    """
+    Maps normalized text queries to the Spotify ID they resolved to.
+
+    Lookups hit an in-process LRU first and fall back to the query_resolutions
+    table, so resolutions are shared across restarts. Entries expire after ``ttl``
+    seconds in both places.
+    """
+
+    def __init__(
+        self, max_size: int = RESOLUTION_CACHE_SIZE, ttl: float = RESOLUTION_CACHE_TTL
+    ) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (int): The maximum number of entries kept in memory.
+            ttl (float): How long a resolution stays valid, in seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._writes: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, spotify_id: str, expires_at: float) -> None:
+        self._entries[key] = (spotify_id, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, query: str) -> Optional[str]:
+        """
+        Returns the Spotify ID a query resolved to, if known and not expired.
+
+        Args:
+            query (str): The raw query.
+
+        Returns:
+            Optional[str]: The Spotify ID, or None on a miss.
+        """
+        key = normalize_query(query)
+        if not key:
+            self.misses += 1
+            return None
+
+        entry = self._entries.get(key)
+        if entry:
+            spotify_id, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return spotify_id
+            del self._entries[key]
+
+        try:
+            spotify_id = await get_query_resolution(key, self.ttl)
+        except Exception as e:
+            logger.error(f"Failed to read query resolution for '{key}': {e}")
+            spotify_id = None
+
+        if spotify_id is None:
+            self.misses += 1
+            return None
+
+        # The row's exact age is unknown here; a full TTL is close enough for memory.
+        self._remember(key, spotify_id, time.monotonic() + self.ttl)
+        self.db_hits += 1
+        return spotify_id
+
+    def put(self, query: str, spotify_id: str) -> None:
+        """
+        Records a resolution in memory and persists it in the background.
+
+        Args:
+            query (str): The raw query.
+            spotify_id (str): The Spotify ID it resolved to.
+        """
+        key = normalize_query(query)
+        if not key or self._entries.get(key, (None,))[0] == spotify_id:
+            return
+        self._remember(key, spotify_id, time.monotonic() + self.ttl)
+
+        task = asyncio.create_task(self._persist(key, spotify_id))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _persist(self, key: str, spotify_id: str) -> None:
+        try:
+            await save_query_resolution(key, spotify_id)
+        except Exception as e:
+            logger.error(f"Failed to save query resolution for '{key}': {e}")
+
+    async def close(self) -> None:
+        """
+        Waits for resolutions that are still being written.
+        """
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns cache size and hit/miss counters.
+
+        Returns:
+            Dict[str, Any]: Entry count, memory hits, database hits and misses.
+        """
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+        }
+
+
+_cache: Optional[ResolutionCache] = None
+
+
+def get_resolution_cache() -> ResolutionCache:
+    """
+    Returns the process-wide resolution cache, creating it on first use.
+
+    Returns:
+        ResolutionCache: The shared cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = ResolutionCache()
+    return _cache
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    """
+    One in-flight call and the number of callers waiting on it.
+    """
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight task.
+
+    The first caller for a key starts the work; callers arriving while it runs
+    await the same task instead of starting their own. A caller that is
+    cancelled only stops waiting. The shared work is cancelled once every
+    caller waiting on it has given up.
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Initializes a group with no calls in flight.
+
+        Args:
+            name (str): A label used in logs and stats.
+        """
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Returns the result of the call in flight for a key, starting it if there is none.
+
+        Args:
+            key (Hashable): Identifies calls that can share a result.
+            factory (Callable[[], Awaitable[T]]): Starts the work when no call is in flight.
+
+        Returns:
+            T: The shared result. Exceptions raised by the work are raised to every caller.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.calls += 1
+        else:
+            self.shared += 1
+            logger.debug(f"Joined in-flight {self.name} call for {key!r}.")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Forget the call now so a new caller starts fresh work
+                # instead of joining a task that is being cancelled.
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self, key: Hashable) -> Optional[asyncio.Task]:
+        """
+        Returns the task in flight for a key.
+
+        Args:
+            key (Hashable): The key.
+
+        Returns:
+            Optional[asyncio.Task]: The task, or None if no call is in flight.
+        """
+        call = self._calls.get(key)
+        return call.task if call else None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns call counters.
+
+        Returns:
+            Dict[str, Any]: Calls in flight, calls started and callers that joined an existing call.
+        """
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "shared": self.shared,
+        }
@@ -1,15 +1,26 @@
-import logging
 import asyncio
+import logging
 import discord
-from discord import FFmpegPCMAudio
-from typing import Dict
+from typing import Any, Dict, List, Optional, Tuple
 from disk0muzik.state.guild_music_state import GuildMusicState
-from disk0muzik.utils.yt_dlp_helper import extract_youtube_info
-from disk0muzik.utils.database import add_song
+from disk0muzik.config import STREAM_CACHE_MARGIN, GAPLESS_PRELOAD, GAPLESS_UNKNOWN_PRELOAD_AFTER
+from disk0muzik.state.song import QueueEntry
+from disk0muzik.utils.song_writer import get_song_writer
+from disk0muzik.utils.audio_source import (
+    GaplessSource,
+    MeteredOpusAudio,
+    create_audio_source,
+    create_file_source,
+    prebuffer,
+)
+from disk0muzik.utils.audio_cache import get_audio_cache
+from disk0muzik.utils.ffmpeg_supervisor import get_ffmpeg_supervisor
+from disk0muzik.utils.stream_cache import get_video_id
 from disk0muzik.utils.embed_helper import (
     create_now_playing_embed,
     create_played_embed,
     create_paused_embed,
+    create_queued_embed,
     create_now_playing_from_playlist_embed,
     create_played_from_playlist_embed,
     create_skipped_embed,
@@ -18,191 +29,591 @@ from disk0muzik.utils.embed_helper import (
 
 logger = logging.getLogger(__name__)
 
-async def play_song(
-    channel: discord.TextChannel,
-    song: Dict[str, str],
-    guild_state: GuildMusicState,
-) -> None:
+def create_playing_embed(entry: QueueEntry, is_paused: bool) -> Tuple[discord.Embed, discord.ui.View]:
     """
-    Plays a song in the voice channel and manages the playback state.
+    Creates the embed for the entry that is currently playing.
 
-    :param channel: The text channel where the now playing message will be sent.
-    :param song: The song to be played.
-    :param guild_state: The current guild's music state.
+    :param entry: The playing entry.
+    :param is_paused: Whether playback is paused.
+    :return: The generated embed and view objects.
     """
-    if song is None:
-        logger.error("Cannot play an undefined song.")
-        return
-
-    song["requester_id"] = song.get(
-        "requester_id", guild_state.current_song.get("requester_id") if guild_state.current_song else None
-    )
+    if is_paused:
+        return create_paused_embed(entry.song, entry.requester)
+    if entry.from_playlist:
+        return create_now_playing_from_playlist_embed(entry.song, entry.requester, "❚❚")
+    return create_now_playing_embed(entry.song, entry.requester, "❚❚")
 
-    guild_state.current_song = song
-    guild_state.is_paused = False
-    guild_state.skip_event.clear()
-    guild_state.reset_votes()
 
-    logger.info(f"Playing song: {song['title']}")
-
-    FFMPEG_OPTIONS = {
-        "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5",
-        "options": "-vn",
-    }
+class GuildPlayer:
+    """
+    Plays a guild's queue from a single long-lived task.
+
+    Queuing songs, skipping, pausing, stopping and the end of a track are all
+    sent to the player as commands and handled one at a time by its task, so a
+    guild has exactly one playback loop and finishing a track never nests
+    another call. Track ends reported for a track that was already skipped or
+    stopped are ignored.
+
+    Tracks are played through one GaplessSource. GAPLESS_PRELOAD seconds before
+    the current track ends, or GAPLESS_UNKNOWN_PRELOAD_AFTER seconds into a
+    track of unknown length, the next track's source is opened and its first
+    frames buffered. A queued entry stays in the queue until then. Playback
+    then moves on to it between two frames, without stopping the voice client.
+    """
 
-    try:
-        # Check if the youtube_url is reachable
-        video_info = await asyncio.to_thread(extract_youtube_info, song["youtube_url"])
-        audio_url = video_info["audio_url"]
-        logger.info(f"Audio URL: {audio_url}")
-
-    except Exception as e:
-        # If the youtube_url fails, search for a new one
-        logger.error(f"Error with youtube_url, searching for a new one: {e}")
-        try:
-            video_info = await asyncio.to_thread(extract_youtube_info, song["title"] + " " + song["artist"])
-            song["youtube_url"] = video_info["audio_url"]
-            add_song(song)  # Update the database with the new youtube_url
-            audio_url = video_info["audio_url"]
-            logger.info(f"New Audio URL: {audio_url}")
-        except Exception as inner_e:
-            logger.error(f"Error finding a new youtube_url: {inner_e}")
-            await channel.send("An error occurred while playing the song.")
+    IDLE = "idle"
+    PLAYING = "playing"
+    PAUSED = "paused"
+
+    ENQUEUE = "enqueue"
+    SKIP = "skip"
+    PAUSE = "pause"
+    RESUME = "resume"
+    STOP = "stop"
+    FINISHED = "finished"
+    SWITCHED = "switched"
+
+    def __init__(self, guild_state: GuildMusicState, guild_id: Optional[int] = None) -> None:
+        """
+        Initializes an idle player; its task starts with the first command.
+
+        :param guild_state: The guild's music state.
+        :param guild_id: The guild's ID, which labels the player's ffmpeg processes.
+        """
+        self.guild_state = guild_state
+        self.guild_id = guild_id
+        self.state = self.IDLE
+        self.channel: Optional[discord.abc.Messageable] = None
+        self._commands: "asyncio.Queue[Tuple[str, tuple]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._source: Optional[MeteredOpusAudio] = None
+        self._output: Optional[GaplessSource] = None
+        # The entry taken from the queue or playlist to be played next.
+        self._upcoming: Optional[QueueEntry] = None
+        self._preload: Optional[asyncio.Task] = None
+        self._skipping = False
+        # A skip that arrived while a switch to the next track was pending.
+        self._skip_pending = False
+        self._switches = 0
+        # Identifies the source on the voice client, so stale track ends are ignored.
+        self._track = 0
+
+        self.tracks_played = 0
+        self.tracks_skipped = 0
+
+    def _send(self, command: str, *args: Any) -> None:
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+        self._commands.put_nowait((command, args))
+
+    def enqueue(
+        self, channel: discord.abc.Messageable, entries: List[QueueEntry], announce: bool = False
+    ) -> None:
+        """
+        Adds entries to the end of the queue, starting playback with the first one if idle.
+
+        :param channel: The text channel for playback messages.
+        :param entries: The entries, in order.
+        :param announce: Whether to post a queued message for entries that have to wait.
+        """
+        self._send(self.ENQUEUE, channel, entries, announce)
+
+    def skip(self) -> None:
+        """
+        Skips the current track.
+        """
+        self._send(self.SKIP)
+
+    def pause(self) -> None:
+        """
+        Pauses the current track.
+        """
+        self._send(self.PAUSE)
+
+    def resume(self) -> None:
+        """
+        Resumes the paused track.
+        """
+        self._send(self.RESUME)
+
+    def stop(self) -> None:
+        """
+        Stops playback, clears the queue and kills the guild's remaining ffmpeg processes.
+        """
+        self._send(self.STOP)
+
+    async def close(self) -> None:
+        """
+        Stops the player's task and playback.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._cancel_preload()
+        self._upcoming = None
+        self._track += 1
+        voice_client = self.guild_state.voice_client
+        if voice_client and (voice_client.is_playing() or voice_client.is_paused()):
+            voice_client.stop()
+        self.state = self.IDLE
+        if self.guild_id is not None:
+            # Nothing plays any more, so any ffmpeg still running for the guild is left over.
+            get_ffmpeg_supervisor().kill_guild(self.guild_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the player's state and track counters.
+
+        :return: State, pending commands, queue length, tracks played and skipped,
+            the current stream's CPU usage, and the guild's ffmpeg processes.
+        """
+        return {
+            "state": self.state,
+            "pending_commands": self._commands.qsize(),
+            "queued": len(self.guild_state.queue),
+            "tracks_played": self.tracks_played,
+            "tracks_skipped": self.tracks_skipped,
+            "stream": self._source.stats() if self._source else None,
+            "next_ready": self._output.has_next if self._output else False,
+            "ffmpeg": get_ffmpeg_supervisor().guild_stats(self.guild_id),
+        }
+
+    async def _run(self) -> None:
+        handlers = {
+            self.ENQUEUE: self._on_enqueue,
+            self.SKIP: self._on_skip,
+            self.PAUSE: self._on_pause,
+            self.RESUME: self._on_resume,
+            self.STOP: self._on_stop,
+            self.FINISHED: self._on_finished,
+            self.SWITCHED: self._on_switched,
+        }
+        while True:
+            command, args = await self._commands.get()
+            try:
+                await handlers[command](*args)
+            except Exception as e:
+                logger.error(f"Player failed to handle {command}: {e}")
+
+    def _track_ended(self, track: int, error: Optional[Exception]) -> None:
+        # Called by discord.py from its audio thread.
+        if error:
+            logger.error(f"Playback error: {error}")
+        self._loop.call_soon_threadsafe(self._commands.put_nowait, (self.FINISHED, (track,)))
+
+    def _track_switched(self, track: int, entry: QueueEntry) -> None:
+        # Called by the GaplessSource from the audio thread.
+        self._loop.call_soon_threadsafe(self._commands.put_nowait, (self.SWITCHED, (track, entry)))
+
+    async def _on_enqueue(
+        self, channel: discord.abc.Messageable, entries: List[QueueEntry], announce: bool
+    ) -> None:
+        self.channel = channel
+        first = None
+        if entries and self.state == self.IDLE:
+            first, entries = entries[0], entries[1:]
+
+        self.guild_state.queue.extend(entries)
+        if announce:
+            for entry in entries:
+                embed, view = create_queued_embed(entry.song, entry.requester)
+                entry.message = await channel.send(embed=embed, view=view)
+                logger.info(f"Queued song: {entry.song.title}")
+
+        if first is None:
+            output = self._output
+            switched = output is not None and output.switches != self._switches
+            if self._upcoming and self._upcoming.from_playlist and entries and not switched:
+                # Queued songs go before the playlist song that was lined up, unless it already started.
+                self._cancel_preload()
+                self.guild_state.queue.append(self._upcoming)
+                self._upcoming = None
+            if self.state != self.IDLE and self._upcoming is None and not self._preloading:
+                self._schedule_preload()
+            self.guild_state.prefetch_next_song()
+        elif not await self._start(first) and self.guild_state.queue:
+            await self._advance(first)
+
+    async def _on_finished(self, track: int) -> None:
+        if track != self._track or self.state == self.IDLE:
             return
+        self._cancel_preload()
+        self._output = None
+        previous = await self._finish(is_skipped=self._skipping)
+        await self._advance(previous)
 
-    guild_state.voice_client.play(
-        FFmpegPCMAudio(audio_url, **FFMPEG_OPTIONS),
-        after=lambda e: guild_state.skip_event.set(),
-    )
-
-    if song.get("from_playlist", False):
-        embed, view = create_now_playing_from_playlist_embed(song, song["requester"], "❚❚")
-    else:
-        embed, view = create_now_playing_embed(song, song["requester"], "❚❚")
-
-    guild_state.now_playing_message = await (
-        song.get("message").edit(embed=embed, view=view)
-        if song.get("message")
-        else channel.send(embed=embed, view=view)
-    )
-    song["message"] = guild_state.now_playing_message
+    async def _on_switched(self, track: int, entry: QueueEntry) -> None:
+        if track != self._track:
+            return
+        self._switches += 1
+        previous = await self._finish(is_skipped=self._skipping)
+        if self._upcoming is entry:
+            self._upcoming = None
+        if entry.requester_id is None and previous:
+            entry.requester_id = previous.requester_id
+        self.guild_state.current_song = entry
+        self.guild_state.reset_votes()
+        logger.info(f"Playing song: {entry.song.title}")
+        await self._now_playing(entry, self._output.current)
+        if self._skip_pending:
+            self._skip_pending = False
+            await self._on_skip()
+
+    async def _on_skip(self) -> None:
+        if self.state == self.IDLE or self._skipping:
+            return
+        output = self._output
+        if output and output.switches != self._switches:
+            # The next track has already started; skip it once the switch is handled.
+            self._skip_pending = True
+            return
 
-    await guild_state.skip_event.wait()
-    await handle_song_finished(channel, guild_state, is_skipped=True)
+        self._skipping = True
+        if output and output.skip():
+            # The switch to the buffered next track finishes the skipped one.
+            if self.state == self.PAUSED:
+                self.guild_state.voice_client.resume()
+                self.state = self.PLAYING
+                self.guild_state.is_paused = False
+            logger.info("Skipped song.")
+            return
 
+        self._track += 1
+        self._cancel_preload()
+        self._output = None
+        self.guild_state.voice_client.stop()
+        previous = await self._finish(is_skipped=True)
+        logger.info("Skipped song.")
+        await self._advance(previous)
+
+    async def _on_pause(self) -> None:
+        voice_client = self.guild_state.voice_client
+        if self.state != self.PLAYING or not voice_client.is_playing():
+            return
+        voice_client.pause()
+        self.state = self.PAUSED
+        self.guild_state.is_paused = True
+        self.guild_state.reset_votes()
+        await self._redraw()
+        logger.info("Paused song.")
+
+    async def _on_resume(self) -> None:
+        if self.state != self.PAUSED:
+            return
+        self.guild_state.voice_client.resume()
+        self.state = self.PLAYING
+        self.guild_state.is_paused = False
+        self.guild_state.reset_votes()
+        await self._redraw()
+        logger.info("Resumed song.")
+
+    async def _on_stop(self) -> None:
+        self._track += 1
+        self._skip_pending = False
+        self._cancel_preload()
+        self._upcoming = None
+        self._output = None
+        voice_client = self.guild_state.voice_client
+        if voice_client and (voice_client.is_playing() or voice_client.is_paused()):
+            voice_client.stop()
+        if self.guild_state.current_song:
+            await self._finish(is_skipped=True)
+        self.guild_state.reset_state()
+        self.state = self.IDLE
+        if self.guild_id is not None:
+            # E.g. after a voice disconnect, nothing is left to read from them.
+            get_ffmpeg_supervisor().kill_guild(self.guild_id)
+        logger.info("Stopped playback.")
+
+    async def _advance(self, previous: Optional[QueueEntry]) -> None:
+        """
+        Starts the next queued entry, else the next playlist song, else goes idle.
+        """
+        while True:
+            entry, self._upcoming = self._upcoming, None
+            if entry is None:
+                entry = await self._take_next_entry()
+            if entry is None:
+                break
+
+            if entry.requester_id is None and previous:
+                entry.requester_id = previous.requester_id
+            if await self._start(entry):
+                return
+            # A broken playlist song ends playback; broken queued songs are passed over.
+            if not self.guild_state.queue:
+                break
+
+        self.state = self.IDLE
+        self._skipping = False
+        self.guild_state.prefetcher.cancel()
+
+    async def _take_next_entry(self) -> Optional[QueueEntry]:
+        """
+        Removes and returns the next queued entry, else the next playlist song.
+        """
+        if self.guild_state.queue:
+            entry = self.guild_state.queue.pop(0)
+            logger.info(f"Next song from queue: {entry.song.title}")
+            return entry
+        logger.info("Queue is empty, selecting the next song from the playlist.")
+        return await self.guild_state.get_next_song()
+
+    async def _start(self, entry: QueueEntry) -> bool:
+        """
+        Starts playing an entry on a new output and posts its now playing message.
+
+        :return: False if no playable stream was found.
+        """
+        guild_state = self.guild_state
+        guild_state.current_song = entry
+        guild_state.is_paused = False
+        guild_state.reset_votes()
+
+        logger.info(f"Playing song: {entry.song.title}")
+        source = await self._open_source(entry)
+        if source is None:
+            guild_state.current_song = None
+            await self.channel.send("An error occurred while playing the song.")
+            return False
+
+        self._track += 1
+        track = self._track
+        self._switches = 0
+        self._skip_pending = False
+        self._output = GaplessSource(source, on_switch=lambda next_entry: self._track_switched(track, next_entry))
+        guild_state.voice_client.play(self._output, after=lambda e: self._track_ended(track, e))
+        await self._now_playing(entry, source)
+        return True
+
+    async def _now_playing(self, entry: QueueEntry, source: MeteredOpusAudio) -> None:
+        """
+        Records that an entry started playing, lines up the next one and posts the now playing message.
+        """
+        guild_state = self.guild_state
+        self._source = source
+        self._skipping = False
+        self.state = self.PLAYING
+        guild_state.is_paused = False
+        self.tracks_played += 1
+        self._record_play(entry, source)
+        self._schedule_preload()
+        guild_state.prefetch_next_song()
+
+        shown = entry.song
+        embed, view = create_playing_embed(entry, is_paused=False)
+        guild_state.now_playing_message = await (
+            entry.message.edit(embed=embed, view=view)
+            if entry.message
+            else self.channel.send(embed=embed, view=view)
+        )
+        entry.message = guild_state.now_playing_message
+        if entry.song is not shown:
+            # The song's metadata arrived while the message was being sent.
+            await refresh_entry_message(entry, guild_state)
+
+    @property
+    def _preloading(self) -> bool:
+        return self._preload is not None and not self._preload.done()
+
+    def _schedule_preload(self) -> None:
+        self._cancel_preload()
+        self._preload = asyncio.create_task(self._preload_next(self._track, self._output))
+
+    def _cancel_preload(self) -> None:
+        if self._preload is not None:
+            self._preload.cancel()
+            self._preload = None
+        if self._output is not None:
+            self._output.clear_next()
+
+    async def _preload_next(self, track: int, output: GaplessSource) -> None:
+        """
+        Opens the next entry's source shortly before the current track ends and hands it to the output.
+        """
+        duration = self._source.duration if self._source else None
+        if duration:
+            while duration - output.elapsed > GAPLESS_PRELOAD:
+                await asyncio.sleep(duration - output.elapsed - GAPLESS_PRELOAD)
+        else:
+            # Short tracks of unknown length end before this and start the next one cold.
+            while output.elapsed < GAPLESS_UNKNOWN_PRELOAD_AFTER:
+                await asyncio.sleep(GAPLESS_UNKNOWN_PRELOAD_AFTER - output.elapsed)
+
+        queue = self.guild_state.queue
+        if self._upcoming is None and queue:
+            # Left in the queue, where it can still be shown and updated, until it is handed over.
+            entry = queue[0]
+        else:
+            if self._upcoming is None:
+                logger.info("Queue is empty, selecting the next song from the playlist.")
+                self._upcoming = await self.guild_state.get_next_song()
+            entry = self._upcoming
+        if entry is None:
+            return
 
-async def handle_song_finished(
-    channel: discord.TextChannel, guild_state: GuildMusicState, is_skipped: bool = False
-) -> None:
-    """
-    Handles the cleanup after a song finishes playing and queues the next song.
+        source = await self._open_source(entry)
+        if source is None:
+            # Left to the regular start after this track, which reports the failure.
+            return
+        try:
+            frames = await prebuffer(source)
+        except BaseException:
+            source.cleanup()
+            raise
+        if track != self._track or output is not self._output:
+            source.cleanup()
+            return
+        if entry is not self._upcoming:
+            if not queue or queue[0] is not entry:
+                # The queue changed while the source was opening.
+                source.cleanup()
+                return
+            self._upcoming = queue.pop(0)
+        output.queue_next(source, frames, entry)
+        logger.info(f"Lined up {entry.song.title} with {len(frames)} frames buffered.")
+
+    async def _open_source(self, entry: QueueEntry) -> Optional[MeteredOpusAudio]:
+        """
+        Opens an entry's audio from the local audio cache, else from its stream.
+
+        :return: The audio source, or None if nothing playable was found.
+        """
+        song = entry.song
+        audio_cache = get_audio_cache()
+        video_id = get_video_id(song.youtube_url)
+        path = audio_cache.get(video_id) if video_id else None
+        if path:
+            entry.stream = None
+            try:
+                logger.info(f"Playing {song.title} from the audio cache")
+                return await create_file_source(path, guild=self.guild_id, duration=audio_cache.duration(video_id))
+            except Exception as e:
+                logger.error(f"Error opening cached audio for {song.title}: {e}")
+
+        audio_info = entry.take_stream(STREAM_CACHE_MARGIN)
+        if audio_info is None:
+            audio_info, resolved = await self.guild_state.prefetcher.resolve(song)
+            if resolved is not song:
+                entry.song = resolved
+        else:
+            logger.info(f"Using the stream resolved with the request for {song.title}")
+        if audio_info is None:
+            logger.error(f"Error finding a new youtube_url for {song.title}")
+            return None
 
-    :param channel: The text channel where the now playing message was sent.
-    :param guild_state: The current guild's music state.
-    :param is_skipped: A boolean indicating whether the song was skipped.
-    """
-    logger.info(f"Song finished: {guild_state.current_song}")
-    if guild_state.current_song:
-        if guild_state.current_song.get("from_playlist", False):
-            if is_skipped:
-                embed = create_skipped_from_playlist_embed(guild_state.current_song, guild_state.current_song["requester"])
+        logger.info(f"Audio URL: {audio_info['audio_url']}")
+        try:
+            return await create_audio_source(audio_info, guild=self.guild_id)
+        except Exception as e:
+            logger.error(f"Error starting ffmpeg for {song.title}: {e}")
+            return None
+
+    def _record_play(self, entry: QueueEntry, source: MeteredOpusAudio) -> None:
+        """
+        Counts a streamed track towards the audio cache once it has started playing.
+        """
+        audio_info = getattr(source, "audio_info", None)
+        if audio_info is None:
+            # Played from the audio cache.
+            return
+        video_id = get_video_id(audio_info.get("video_url")) or get_video_id(entry.song.youtube_url)
+        if video_id:
+            get_audio_cache().record_play(video_id, audio_info)
+
+    async def _finish(self, is_skipped: bool) -> Optional[QueueEntry]:
+        """
+        Marks the current entry as played or skipped and stores its song.
+
+        :return: The finished entry.
+        """
+        guild_state = self.guild_state
+        entry = guild_state.current_song
+        logger.info(f"Song finished: {entry.song.title if entry else None}")
+        if self._source:
+            logger.info(f"Stream stats: {self._source.stats()}")
+            self._source = None
+        if entry is None:
+            return None
+
+        if is_skipped:
+            self.tracks_skipped += 1
+            if entry.from_playlist:
+                embed = create_skipped_from_playlist_embed(entry.song, entry.requester)
             else:
-                embed = create_played_from_playlist_embed(guild_state.current_song, guild_state.current_song["requester"])
+                embed = create_skipped_embed(entry.song, entry.requester)
         else:
-            if is_skipped:
-                embed = create_skipped_embed(guild_state.current_song, guild_state.current_song["requester"])
+            if entry.from_playlist:
+                embed = create_played_from_playlist_embed(entry.song, entry.requester)
             else:
-                embed = create_played_embed(guild_state.current_song, guild_state.current_song["requester"])
-        
+                embed = create_played_embed(entry.song, entry.requester)
+
         if guild_state.now_playing_message:
-            await guild_state.now_playing_message.edit(embed=embed, view=None)
-        
-        add_song(guild_state.current_song)
-        guild_state.current_song = None
+            try:
+                await guild_state.now_playing_message.edit(embed=embed, view=None)
+            except discord.HTTPException as e:
+                logger.error(f"Failed to edit message: {e}")
 
-    next_song = None
-    async with guild_state.lock:
-        if guild_state.queue:
-            next_song = guild_state.queue.pop(0)
-            logger.info(f"Next song from queue: {next_song['title']}")
+        get_song_writer().enqueue(entry.song)
+        guild_state.current_song = None
+        guild_state.is_paused = False
+        return entry
 
-    if next_song:
-        await play_song(channel, next_song, guild_state)
-    else:
-        logger.info("Queue is empty, selecting the next song from the playlist.")
-        next_song = guild_state.get_next_song()
-        if next_song:
-            next_song["message"] = None
-            next_song["from_playlist"] = True  # Mark that this song is from the playlist
-            await play_song(channel, next_song, guild_state)
+    async def _redraw(self) -> None:
+        entry = self.guild_state.current_song
+        if entry is None or self.guild_state.now_playing_message is None:
+            return
+        embed, view = create_playing_embed(entry, self.guild_state.is_paused)
+        try:
+            await self.guild_state.now_playing_message.edit(embed=embed, view=view)
+        except discord.HTTPException as e:
+            logger.error(f"Failed to edit message: {e}")
 
 
-async def handle_skip_vote(
-    interaction: discord.Interaction, guild_state: GuildMusicState
-) -> None:
+async def refresh_entry_message(entry: QueueEntry, guild_state: GuildMusicState) -> None:
     """
-    Handles the skip vote from a user and checks if the skip threshold is reached.
+    Redraws the message of a queued or playing entry, e.g. after its song's metadata changed.
 
-    :param interaction: The interaction object representing the vote.
+    :param entry: The queue entry.
     :param guild_state: The current guild's music state.
     """
-    user_id = interaction.user.id
-
-    if user_id == guild_state.current_song["requester_id"]:
-        guild_state.skip_event.set()
-        await handle_song_finished(interaction.channel, guild_state, is_skipped=True)
+    if entry.message is None:
         return
 
-    guild_state.add_skip_vote(user_id)
-
-    skip_reaction = "⏭️"
-    await guild_state.now_playing_message.add_reaction(skip_reaction)
+    if entry is guild_state.current_song:
+        embed, view = create_playing_embed(entry, guild_state.is_paused)
+    elif any(queued is entry for queued in guild_state.queue):
+        embed, view = create_queued_embed(entry.song, entry.requester)
+    else:
+        # Finished entries keep their final message.
+        return
 
-    if len(guild_state.skip_votes) >= 2:
-        guild_state.skip_event.set()
-        await handle_song_finished(interaction.channel, guild_state, is_skipped=True)
+    try:
+        await entry.message.edit(embed=embed, view=view)
+    except discord.HTTPException as e:
+        logger.error(f"Failed to edit message: {e}")
 
 
-async def handle_pause_vote(
-    interaction: discord.Interaction, guild_state: GuildMusicState
-) -> None:
+async def apply_enrichment(entry: QueueEntry, guild_state: GuildMusicState) -> None:
     """
-    Handles the pause vote from a user and checks if the pause threshold is reached.
+    Waits for an entry's song metadata to be matched and shows it in the entry's message.
 
-    :param interaction: The interaction object representing the vote.
+    :param entry: The queue entry with an enrichment task.
     :param guild_state: The current guild's music state.
     """
-    user_id = interaction.user.id
-
-    if user_id == guild_state.current_song["requester_id"]:
-        if guild_state.voice_client.is_playing():
-            guild_state.voice_client.pause()
-            guild_state.is_paused = True
-            embed, view = create_paused_embed(
-                guild_state.current_song,
-                guild_state.current_song["requester"],
-            )
-            try:
-                await guild_state.now_playing_message.edit(embed=embed, view=view)
-            except discord.HTTPException as e:
-                logger.error(f"Failed to edit message: {e}")
+    if entry.enrichment is None:
+        return
+    song = await entry.enrichment
+    entry.enrichment = None
+    if song is entry.song:
         return
 
-    guild_state.add_pause_vote(user_id)
-
-    pause_reaction = "⏸️"
-    await guild_state.now_playing_message.add_reaction(pause_reaction)
-
-    if len(guild_state.pause_votes) >= 2:
-        try:
-            if guild_state.voice_client.is_playing():
-                guild_state.voice_client.pause()
-                guild_state.is_paused = True
-                embed, view = create_paused_embed(
-                    guild_state.current_song,
-                    guild_state.current_song["requester"],
-                )
-                await guild_state.now_playing_message.edit(embed=embed, view=view)
-        except Exception as e:
-            logger.error(f"Failed to pause playback on vote: {e}")
-            await interaction.channel.send("An error occurred while processing pause vote.")
+    logger.info(f"Matched {entry.song.title} to {song.title} by {song.artist}")
+    entry.song = song
+    await refresh_entry_message(entry, guild_state)
@@ -1,17 +1,329 @@
-import logging
 import asyncio
-from typing import Optional, Dict
-from disk0muzik.utils.spotify_helper import search_spotify
-from disk0muzik.utils.yt_dlp_helper import extract_youtube_info
-from disk0muzik.utils.database import get_song, add_song
+import logging
+import re
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+from disk0muzik.config import SPOTIFY_RESOLVE_CONCURRENCY, MULTI_QUERY_CONCURRENCY
+from disk0muzik.utils.spotify_helper import (
+    get_spotify_tracks,
+    iter_spotify_collection,
+    parse_spotify_url,
+    search_spotify,
+)
+from disk0muzik.utils.stream_cache import get_expires_at, get_stream_info, get_video_id
+from disk0muzik.utils.yt_dlp_helper import is_youtube_playlist
+from disk0muzik.utils.extraction_service import ExtractionError, get_extraction_service
+from disk0muzik.utils.upstream import CircuitOpenError, UpstreamUnavailable, get_upstream
+from disk0muzik.utils.database import get_song
+from disk0muzik.utils.song_writer import get_song_writer
+from disk0muzik.utils.resolution_cache import get_resolution_cache, normalize_query
+from disk0muzik.utils.single_flight import SingleFlight
+from disk0muzik.state.song import Song, QueueEntry
+from disk0muzik.state.song_catalog import get_catalog
 
 logger = logging.getLogger(__name__)
 
+_QUERY_SEPARATOR = re.compile(r"[;\n]")
+
+# Concurrent requests for the same song share one resolution at every stage:
+# whole queries by normalized text, video ID or Spotify track ID, Spotify
+# searches by normalized text and database lookups by Spotify ID.
+_queries = SingleFlight("song query")
+_searches = SingleFlight("spotify search")
+_lookups = SingleFlight("song lookup")
+
+
+async def find_existing_song(spotify_id: str) -> Optional[Song]:
+    """
+    Looks up a known song, checking unwritten songs and the shared catalog before the database.
+
+    Parameters:
+        spotify_id (str): The Spotify ID of the song.
+
+    Returns:
+        Optional[Song]: The stored song or None if the song is unknown.
+    """
+    song = get_song_writer().pending(spotify_id) or get_catalog().get(spotify_id)
+    if song:
+        return song
+    return await _lookups.do(spotify_id, lambda: get_song(spotify_id))
+
+
+async def search_spotify_shared(query: str) -> Optional[Dict[str, str]]:
+    """
+    Searches Spotify, sharing the search with concurrent callers for the same normalized query.
+
+    Parameters:
+        query (str): The search query.
+
+    Returns:
+        Optional[Dict[str, str]]: The track details or None if no track is found.
+    """
+    key = normalize_query(query) or query
+    return await _searches.do(key, lambda: search_spotify(query))
+
+
+async def resolve_youtube_url(query: str, requester: str) -> Optional[Tuple[Song, Dict[str, str]]]:
+    """
+    Resolves a YouTube URL to a playable song from the video alone.
+
+    The song carries the video's own title and channel and no Spotify ID until
+    enrich_youtube_song has matched it.
+
+    Parameters:
+        query (str): The YouTube URL.
+        requester (str): The name of the user requesting the song.
+
+    Returns:
+        Optional[Tuple[Song, Dict[str, str]]]: The song and the stream info extracted for it,
+        or None if the URL could not be resolved.
+    """
+    logger.info(f"Processing YouTube URL: {query}")
+    video_info = await get_stream_info(query)
+    if not video_info:
+        logger.error("Couldn't extract video info from YouTube URL.")
+        return None
+
+    song = Song(
+        spotify_id="",
+        title=video_info["title"],
+        artist=video_info.get("artist") or "YouTube",
+        thumbnail=video_info.get("thumbnail"),
+        youtube_url=video_info["video_url"],
+        requester=requester,
+    )
+    return song, video_info
+
+
+async def enrich_youtube_song(song: Song, requester: str) -> Song:
+    """
+    Matches a song resolved from a YouTube video against Spotify and the song catalog,
+    storing new matches.
+
+    Parameters:
+        song (Song): The song from resolve_youtube_url.
+        requester (str): The name of the user requesting the song.
+
+    Returns:
+        Song: The matched song, or the given song if there is no match.
+    """
+    try:
+        spotify_result = await search_spotify_shared(song.title)
+        if not spotify_result:
+            logger.info(f"No Spotify match for YouTube video {song.title}.")
+            return song
+
+        existing = await find_existing_song(spotify_result["spotify_id"])
+        if existing and existing.youtube_url:
+            logger.info(f"Using existing song from the database: {existing.title}")
+            return existing
+
+        enriched = Song(
+            spotify_id=spotify_result["spotify_id"],
+            title=spotify_result["title"],
+            artist=spotify_result["artist"],
+            thumbnail=spotify_result["album_art"],
+            youtube_url=song.youtube_url,
+            requester=requester,
+        )
+        get_song_writer().enqueue(enriched)
+        return enriched
+    except Exception as e:
+        logger.error(f"Error enriching YouTube video {song.title}: {e}")
+        return song
+
+
+async def resolve_text_query(query: str, requester: str) -> Optional[Song]:
+    """
+    Resolves a text query to a song through the resolution cache, the local song catalog,
+    Spotify and YouTube.
+
+    Parameters:
+        query (str): The text query.
+        requester (str): The name of the user requesting the song.
+
+    Returns:
+        Optional[Song]: The song or None if it could not be resolved.
+    """
+    resolution_cache = get_resolution_cache()
+    spotify_id = await resolution_cache.get(query)
+    song = await find_existing_song(spotify_id) if spotify_id else None
+    if song and song.youtube_url:
+        logger.info(f"Resolved query from cache: {query} -> {song.title}")
+        return song
+
+    song = get_catalog().search(query)
+    if song and song.youtube_url:
+        logger.info(f"Resolved query from the song catalog: {query} -> {song.title}")
+        resolution_cache.put(query, song.spotify_id)
+        return song
+
+    logger.info(f"Searching Spotify for query: {query}")
+    spotify_result = await search_spotify_shared(query)
+    if not spotify_result:
+        logger.error("Couldn't find the song on Spotify.")
+        return None
+    resolution_cache.put(query, spotify_result["spotify_id"])
+    return await resolve_spotify_result(spotify_result, requester)
+
+
+async def resolve_spotify_result(spotify_result: Dict[str, str], requester: str) -> Optional[Song]:
+    """
+    Resolves Spotify track details to a song, searching YouTube only if the song is not known yet.
+
+    Parameters:
+        spotify_result (Dict[str, str]): The Spotify track details.
+        requester (str): The name of the user requesting the song.
+
+    Returns:
+        Optional[Song]: The song or None if it could not be found on YouTube.
+    """
+    song = await find_existing_song(spotify_result["spotify_id"])
+    if song and song.youtube_url:
+        logger.info(f"Using existing YouTube URL from the database: {song.youtube_url}")
+        return song
+
+    youtube_info = await get_stream_info(f"{spotify_result['artist']} {spotify_result['title']}")
+    if not youtube_info:
+        logger.error(f"Couldn't find {spotify_result['title']} on YouTube.")
+        return None
+
+    song = Song(
+        spotify_id=spotify_result["spotify_id"],
+        title=spotify_result["title"],
+        artist=spotify_result["artist"],
+        thumbnail=spotify_result["album_art"],
+        youtube_url=youtube_info["video_url"],
+        requester=requester,
+    )
+    get_song_writer().enqueue(song)
+    return song
+
+
+async def resolve_spotify_track(spotify_id: str, requester: str) -> Optional[Song]:
+    """
+    Resolves a Spotify track ID to a song, asking Spotify only if the song is not known yet.
+
+    Parameters:
+        spotify_id (str): The Spotify track ID.
+        requester (str): The name of the user requesting the song.
+
+    Returns:
+        Optional[Song]: The song or None if it could not be resolved.
+    """
+    song = await find_existing_song(spotify_id)
+    if song and song.youtube_url:
+        return song
+
+    tracks = await get_spotify_tracks([spotify_id])
+    if not tracks:
+        logger.error(f"Couldn't find Spotify track {spotify_id}.")
+        return None
+    return await resolve_spotify_result(tracks[0], requester)
+
+
+async def process_spotify_collection(
+    kind: str, collection_id: str, requester: str, requester_id: int
+) -> AsyncIterator[QueueEntry]:
+    """
+    Resolves a Spotify album or playlist, yielding queue entries in collection order as they resolve.
+
+    Up to SPOTIFY_RESOLVE_CONCURRENCY tracks are resolved at once while track
+    pages are still being fetched, so the first entry is available long before
+    a large playlist is fully resolved. Tracks that cannot be resolved are skipped.
+
+    Parameters:
+        kind (str): ``album`` or ``playlist``.
+        collection_id (str): The Spotify album or playlist ID.
+        requester (str): The name of the user requesting the collection.
+        requester_id (int): The ID of the user requesting the collection.
+
+    Yields:
+        QueueEntry: The next resolved entry.
+    """
+    slots = asyncio.Semaphore(SPOTIFY_RESOLVE_CONCURRENCY)
+    # Resolving runs at most this far ahead of the entry that is yielded next.
+    window = SPOTIFY_RESOLVE_CONCURRENCY * 2
+    pending: Deque[asyncio.Task] = deque()
+
+    async def resolve(spotify_result: Dict[str, str]) -> Optional[Song]:
+        async with slots:
+            try:
+                key = ("track", spotify_result["spotify_id"])
+                return await _queries.do(key, lambda: resolve_spotify_result(spotify_result, requester))
+            except Exception as e:
+                logger.error(f"Error resolving {spotify_result['title']}: {e}")
+                return None
+
+    try:
+        try:
+            async for spotify_result in iter_spotify_collection(kind, collection_id):
+                pending.append(asyncio.create_task(resolve(spotify_result)))
+                while pending and (pending[0].done() or len(pending) >= window):
+                    song = await pending.popleft()
+                    if song:
+                        yield QueueEntry(song=song, requester=requester, requester_id=requester_id)
+        except Exception as e:
+            logger.error(f"Error fetching Spotify {kind} {collection_id}: {e}")
+
+        while pending:
+            song = await pending.popleft()
+            if song:
+                yield QueueEntry(song=song, requester=requester, requester_id=requester_id)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def process_youtube_playlist(
+    url: str, requester: str, requester_id: int
+) -> List[QueueEntry]:
+    """
+    Creates queue entries for every video of a YouTube playlist or mix with one flat extraction.
+
+    Streams are not resolved here; each entry is resolved like any other queued
+    song once it is next in line.
+
+    Parameters:
+        url (str): The playlist or mix URL.
+        requester (str): The name of the user requesting the playlist.
+        requester_id (int): The ID of the user requesting the playlist.
+
+    Returns:
+        List[QueueEntry]: The entries in playlist order, empty if the playlist could not be read.
+    """
+    try:
+        videos = await get_upstream("youtube").call(
+            lambda: get_extraction_service().extract_playlist(url)
+        )
+    except (CircuitOpenError, UpstreamUnavailable, ExtractionError) as e:
+        logger.error(f"Couldn't read YouTube playlist {url}: {e}")
+        return []
+
+    entries = []
+    for video in videos or []:
+        # Playlist videos have no Spotify match, so they are played but not stored.
+        song = Song(
+            spotify_id="",
+            title=video["title"],
+            artist=video["artist"],
+            thumbnail=video["thumbnail"],
+            youtube_url=video["video_url"],
+            requester=requester,
+        )
+        entries.append(QueueEntry(song=song, requester=requester, requester_id=requester_id))
+    logger.info(f"Read {len(entries)} videos from YouTube playlist {url}")
+    return entries
+
+
 async def process_song_query(
     query: str, requester: str, requester_id: int
-) -> Optional[Dict[str, str]]:
+) -> Optional[QueueEntry]:
     """
-    Processes a song query by searching Spotify and YouTube, and returns song details.
+    Processes a song query by searching Spotify and YouTube, and returns a queue entry.
+
+    Concurrent calls for the same query share one resolution; each caller still
+    gets its own queue entry.
  
     Parameters:
         query (str): The query string to search for the song.
@@ -19,75 +331,119 @@ async def process_song_query(
         requester_id (int): The ID of the user requesting the song.
  
     Returns:
-        Optional[Dict[str, str]]: A dictionary containing song details or None if the song could not be found.
+        Optional[QueueEntry]: A queue entry for the song or None if the song could not be found.
     """
     try:
-        if "youtube.com" in query or "youtu.be" in query:
-            logger.info(f"Processing YouTube URL: {query}")
-            video_info = await asyncio.to_thread(extract_youtube_info, query)
-            if not video_info:
-                logger.error("Couldn't extract video info from YouTube URL.")
-                return None
+        stream = None
+        enrichment = None
+        spotify_link = parse_spotify_url(query)
+        if spotify_link and spotify_link[0] == "track":
+            spotify_id = spotify_link[1]
+            song = await _queries.do(
+                ("track", spotify_id), lambda: resolve_spotify_track(spotify_id, requester)
+            )
+        elif "youtube.com" in query or "youtu.be" in query:
+            key = ("video", get_video_id(query) or query)
+            resolved = await _queries.do(key, lambda: resolve_youtube_url(query, requester))
+            song, stream = resolved or (None, None)
+            if song:
+                # Matching the video against Spotify does not hold up playback.
+                provisional = song
+                enrichment = asyncio.create_task(
+                    _queries.do(("enrich", key[1]), lambda: enrich_youtube_song(provisional, requester))
+                )
+        else:
+            key = ("search", normalize_query(query) or query)
+            song = await _queries.do(key, lambda: resolve_text_query(query, requester))
 
-            spotify_result = await asyncio.to_thread(search_spotify, video_info["title"])
-            if not spotify_result:
-                logger.error("Couldn't find the song on Spotify.")
-                return None
+        if song is None:
+            return None
+        entry = QueueEntry(
+            song=song, requester=requester, requester_id=requester_id, enrichment=enrichment
+        )
+        if stream:
+            # Playback starts from the stream extracted during resolution.
+            entry.stream = stream
+            entry.stream_expires_at = get_expires_at(stream)
+        return entry
+
+    except Exception as e:
+        logger.error(f"Error processing song query: {e}")
+        return None
+
+
+def split_queries(text: str) -> List[str]:
+    """
+    Splits a message into song queries separated by semicolons or newlines.
+
+    Parameters:
+        text (str): The message text.
+
+    Returns:
+        List[str]: The non-empty queries in message order.
+    """
+    return [query.strip() for query in _QUERY_SEPARATOR.split(text) if query.strip()]
+
+
+def is_collection_link(query: str) -> bool:
+    """
+    Checks whether a query is a Spotify album or playlist link or a YouTube playlist link.
+
+    Parameters:
+        query (str): The query.
+
+    Returns:
+        bool: True if the query names a collection rather than a single song.
+    """
+    spotify_link = parse_spotify_url(query)
+    if spotify_link and spotify_link[0] in ("album", "playlist"):
+        return True
+    return is_youtube_playlist(query)
 
-            existing_song = get_song(spotify_result["spotify_id"])
-            if existing_song:
-                logger.info(f"Using existing YouTube URL from the database: {existing_song['youtube_url']}")
-                youtube_url = existing_song["youtube_url"]
-            else:
-                youtube_url = video_info["video_url"]
-
-            song = {
-                "spotify_id": spotify_result["spotify_id"],
-                "title": spotify_result["title"],
-                "artist": spotify_result["artist"],
-                "thumbnail": spotify_result["album_art"],
-                "youtube_url": youtube_url,
-                "requester": requester,
-                "requester_id": requester_id,
-            }
-
-            add_song(song)
 
+def group_queries(queries: List[str]) -> List[List[str]]:
+    """
+    Groups queries into runs of song queries, giving each collection link a group of its own.
+
+    Parameters:
+        queries (List[str]): The queries in message order.
+
+    Returns:
+        List[List[str]]: The groups in message order.
+    """
+    groups: List[List[str]] = []
+    songs: List[str] = []
+    for query in queries:
+        if is_collection_link(query):
+            if songs:
+                groups.append(songs)
+                songs = []
+            groups.append([query])
         else:
-            logger.info(f"Searching Spotify for query: {query}")
-            spotify_result = await asyncio.to_thread(search_spotify, query)
-            if not spotify_result:
-                logger.error("Couldn't find the song on Spotify.")
-                return None
+            songs.append(query)
+    if songs:
+        groups.append(songs)
+    return groups
 
-            existing_song = get_song(spotify_result["spotify_id"])
-            if existing_song:
-                logger.info(f"Using existing YouTube URL from the database: {existing_song['youtube_url']}")
-                youtube_url = existing_song["youtube_url"]
-            else:
-                youtube_info = await asyncio.to_thread(
-                    extract_youtube_info,
-                    f"{spotify_result['artist']} {spotify_result['title']}",
-                )
-                if not youtube_info:
-                    logger.error("Couldn't find the song on YouTube.")
-                    return None
-                youtube_url = youtube_info["video_url"]
-
-            song = {
-                "spotify_id": spotify_result["spotify_id"],
-                "title": spotify_result["title"],
-                "artist": spotify_result["artist"],
-                "thumbnail": spotify_result["album_art"],
-                "youtube_url": youtube_url,
-                "requester": requester,
-                "requester_id": requester_id,
-            }
-
-            add_song(song)
 
-        return song
+async def process_song_queries(
+    queries: List[str], requester: str, requester_id: int
+) -> List[Optional[QueueEntry]]:
+    """
+    Processes several song queries concurrently, at most MULTI_QUERY_CONCURRENCY at a time.
 
-    except Exception as e:
-        logger.error(f"Error processing song query: {e}")
-        return None
+    Parameters:
+        queries (List[str]): The queries.
+        requester (str): The name of the user requesting the songs.
+        requester_id (int): The ID of the user requesting the songs.
+
+    Returns:
+        List[Optional[QueueEntry]]: One result per query in the original order, None where a query failed.
+    """
+    slots = asyncio.Semaphore(MULTI_QUERY_CONCURRENCY)
+
+    async def process(query: str) -> Optional[QueueEntry]:
+        async with slots:
+            return await process_song_query(query, requester, requester_id)
+
+    return list(await asyncio.gather(*(process(query) for query in queries)))
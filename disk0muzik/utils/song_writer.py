@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from disk0muzik.config import SONG_WRITE_BATCH_SIZE, SONG_WRITE_FLUSH_INTERVAL
+from disk0muzik.state.song import Song
+from disk0muzik.utils.database import add_songs
+
+logger = logging.getLogger(__name__)
+
+
+class SongWriter:
+    """
+    Write-behind queue for song catalog upserts.
+
+    Songs from every guild are collected in memory, coalesced by Spotify ID and
+    flushed to the database in batches, either when ``batch_size`` songs are
+    pending or every ``flush_interval`` seconds, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = SONG_WRITE_BATCH_SIZE,
+        flush_interval: float = SONG_WRITE_FLUSH_INTERVAL,
+    ) -> None:
+        """
+        Initializes an empty, stopped writer.
+
+        Args:
+            batch_size (int): The number of pending songs that triggers a flush.
+            flush_interval (float): The maximum number of seconds a song waits before being flushed.
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Tuple[Tuple[str, ...], bool]] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_listeners: List[Callable[[], None]] = []
+
+        self.enqueued = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+
+    def start(self) -> None:
+        """
+        Starts the background flush task.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def add_flush_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Registers a callback invoked after a flush that changed at least one row.
+
+        Args:
+            listener (Callable[[], None]): The callback.
+        """
+        self._flush_listeners.append(listener)
+
+    def enqueue(self, song: Song, replace_url: bool = False) -> None:
+        """
+        Queues a song upsert without waiting for the database.
+
+        Songs without a Spotify ID, e.g. tracks queued from a YouTube playlist,
+        are not stored.
+
+        Args:
+            song (Song): The song.
+            replace_url (bool): Overwrite the stored youtube_url even if present.
+        """
+        if not song.spotify_id:
+            return
+        row = song.as_row()
+        previous = self._pending.get(row[0])
+        if previous and previous[1] and not replace_url:
+            # A pending URL repair wins over a plain insert of the same song.
+            return
+        self._pending[row[0]] = (row, replace_url)
+        self.enqueued += 1
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def pending(self, spotify_id: str) -> Optional[Song]:
+        """
+        Returns a song that is queued but not yet written, if any.
+
+        Args:
+            spotify_id (str): The Spotify ID of the song.
+
+        Returns:
+            Optional[Song]: The queued song, or None.
+        """
+        entry = self._pending.get(spotify_id)
+        return Song(*entry[0]) if entry else None
+
+    async def flush(self) -> int:
+        """
+        Writes up to one batch of pending songs to the database.
+
+        On failure the batch is put back in the queue, unless a newer
+        version of the same song has been queued in the meantime.
+
+        Returns:
+            int: The number of rows inserted or updated.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch = {}
+            for spotify_id in list(self._pending)[: self.batch_size]:
+                batch[spotify_id] = self._pending.pop(spotify_id)
+
+            fill_rows = [row for row, replace_url in batch.values() if not replace_url]
+            replace_rows = [row for row, replace_url in batch.values() if replace_url]
+
+            started = time.perf_counter()
+            try:
+                changed = await add_songs(fill_rows, replace_rows)
+            except asyncio.CancelledError:
+                self._requeue(batch)
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Failed to flush {len(batch)} songs: {e}")
+                self._requeue(batch)
+                return 0
+
+            latency = time.perf_counter() - started
+            self.flushes += 1
+            self.rows_written += changed
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            if changed:
+                for listener in self._flush_listeners:
+                    listener()
+            return changed
+
+    def _requeue(self, batch: Dict[str, Tuple[Tuple[str, ...], bool]]) -> None:
+        """
+        Puts an unwritten batch back, keeping any newer entries for the same songs.
+        """
+        for spotify_id, entry in batch.items():
+            self._pending.setdefault(spotify_id, entry)
+
+    async def _run(self) -> None:
+        """
+        Flushes pending songs whenever a batch fills up or the interval elapses.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self._pending:
+                failures = self.failures
+                await self.flush()
+                if self.failures != failures:
+                    break
+
+    async def close(self) -> None:
+        """
+        Stops the background task and writes everything still pending.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._pending:
+            failures = self.failures
+            await self.flush()
+            if self.failures != failures:
+                logger.error(f"Dropping {len(self._pending)} unwritten songs on shutdown.")
+                self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns queue depth and flush counters.
+
+        Returns:
+            Dict[str, Any]: Queue depth, row counts and flush latencies in seconds.
+        """
+        return {
+            "queue_depth": len(self._pending),
+            "enqueued": self.enqueued,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+        }
+
+
+_writer: Optional[SongWriter] = None
+
+
+def get_song_writer() -> SongWriter:
+    """
+    Returns the process-wide song writer, creating it on first use.
+
+    Returns:
+        SongWriter: The shared writer.
+    """
+    global _writer
+    if _writer is None:
+        _writer = SongWriter()
+    return _writer
@@ -1,16 +1,372 @@
+import asyncio
+import base64
 import logging
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from typing import Dict, Optional
-from disk0muzik.config import SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET
+import re
+import time
+import aiohttp
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from disk0muzik.config import (
+    SPOTIFY_CLIENT_ID,
+    SPOTIFY_CLIENT_SECRET,
+    SPOTIFY_API_URL,
+    SPOTIFY_TOKEN_URL,
+    SPOTIFY_MAX_CONCURRENCY,
+    SPOTIFY_POOL_SIZE,
+    SPOTIFY_TIMEOUT,
+)
+from disk0muzik.utils.negative_cache import ERROR, NO_MATCH, get_negative_cache
+from disk0muzik.utils.resolution_cache import normalize_query
+from disk0muzik.utils.upstream import (
+    CircuitOpenError,
+    Upstream,
+    UpstreamThrottled,
+    UpstreamUnavailable,
+    get_upstream,
+)
 
 logger = logging.getLogger(__name__)
 
-sp = spotipy.Spotify(
-    auth_manager=SpotifyClientCredentials(
-        client_id=SPOTIFY_CLIENT_ID, client_secret=SPOTIFY_CLIENT_SECRET
-    )
+# Refresh the access token this many seconds before Spotify says it expires.
+TOKEN_REFRESH_MARGIN = 60
+
+# Maximum page sizes of the batched endpoints.
+TRACKS_BATCH_SIZE = 50
+ALBUM_PAGE_SIZE = 50
+PLAYLIST_PAGE_SIZE = 100
+
+_SPOTIFY_URL = re.compile(
+    r"^https?://open\.spotify\.com/(?:intl-[\w-]+/)?(track|album|playlist)/([A-Za-z0-9]+)"
 )
+_SPOTIFY_URI = re.compile(r"^spotify:(track|album|playlist):([A-Za-z0-9]+)$")
+
+
+def parse_spotify_url(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Parses a Spotify track, album or playlist link.
+
+    Args:
+        url (str): An open.spotify.com URL or spotify: URI.
+
+    Returns:
+        Optional[Tuple[str, str]]: The kind (``track``, ``album`` or ``playlist``) and ID,
+        or None if the text is not a Spotify link.
+    """
+    match = _SPOTIFY_URL.match(url.strip()) or _SPOTIFY_URI.match(url.strip())
+    return (match.group(1), match.group(2)) if match else None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header given in seconds.
+
+    Args:
+        value (Optional[str]): The header value.
+
+    Returns:
+        Optional[float]: The delay in seconds, or None if the header is missing or not a number.
+    """
+    try:
+        return max(float(value), 0.0) if value else None
+    except ValueError:
+        return None
+
+
+class SpotifyError(Exception):
+    """
+    Raised when the Spotify API answers with an error status.
+    """
+
+    def __init__(self, status: int, message: str) -> None:
+        """
+        Initializes the error.
+
+        Args:
+            status (int): The HTTP status code.
+            message (str): The error message.
+        """
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+async def raise_for_status(response: aiohttp.ClientResponse) -> None:
+    """
+    Raises the error matching a failed Spotify response.
+
+    Args:
+        response (aiohttp.ClientResponse): The response.
+
+    Raises:
+        UpstreamThrottled: On 429 Too Many Requests.
+        UpstreamUnavailable: On a server error.
+        SpotifyError: On any other error status.
+    """
+    if response.status < 400:
+        return
+    message = await response.text()
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    if response.status == 429:
+        raise UpstreamThrottled(f"Spotify rate limit: {message}", retry_after)
+    if response.status >= 500:
+        raise UpstreamUnavailable(f"Spotify error {response.status}: {message}", retry_after)
+    raise SpotifyError(response.status, message)
+
+
+class SpotifyClient:
+    """
+    Asynchronous Spotify Web API client using the client-credentials flow.
+
+    Requests share one aiohttp session, so connections to Spotify are pooled and
+    kept alive. The access token is fetched once and reused until shortly before
+    it expires; concurrent callers wait for a single refresh. At most
+    ``max_concurrency`` requests are in flight at once, and every request goes
+    through the ``spotify`` upstream scheduler, which rate limits it and retries
+    429s and server errors.
+    """
+
+    def __init__(
+        self,
+        client_id: Optional[str] = SPOTIFY_CLIENT_ID,
+        client_secret: Optional[str] = SPOTIFY_CLIENT_SECRET,
+        api_url: str = SPOTIFY_API_URL,
+        token_url: str = SPOTIFY_TOKEN_URL,
+        max_concurrency: int = SPOTIFY_MAX_CONCURRENCY,
+        pool_size: int = SPOTIFY_POOL_SIZE,
+        timeout: float = SPOTIFY_TIMEOUT,
+        upstream: Optional[Upstream] = None,
+    ) -> None:
+        """
+        Initializes the client. The HTTP session is created on first use.
+
+        Args:
+            client_id (Optional[str]): The Spotify client ID.
+            client_secret (Optional[str]): The Spotify client secret.
+            api_url (str): The Web API base URL.
+            token_url (str): The accounts service token endpoint.
+            max_concurrency (int): The maximum number of requests in flight.
+            pool_size (int): The maximum number of pooled connections.
+            timeout (float): The total timeout of a single request in seconds.
+            upstream (Optional[Upstream]): The scheduler requests go through, defaults to the shared one.
+        """
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = api_url.rstrip("/")
+        self.token_url = token_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.upstream = upstream or get_upstream("spotify")
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+
+        self.requests = 0
+        self.token_refreshes = 0
+        self.errors = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                raise_for_status=False,
+            )
+        return self._session
+
+    def _credentials(self) -> str:
+        pair = f"{self.client_id or ''}:{self.client_secret or ''}"
+        return base64.b64encode(pair.encode()).decode()
+
+    async def _get_token(self) -> str:
+        """
+        Returns a valid access token, fetching a new one if the current one is about to expire.
+        """
+        if self._token and time.monotonic() < self._token_expires_at:
+            return self._token
+
+        async with self._token_lock:
+            # Another caller may have refreshed the token while we waited.
+            if self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+
+            async with self._get_session().post(
+                self.token_url,
+                data={"grant_type": "client_credentials"},
+                headers={"Authorization": f"Basic {self._credentials()}"},
+            ) as response:
+                await raise_for_status(response)
+                payload = await response.json()
+
+            self._token = payload["access_token"]
+            expires_in = float(payload.get("expires_in", 3600))
+            self._token_expires_at = time.monotonic() + max(expires_in - TOKEN_REFRESH_MARGIN, 0)
+            self.token_refreshes += 1
+            logger.info("Fetched a new Spotify access token.")
+            return self._token
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Sends an authenticated GET request to the Web API through the upstream scheduler.
+
+        Args:
+            path (str): The endpoint path, e.g. ``/search``.
+            params (Optional[Dict[str, Any]]): The query parameters.
+
+        Returns:
+            Dict[str, Any]: The decoded JSON response.
+
+        Raises:
+            SpotifyError: If Spotify answers with a client error.
+            UpstreamUnavailable: If Spotify kept failing or throttling us.
+            CircuitOpenError: If Spotify is considered down.
+        """
+        return await self.upstream.call(lambda: self._get(path, params))
+
+    async def _get(self, path: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Sends one GET request. A 401 response drops the cached token and retries once with a fresh one.
+        """
+        async with self._slots:
+            try:
+                for attempt in range(2):
+                    token = await self._get_token()
+                    self.requests += 1
+                    async with self._get_session().get(
+                        f"{self.api_url}{path}",
+                        params=params,
+                        headers={"Authorization": f"Bearer {token}"},
+                    ) as response:
+                        if response.status == 401 and attempt == 0:
+                            self._token = None
+                            continue
+                        if response.status >= 400:
+                            self.errors += 1
+                        await raise_for_status(response)
+                        return await response.json()
+            except aiohttp.ClientError as e:
+                raise UpstreamUnavailable(f"Spotify request failed: {e}") from e
+        raise SpotifyError(401, "Unauthorized")
+
+    async def search_track(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the best matching track for a query.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            Optional[Dict[str, Any]]: The raw track object, or None if nothing matched.
+        """
+        results = await self.get("/search", {"q": query, "type": "track", "limit": 1})
+        items = results.get("tracks", {}).get("items", [])
+        return items[0] if items else None
+
+    async def get_tracks(self, track_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Fetches tracks by ID, up to TRACKS_BATCH_SIZE per request.
+
+        Args:
+            track_ids (List[str]): The Spotify track IDs.
+
+        Returns:
+            List[Dict[str, Any]]: The raw track objects of the IDs Spotify knows, in order.
+        """
+        tracks = []
+        for start in range(0, len(track_ids), TRACKS_BATCH_SIZE):
+            batch = track_ids[start : start + TRACKS_BATCH_SIZE]
+            results = await self.get("/tracks", {"ids": ",".join(batch)})
+            tracks.extend(track for track in results.get("tracks", []) if track)
+        return tracks
+
+    async def iter_album_tracks(self, album_id: str) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields an album's tracks page by page.
+
+        Args:
+            album_id (str): The Spotify album ID.
+
+        Yields:
+            List[Dict[str, Any]]: The next page of raw track objects.
+        """
+        album = await self.get(f"/albums/{album_id}")
+        # Album track listings leave out the album itself, which holds the cover art.
+        summary = {"name": album.get("name"), "images": album.get("images", [])}
+        page = album["tracks"]
+        offset = 0
+        while True:
+            items = page.get("items", [])
+            yield [dict(track, album=summary) for track in items if track and track.get("id")]
+            offset += len(items)
+            if not items or not page.get("next"):
+                return
+            page = await self.get(
+                f"/albums/{album_id}/tracks", {"offset": offset, "limit": ALBUM_PAGE_SIZE}
+            )
+
+    async def iter_playlist_tracks(self, playlist_id: str) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields a playlist's tracks page by page, skipping episodes and local files.
+
+        Args:
+            playlist_id (str): The Spotify playlist ID.
+
+        Yields:
+            List[Dict[str, Any]]: The next page of raw track objects.
+        """
+        offset = 0
+        while True:
+            page = await self.get(
+                f"/playlists/{playlist_id}/tracks",
+                {"offset": offset, "limit": PLAYLIST_PAGE_SIZE, "additional_types": "track"},
+            )
+            items = page.get("items", [])
+            yield [
+                item["track"]
+                for item in items
+                if item.get("track")
+                and item["track"].get("id")
+                and item["track"].get("type", "track") == "track"
+            ]
+            offset += len(items)
+            if not items or not page.get("next"):
+                return
+
+    async def close(self) -> None:
+        """
+        Closes the HTTP session and its pooled connections.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns request counters.
+
+        Returns:
+            Dict[str, Any]: Requests sent, token refreshes and error responses.
+        """
+        return {
+            "requests": self.requests,
+            "token_refreshes": self.token_refreshes,
+            "errors": self.errors,
+        }
+
+
+_client: Optional[SpotifyClient] = None
+
+
+def get_spotify_client() -> SpotifyClient:
+    """
+    Returns the process-wide Spotify client, creating it on first use.
+
+    Returns:
+        SpotifyClient: The shared client.
+    """
+    global _client
+    if _client is None:
+        _client = SpotifyClient()
+    return _client
 
 
 def log_error(context: str, error: Exception, query: str) -> None:
@@ -25,28 +381,92 @@ def log_error(context: str, error: Exception, query: str) -> None:
     logger.error(f"{context} - Query: '{query}' - Error: {error}")
 
 
-def search_spotify(query: str) -> Optional[Dict[str, str]]:
+def track_to_result(track: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Converts a Spotify track object to the track details used by the bot.
+
+    Args:
+        track (Dict[str, Any]): The track object.
+
+    Returns:
+        Dict[str, str]: The title, artist, album art and Spotify ID.
+    """
+    images = track["album"]["images"]
+    return {
+        "title": track["name"],
+        "artist": track["artists"][0]["name"],
+        "album_art": images[0]["url"] if images else None,
+        "spotify_id": track["id"],
+    }
+
+
+async def search_spotify(query: str) -> Optional[Dict[str, str]]:
     """
     Searches Spotify for a track matching the query.
 
+    Queries that recently found no track or failed are answered from the
+    negative cache without calling Spotify.
+
     Args:
         query (str): The search query to find the track on Spotify.
 
     Returns:
         Optional[Dict[str, str]]: A dictionary with track details or None if no track is found.
     """
+    negative_cache = get_negative_cache()
+    key = normalize_query(query) or query
+    if negative_cache.get("spotify", key):
+        return None
+
     try:
-        results = sp.search(q=query, limit=1, type="track")
-        if results["tracks"]["items"]:
-            track = results["tracks"]["items"][0]
-            return {
-                "title": track["name"],
-                "artist": track["artists"][0]["name"],
-                "album_art": track["album"]["images"][0]["url"],
-                "spotify_id": track["id"],
-            }
-    except spotipy.exceptions.SpotifyException as e:
+        track = await get_spotify_client().search_track(query)
+        if track:
+            return track_to_result(track)
+        negative_cache.put("spotify", key, NO_MATCH)
+        return None
+    except CircuitOpenError as e:
+        log_error("Spotify is unavailable", e, query)
+    except (SpotifyError, UpstreamUnavailable) as e:
         log_error("Spotify search error", e, query)
     except Exception as e:
         log_error("Unexpected error during Spotify search", e, query)
+    negative_cache.put("spotify", key, ERROR)
     return None
+
+
+async def get_spotify_tracks(track_ids: List[str]) -> List[Dict[str, str]]:
+    """
+    Fetches track details for Spotify track IDs in batches.
+
+    Args:
+        track_ids (List[str]): The Spotify track IDs.
+
+    Returns:
+        List[Dict[str, str]]: Track details of the IDs Spotify knows, in order.
+    """
+    tracks = await get_spotify_client().get_tracks(track_ids)
+    return [track_to_result(track) for track in tracks]
+
+
+async def iter_spotify_collection(kind: str, collection_id: str) -> AsyncIterator[Dict[str, str]]:
+    """
+    Yields the tracks of a Spotify album or playlist as their pages arrive.
+
+    Args:
+        kind (str): ``album`` or ``playlist``.
+        collection_id (str): The Spotify album or playlist ID.
+
+    Yields:
+        Dict[str, str]: Track details, in collection order.
+    """
+    client = get_spotify_client()
+    if kind == "album":
+        pages = client.iter_album_tracks(collection_id)
+    elif kind == "playlist":
+        pages = client.iter_playlist_tracks(collection_id)
+    else:
+        raise ValueError(f"Not a Spotify collection: {kind}")
+
+    async for page in pages:
+        for track in page:
+            yield track_to_result(track)
@@ -0,0 +1,250 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from disk0muzik.config import STREAM_CACHE_SIZE, STREAM_CACHE_MARGIN, STREAM_CACHE_DEFAULT_TTL
+from disk0muzik.utils.extraction_service import ExtractionError, get_extraction_service
+from disk0muzik.utils.negative_cache import ERROR, NO_MATCH, get_negative_cache
+from disk0muzik.utils.resolution_cache import normalize_query
+from disk0muzik.utils.single_flight import SingleFlight
+from disk0muzik.utils.upstream import CircuitOpenError, UpstreamUnavailable, get_upstream
+
+logger = logging.getLogger(__name__)
+
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_PATH_EXPIRE = re.compile(r"/expire/(\d+)")
+
+
+def get_video_id(url: Optional[str]) -> Optional[str]:
+    """
+    Extracts the video ID from a YouTube watch, short or youtu.be URL.
+
+    Args:
+        url (Optional[str]): The YouTube URL.
+
+    Returns:
+        Optional[str]: The 11 character video ID, or None if the URL is not a YouTube video URL.
+    """
+    if not url:
+        return None
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+
+    candidate = None
+    if host == "youtu.be":
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif host.endswith("youtube.com"):
+        if parsed.path == "/watch":
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        elif parsed.path.startswith(("/shorts/", "/embed/", "/live/")):
+            candidate = parsed.path.split("/")[2]
+
+    return candidate if candidate and _VIDEO_ID.match(candidate) else None
+
+
+def get_stream_expiry(audio_url: str) -> Optional[float]:
+    """
+    Reads the expiry time embedded in a googlevideo stream URL.
+
+    Args:
+        audio_url (str): The stream URL.
+
+    Returns:
+        Optional[float]: The expiry as a Unix timestamp, or None if the URL has none.
+    """
+    parsed = urlparse(audio_url)
+    expire = parse_qs(parsed.query).get("expire", [None])[0]
+    if expire is None:
+        match = _PATH_EXPIRE.search(parsed.path)
+        expire = match.group(1) if match else None
+    try:
+        return float(expire) if expire is not None else None
+    except ValueError:
+        return None
+
+
+def get_expires_at(info: Dict[str, str], default_ttl: float = STREAM_CACHE_DEFAULT_TTL) -> float:
+    """
+    Returns when a stream URL stops working.
+
+    Args:
+        info (Dict[str, str]): The stream info, including its ``audio_url``.
+        default_ttl (float): Lifetime assumed for URLs without an embedded expiry, in seconds.
+
+    Returns:
+        float: The expiry as a Unix timestamp.
+    """
+    return get_stream_expiry(info["audio_url"]) or time.time() + default_ttl
+
+
+class StreamCache:
+    """
+    Caches extracted stream info by video ID until the stream URL expires.
+
+    A URL is only handed out while it has at least ``margin`` seconds left, so a
+    track started from the cache can play to the end. URLs without an embedded
+    expiry are kept for ``default_ttl`` seconds. The least recently used entry
+    is evicted once ``max_size`` entries are cached.
+    """
+
+    def __init__(
+        self,
+        max_size: int = STREAM_CACHE_SIZE,
+        margin: float = STREAM_CACHE_MARGIN,
+        default_ttl: float = STREAM_CACHE_DEFAULT_TTL,
+    ) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (int): The maximum number of cached streams.
+            margin (float): Seconds of validity a URL must have left to be reused.
+            default_ttl (float): Lifetime of URLs without an embedded expiry, in seconds.
+        """
+        self.max_size = max_size
+        self.margin = margin
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[Dict[str, str], float]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, video_id: str, margin: Optional[float] = None) -> Optional[Dict[str, str]]:
+        """
+        Returns cached stream info if its URL is still valid for long enough.
+
+        Args:
+            video_id (str): The YouTube video ID.
+            margin (Optional[float]): Seconds of validity required, defaults to the cache margin.
+
+        Returns:
+            Optional[Dict[str, str]]: The stream info, or None on a miss.
+        """
+        entry = self._entries.get(video_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        info, expires_at = entry
+        now = time.time()
+        if expires_at - (self.margin if margin is None else margin) <= now:
+            # Keep URLs that are close to expiry but still valid; they can be
+            # served as a last resort while YouTube is unavailable.
+            if expires_at <= now:
+                del self._entries[video_id]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(video_id)
+        self.hits += 1
+        return info
+
+    def put(self, video_id: str, info: Dict[str, str]) -> None:
+        """
+        Caches stream info for a video.
+
+        Args:
+            video_id (str): The YouTube video ID.
+            info (Dict[str, str]): The stream info, including its ``audio_url``.
+        """
+        self._entries[video_id] = (info, get_expires_at(info, self.default_ttl))
+        self._entries.move_to_end(video_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns cache size and hit/miss counters.
+
+        Returns:
+            Dict[str, Any]: Entry count, hits, misses, expired URLs and evictions.
+        """
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+
+_cache: Optional[StreamCache] = None
+
+
+def get_stream_cache() -> StreamCache:
+    """
+    Returns the process-wide stream cache, creating it on first use.
+
+    Returns:
+        StreamCache: The shared cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = StreamCache()
+    return _cache
+
+
+_extractions = SingleFlight("extraction")
+
+
+def _stale_fallback(video_id: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Returns a cached URL that is past the reuse margin but not yet expired.
+    """
+    return get_stream_cache().get(video_id, margin=0) if video_id else None
+
+
+async def _extract(query: str, video_id: Optional[str], key: Tuple[str, str]) -> Optional[Dict[str, str]]:
+    negative_cache = get_negative_cache()
+    try:
+        info = await get_upstream("youtube").call(lambda: get_extraction_service().extract(query))
+    except (CircuitOpenError, UpstreamUnavailable, ExtractionError) as e:
+        logger.warning(f"YouTube is unavailable - Query: '{query}' - Error: {e}")
+        negative_cache.put("youtube", key, ERROR)
+        return _stale_fallback(video_id)
+
+    if not info:
+        negative_cache.put("youtube", key, NO_MATCH)
+        return None
+
+    video_id = get_video_id(info["video_url"]) or video_id
+    if video_id:
+        get_stream_cache().put(video_id, info)
+    return info
+
+
+async def get_stream_info(query: str) -> Optional[Dict[str, str]]:
+    """
+    Returns stream info for a YouTube URL or search query, extracting it only on a cache miss.
+
+    Concurrent misses for the same video ID or normalized search query share one extraction.
+    Extractions go through the ``youtube`` upstream scheduler; while YouTube is
+    unavailable a cached URL that is still valid is served even inside the margin.
+    Queries that recently found nothing or failed are answered from the negative cache.
+
+    Args:
+        query (str): The YouTube URL or search query.
+
+    Returns:
+        Optional[Dict[str, str]]: The stream info, or None if extraction fails.
+    """
+    cache = get_stream_cache()
+    video_id = get_video_id(query)
+    if video_id:
+        info = cache.get(video_id)
+        if info:
+            return info
+
+    key = ("video", video_id) if video_id else ("search", normalize_query(query) or query)
+    reason = get_negative_cache().get("youtube", key)
+    if reason == NO_MATCH:
+        return None
+    if reason == ERROR:
+        return _stale_fallback(video_id)
+    return await _extractions.do(key, lambda: _extract(query, video_id, key))
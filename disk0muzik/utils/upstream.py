@@ -0,0 +1,366 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from disk0muzik.config import (
+    SPOTIFY_RATE_LIMIT,
+    SPOTIFY_BURST,
+    YOUTUBE_RATE_LIMIT,
+    YOUTUBE_BURST,
+    UPSTREAM_MAX_RETRIES,
+    UPSTREAM_BACKOFF_BASE,
+    UPSTREAM_BACKOFF_MAX,
+    UPSTREAM_FAILURE_THRESHOLD,
+    UPSTREAM_RESET_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised for transient upstream failures that are worth retrying later.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        """
+        Initializes the error.
+
+        Args:
+            message (str): The error message.
+            retry_after (Optional[float]): Seconds the upstream asked us to wait, if it said so.
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamThrottled(UpstreamUnavailable):
+    """
+    Raised when an upstream service tells us to slow down.
+    """
+
+
+# Errors that count against the circuit breaker and are retried.
+TRANSIENT_ERRORS = (UpstreamUnavailable, asyncio.TimeoutError, ConnectionError)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream whose circuit breaker is open.
+    """
+
+
+class TokenBucket:
+    """
+    Limits calls to ``rate`` per second on average, allowing bursts of up to ``burst`` calls.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """
+        Initializes a full bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            burst (int): The bucket capacity.
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stops handing out tokens for a while, e.g. to honour a Retry-After header.
+
+        Args:
+            seconds (float): How long to pause.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        """
+        Waits until a token is available and takes it.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    @property
+    def tokens(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+
+class CircuitBreaker:
+    """
+    Stops calls to an upstream after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls
+    fail fast. Once ``reset_timeout`` seconds have passed a single probe call is
+    let through; its success closes the circuit and its failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        """
+        Initializes a closed breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_timeout (float): Seconds to stay open before probing again.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+        self.trips = 0
+
+    def allow(self) -> bool:
+        """
+        Returns whether a call may go through now.
+
+        Returns:
+            bool: True if the call may proceed.
+        """
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        """
+        Records a successful call, closing the circuit.
+        """
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def abandon(self) -> None:
+        """
+        Records that an allowed call ended without an outcome, e.g. because it was cancelled.
+        """
+        self._probing = False
+
+    def record_failure(self, open_for: Optional[float] = None) -> None:
+        """
+        Records a failed call, opening the circuit if the threshold is reached.
+
+        Args:
+            open_for (Optional[float]): Minimum time to stay open if the circuit opens.
+        """
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            # Opening late keeps the circuit shut for at least the upstream's Retry-After.
+            delay = max((open_for or 0) - self.reset_timeout, 0)
+            self._opened_at = time.monotonic() + delay
+            self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+
+class Upstream:
+    """
+    Schedules calls to one upstream service.
+
+    Every call waits for a token-bucket slot, goes through the circuit breaker,
+    and is retried on transient errors with jittered exponential backoff or
+    after the delay the upstream asked for. Errors that are not transient are
+    raised straight away and leave the breaker as it was.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_retries: int = UPSTREAM_MAX_RETRIES,
+        backoff_base: float = UPSTREAM_BACKOFF_BASE,
+        backoff_max: float = UPSTREAM_BACKOFF_MAX,
+        failure_threshold: int = UPSTREAM_FAILURE_THRESHOLD,
+        reset_timeout: float = UPSTREAM_RESET_TIMEOUT,
+    ) -> None:
+        """
+        Initializes the scheduler.
+
+        Args:
+            name (str): The upstream's name, used in logs and stats.
+            rate (float): Calls per second allowed on average.
+            burst (int): Calls allowed in a burst.
+            max_retries (int): Retries after the first attempt of a call.
+            backoff_base (float): The first backoff delay in seconds.
+            backoff_max (float): The maximum backoff delay in seconds.
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_timeout (float): Seconds the circuit stays open before probing again.
+        """
+        self.name = name
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.failures = 0
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Returns a jittered delay before the given retry.
+
+        Args:
+            attempt (int): The number of attempts made so far, starting at 1.
+
+        Returns:
+            float: The delay in seconds, drawn uniformly up to the exponential cap.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs a call against the upstream under its rate limit, breaker and retry policy.
+
+        Args:
+            func (Callable[[], Awaitable[T]]): Starts one attempt of the call.
+
+        Returns:
+            T: The call's result.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+            Exception: The last error if the call kept failing, or any error that is not transient.
+        """
+        self.calls += 1
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} is unavailable, circuit open")
+
+            try:
+                await self.bucket.acquire()
+                attempt += 1
+                result = await func()
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                if not isinstance(e, TRANSIENT_ERRORS):
+                    # Says nothing about the upstream's health; a half-open probe may be retried.
+                    self.breaker.abandon()
+                    raise
+
+                self.failures += 1
+                retry_after = getattr(e, "retry_after", None)
+                if isinstance(e, UpstreamThrottled):
+                    self.throttled += 1
+                if retry_after:
+                    self.bucket.pause(retry_after)
+                was_open = self.breaker.state == CircuitBreaker.OPEN
+                self.breaker.record_failure(retry_after)
+                if self.breaker.state == CircuitBreaker.OPEN and not was_open:
+                    logger.error(f"{self.name} circuit opened after repeated failures.")
+                logger.warning(f"Transient {self.name} error on attempt {attempt}: {e}")
+
+                if attempt > self.max_retries or self.breaker.is_open:
+                    raise
+                self.retries += 1
+                # The bucket already waits out Retry-After; back off only without one.
+                if not retry_after:
+                    await asyncio.sleep(self.backoff(attempt))
+                continue
+
+            if self.breaker.state != CircuitBreaker.CLOSED:
+                logger.info(f"{self.name} circuit closed after a successful probe.")
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the upstream's breaker state and call counters.
+
+        Returns:
+            Dict[str, Any]: Breaker state, consecutive failures, available tokens and call counts.
+        """
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "trips": self.breaker.trips,
+            "tokens": round(self.bucket.tokens, 2),
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "failures": self.failures,
+        }
+
+
+UPSTREAM_LIMITS: Dict[str, tuple] = {
+    "spotify": (SPOTIFY_RATE_LIMIT, SPOTIFY_BURST),
+    "youtube": (YOUTUBE_RATE_LIMIT, YOUTUBE_BURST),
+}
+
+_upstreams: Dict[str, Upstream] = {}
+
+
+def get_upstream(name: str) -> Upstream:
+    """
+    Returns the process-wide scheduler for an upstream, creating it on first use.
+
+    Args:
+        name (str): The upstream's name, one of UPSTREAM_LIMITS.
+
+    Returns:
+        Upstream: The shared scheduler.
+    """
+    upstream = _upstreams.get(name)
+    if upstream is None:
+        rate, burst = UPSTREAM_LIMITS[name]
+        upstream = _upstreams[name] = Upstream(name, rate, burst)
+    return upstream
+
+
+def upstream_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the state of every upstream used so far.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Stats keyed by upstream name.
+    """
+    return {name: upstream.stats() for name, upstream in _upstreams.items()}
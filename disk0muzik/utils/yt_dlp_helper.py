@@ -1,9 +1,43 @@
 import yt_dlp
 import logging
-from typing import Dict, Optional
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from disk0muzik.utils.upstream import UpstreamThrottled, UpstreamUnavailable
 
 logger = logging.getLogger(__name__)
 
+YDL_OPTIONS = {
+    # Opus streams can be passed through to Discord without re-encoding.
+    "format": "bestaudio[acodec=opus]/bestaudio/best",
+    "noplaylist": True,
+    "quiet": True,
+    "skip_download": True,
+    "default_search": "ytsearch1",
+    "socket_timeout": 15,
+}
+
+# Lists ids and titles of playlist entries without resolving their formats.
+FLAT_PLAYLIST_OPTIONS = {
+    "extract_flat": "in_playlist",
+    "noplaylist": False,
+    "quiet": True,
+    "skip_download": True,
+    "socket_timeout": 15,
+}
+
+# Titles YouTube gives playlist entries that cannot be played.
+UNAVAILABLE_TITLES = ("[Deleted video]", "[Private video]")
+
+# Error messages YouTube answers with when it throttles us.
+THROTTLE_MARKERS = ("http error 429", "too many requests", "confirm you're not a bot", "confirm you’re not a bot")
+
+# Error messages of network failures that are worth retrying.
+NETWORK_MARKERS = ("timed out", "unable to download webpage", "connection reset", "temporary failure")
+
+# YoutubeDL instances are not thread-safe, so each thread keeps its own.
+_local = threading.local()
+
 
 def log_error(context: str, error: Exception, query: str) -> None:
     """
@@ -17,6 +51,81 @@ def log_error(context: str, error: Exception, query: str) -> None:
     logger.error(f"{context} - Query: '{query}' - Error: {error}")
 
 
+def get_youtube_dl() -> yt_dlp.YoutubeDL:
+    """
+    Returns this thread's reusable YoutubeDL instance, creating it on first use.
+
+    Reusing the instance keeps yt-dlp's extractor and signature caches warm
+    across extractions.
+
+    Returns:
+        yt_dlp.YoutubeDL: The instance.
+    """
+    ydl = getattr(_local, "ydl", None)
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(YDL_OPTIONS)
+        _local.ydl = ydl
+    return ydl
+
+
+def get_flat_youtube_dl() -> yt_dlp.YoutubeDL:
+    """
+    Returns this thread's reusable YoutubeDL instance for flat playlist extraction.
+
+    Returns:
+        yt_dlp.YoutubeDL: The instance.
+    """
+    ydl = getattr(_local, "flat_ydl", None)
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(FLAT_PLAYLIST_OPTIONS)
+        _local.flat_ydl = ydl
+    return ydl
+
+
+def is_youtube_playlist(url: str) -> bool:
+    """
+    Checks whether a URL points to a YouTube playlist or mix.
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        bool: True if the URL carries a playlist ID.
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or "").lower()
+    if not (host.endswith("youtube.com") or host == "youtu.be"):
+        return False
+    return bool(parse_qs(parsed.query).get("list"))
+
+
+def raise_if_unavailable(error: yt_dlp.DownloadError) -> None:
+    """
+    Raises the matching upstream error if yt-dlp failed because YouTube throttled us or could not be reached.
+
+    Args:
+        error (yt_dlp.DownloadError): The yt-dlp error.
+
+    Raises:
+        UpstreamThrottled: If YouTube is rate limiting us.
+        UpstreamUnavailable: If YouTube could not be reached.
+    """
+    message = str(error).lower()
+    if any(marker in message for marker in THROTTLE_MARKERS):
+        raise UpstreamThrottled(f"YouTube is throttling requests: {error}")
+    if any(marker in message for marker in NETWORK_MARKERS):
+        raise UpstreamUnavailable(f"YouTube could not be reached: {error}")
+
+
+def warm_up() -> None:
+    """
+    Creates the YoutubeDL instance and loads the YouTube extractors ahead of the first request.
+    """
+    ydl = get_youtube_dl()
+    ydl.get_info_extractor("Youtube")
+    ydl.get_info_extractor("YoutubeSearch")
+
+
 def extract_youtube_info(query: str) -> Optional[Dict[str, str]]:
     """
     Extracts video and audio information from YouTube for a given query.
@@ -26,28 +135,68 @@ def extract_youtube_info(query: str) -> Optional[Dict[str, str]]:
 
     Returns:
         Optional[Dict[str, str]]: A dictionary with video and audio details or None if extraction fails.
-    """
-    ydl_opts = {
-        "format": "bestaudio/best",
-        "noplaylist": True,
-        "quiet": True,
-        "skip_download": True,
-        "default_search": "ytsearch1",
-    }
 
+    Raises:
+        UpstreamThrottled: If YouTube is rate limiting us.
+        UpstreamUnavailable: If YouTube could not be reached.
+    """
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info_dict = ydl.extract_info(query, download=False)
-            if "entries" in info_dict:
-                info_dict = info_dict["entries"][0]
-            return {
-                "video_url": f"https://www.youtube.com/watch?v={info_dict['id']}",
-                "audio_url": info_dict["url"],
-                "thumbnail": info_dict.get("thumbnail"),
-                "title": info_dict.get("title"),
-            }
+        info_dict = get_youtube_dl().extract_info(query, download=False)
+        if "entries" in info_dict:
+            info_dict = info_dict["entries"][0]
+        return {
+            "video_url": f"https://www.youtube.com/watch?v={info_dict['id']}",
+            "audio_url": info_dict["url"],
+            "thumbnail": info_dict.get("thumbnail"),
+            "title": info_dict.get("title"),
+            "artist": info_dict.get("channel") or info_dict.get("uploader") or "YouTube",
+            "format_id": info_dict.get("format_id"),
+            "acodec": info_dict.get("acodec"),
+            "ext": info_dict.get("ext"),
+            "abr": info_dict.get("abr"),
+            "duration": info_dict.get("duration"),
+        }
     except yt_dlp.DownloadError as e:
+        raise_if_unavailable(e)
         log_error("Error extracting YouTube info", e, query)
     except Exception as e:
         log_error("Unexpected error during YouTube info extraction", e, query)
     return None
+
+
+def extract_youtube_playlist(url: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Lists the videos of a YouTube playlist or mix without resolving their streams.
+
+    Args:
+        url (str): The playlist or mix URL.
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: The playable entries in playlist order, each with
+        ``video_url``, ``title``, ``artist`` and ``thumbnail``, or None if extraction fails.
+
+    Raises:
+        UpstreamThrottled: If YouTube is rate limiting us.
+        UpstreamUnavailable: If YouTube could not be reached.
+    """
+    try:
+        info_dict = get_flat_youtube_dl().extract_info(url, download=False)
+        entries = []
+        for entry in info_dict.get("entries") or []:
+            if not entry or not entry.get("id") or entry.get("title") in UNAVAILABLE_TITLES:
+                continue
+            entries.append(
+                {
+                    "video_url": f"https://www.youtube.com/watch?v={entry['id']}",
+                    "title": entry.get("title") or entry["id"],
+                    "artist": entry.get("channel") or entry.get("uploader") or "YouTube",
+                    "thumbnail": f"https://i.ytimg.com/vi/{entry['id']}/hqdefault.jpg",
+                }
+            )
+        return entries
+    except yt_dlp.DownloadError as e:
+        raise_if_unavailable(e)
+        log_error("Error extracting YouTube playlist", e, url)
+    except Exception as e:
+        log_error("Unexpected error during YouTube playlist extraction", e, url)
+    return None
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import pytest
+from unittest.mock import patch
+from disk0muzik.utils.audio_cache import AudioCache
+
+
+def write_audio(size):
+    async def transcode(audio_url, acodec, output):
+        with open(output, "wb") as f:
+            f.write(b"\0" * size)
+
+    return transcode
+
+
+@pytest.mark.asyncio
+async def test_fill_writes_file_atomically(tmp_path):
+    cache = AudioCache(directory=str(tmp_path), max_bytes=1000)
+
+    with patch.object(cache, "_transcode", side_effect=write_audio(100)):
+        assert await cache.fill("aaaaaaaaaaa", "https://youtube.com/audio-url", "opus")
+
+    assert cache.get("aaaaaaaaaaa") == os.path.join(str(tmp_path), "aaaaaaaaaaa.ogg")
+    assert sorted(os.listdir(tmp_path)) == ["aaaaaaaaaaa.ogg", "index.json"]
+    assert cache.stats()["bytes"] == 100
+
+
+@pytest.mark.asyncio
+async def test_failed_fill_leaves_nothing_behind(tmp_path):
+    cache = AudioCache(directory=str(tmp_path), max_bytes=1000)
+
+    async def fail(audio_url, acodec, output):
+        with open(output, "wb") as f:
+            f.write(b"partial")
+        raise RuntimeError("ffmpeg exited with 1")
+
+    with patch.object(cache, "_transcode", side_effect=fail):
+        assert not await cache.fill("aaaaaaaaaaa", "https://youtube.com/audio-url", "opus")
+
+    assert cache.get("aaaaaaaaaaa") is None
+    assert os.listdir(tmp_path) == []
+    assert cache.stats()["fill_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_eviction_keeps_frequently_hit_tracks(tmp_path):
+    cache = AudioCache(directory=str(tmp_path), max_bytes=250)
+
+    with patch.object(cache, "_transcode", side_effect=write_audio(100)):
+        await cache.fill("aaaaaaaaaaa", "url", "opus")
+        await cache.fill("bbbbbbbbbbb", "url", "opus")
+        cache.get("aaaaaaaaaaa")
+        await cache.fill("ccccccccccc", "url", "opus")
+
+    # b is less recently used than a and was never hit.
+    assert "aaaaaaaaaaa" in cache
+    assert "bbbbbbbbbbb" not in cache
+    assert "ccccccccccc" in cache
+    assert sorted(os.listdir(tmp_path)) == ["aaaaaaaaaaa.ogg", "ccccccccccc.ogg", "index.json"]
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_tracks_are_cached_after_repeated_plays(tmp_path):
+    cache = AudioCache(directory=str(tmp_path), max_bytes=1000, min_plays=2)
+    info = {"audio_url": "https://youtube.com/audio-url", "acodec": "opus"}
+
+    with patch.object(cache, "_transcode", side_effect=write_audio(100)) as mock_transcode:
+        cache.record_play("aaaaaaaaaaa", info)
+        await asyncio.sleep(0)
+        assert "aaaaaaaaaaa" not in cache
+
+        cache.record_play("aaaaaaaaaaa", info)
+        cache.record_play("aaaaaaaaaaa", info)
+        await asyncio.gather(*cache._tasks)
+
+    assert "aaaaaaaaaaa" in cache
+    mock_transcode.assert_called_once()
+
+
+def test_existing_files_are_loaded(tmp_path):
+    (tmp_path / "aaaaaaaaaaa.ogg").write_bytes(b"\0" * 100)
+    (tmp_path / "bbbbbbbbbbb.ogg.part").write_bytes(b"\0" * 50)
+
+    cache = AudioCache(directory=str(tmp_path), max_bytes=1000)
+
+    assert "aaaaaaaaaaa" in cache
+    assert cache.stats()["bytes"] == 100
+    assert os.listdir(tmp_path) == ["aaaaaaaaaaa.ogg"]
+
+
+@pytest.mark.asyncio
+async def test_play_counts_are_bounded_and_kept_across_restarts(tmp_path):
+    info = {"audio_url": "https://youtube.com/audio-url", "acodec": "opus"}
+    cache = AudioCache(directory=str(tmp_path), max_bytes=1000, min_plays=2, play_history=2)
+    for video_id in ("aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"):
+        cache.record_play(video_id, info)
+    await cache.close()
+
+    cache = AudioCache(directory=str(tmp_path), max_bytes=1000, min_plays=2, play_history=2)
+    with patch.object(cache, "_transcode", side_effect=write_audio(100)) as mock_transcode:
+        # The oldest count was dropped; the others carry over.
+        cache.record_play("aaaaaaaaaaa", info)
+        cache.record_play("ccccccccccc", info)
+        await asyncio.gather(*cache._tasks)
+
+    assert "aaaaaaaaaaa" not in cache
+    assert "ccccccccccc" in cache
+    mock_transcode.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_cached_track_lengths_are_kept(tmp_path):
+    cache = AudioCache(directory=str(tmp_path), max_bytes=1000)
+    with patch.object(cache, "_transcode", side_effect=write_audio(100)):
+        await cache.fill("aaaaaaaaaaa", "url", "opus", duration=215.0)
+        await cache.fill("bbbbbbbbbbb", "url", "opus")
+
+    cache = AudioCache(directory=str(tmp_path), max_bytes=1000)
+
+    assert cache.duration("aaaaaaaaaaa") == 215.0
+    assert cache.duration("bbbbbbbbbbb") is None
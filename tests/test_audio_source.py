@@ -0,0 +1,108 @@
+import asyncio
+import json
+import sys
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, patch
+from discord import FFmpegOpusAudio
+from disk0muzik.utils.audio_source import GaplessSource, create_audio_source, prebuffer, probe_codec
+from disk0muzik.utils.ffmpeg_supervisor import FFmpegSupervisor
+
+
+@pytest_asyncio.fixture
+async def supervisor():
+    supervisor = FFmpegSupervisor()
+    with patch("disk0muzik.utils.audio_source.get_ffmpeg_supervisor", return_value=supervisor):
+        yield supervisor
+    await supervisor.close()
+
+
+@pytest.mark.asyncio
+@patch.object(FFmpegOpusAudio, "cleanup")
+@patch.object(FFmpegOpusAudio, "__init__", return_value=None)
+async def test_opus_streams_are_passed_through(mock_init, mock_cleanup, supervisor):
+    source = await create_audio_source({"audio_url": "https://youtube.com/audio-url", "acodec": "opus"})
+
+    assert source.passthrough
+    assert mock_init.call_args.kwargs["codec"] == "opus"
+    assert source.stats()["passthrough"]
+
+
+@pytest.mark.asyncio
+@patch.object(FFmpegOpusAudio, "cleanup")
+@patch.object(FFmpegOpusAudio, "__init__", return_value=None)
+async def test_other_streams_are_transcoded(mock_init, mock_cleanup, supervisor):
+    source = await create_audio_source({"audio_url": "https://youtube.com/audio-url", "acodec": "mp4a.40.2"})
+
+    assert not source.passthrough
+    assert mock_init.call_args.kwargs["codec"] is None
+
+
+@pytest.mark.asyncio
+@patch.object(FFmpegOpusAudio, "cleanup")
+@patch.object(FFmpegOpusAudio, "__init__", return_value=None)
+@patch("disk0muzik.utils.audio_source.probe_codec", new_callable=AsyncMock, return_value="opus")
+async def test_streams_without_a_codec_are_probed(mock_probe_codec, mock_init, mock_cleanup, supervisor):
+    source = await create_audio_source({"audio_url": "https://youtube.com/audio-url"}, guild=1)
+
+    mock_probe_codec.assert_awaited_once_with("https://youtube.com/audio-url", 1)
+    assert source.passthrough
+
+
+@pytest.mark.asyncio
+async def test_probe_codec_runs_in_a_slot(supervisor):
+    create_subprocess_exec = asyncio.create_subprocess_exec
+    output = json.dumps({"streams": [{"codec_name": "opus"}]})
+
+    async def ffprobe(*args, **kwargs):
+        # Stands in for ffprobe and reports the guild's slot as taken.
+        assert supervisor.guild_stats(1)["running"] == 1
+        return await create_subprocess_exec(sys.executable, "-c", f"print({output!r})", **kwargs)
+
+    with patch("asyncio.create_subprocess_exec", side_effect=ffprobe):
+        assert await probe_codec("https://youtube.com/audio-url", guild=1) == "opus"
+
+    assert supervisor.guild_stats(1) == {"running": 0, "finished": 1, "rss_bytes": 0, "cpu_seconds": 0.0}
+
+
+@pytest.mark.asyncio
+@patch.object(FFmpegOpusAudio, "cleanup")
+@patch.object(FFmpegOpusAudio, "__init__", return_value=None)
+async def test_sources_hold_a_guild_slot_until_cleaned_up(mock_init, mock_cleanup, supervisor):
+    source = await create_audio_source({"audio_url": "https://youtube.com/audio-url", "acodec": "opus"}, guild=1)
+
+    assert source.slot.guild == 1
+    assert supervisor.guild_stats(1)["running"] == 1
+
+    source.cleanup()
+    source.cleanup()
+
+    assert supervisor.guild_stats(1) == {"running": 0, "finished": 1, "rss_bytes": 0, "cpu_seconds": 0.0}
+
+
+class Frames:
+    def __init__(self, *frames):
+        self.frames = list(frames)
+        self.cleaned_up = False
+
+    def read(self):
+        return self.frames.pop(0) if self.frames else b""
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+@pytest.mark.asyncio
+async def test_gapless_source_plays_prebuffered_next_track():
+    first, second, replaced = Frames(b"a"), Frames(b"c"), Frames(b"x")
+    switched = []
+    output = GaplessSource(first, on_switch=switched.append)
+
+    output.queue_next(replaced, [b"x0"], "replaced")
+    output.queue_next(second, await prebuffer(second, frames=5) + [b"d"], "second")
+
+    assert replaced.cleaned_up
+    assert [output.read() for _ in range(4)] == [b"a", b"c", b"d", b""]
+    assert first.cleaned_up
+    assert switched == ["second"]
+    assert output.switches == 1
@@ -1,8 +1,14 @@
+import asyncio
 import pytest
 from unittest.mock import patch, MagicMock
+from disk0muzik.utils import database
+from disk0muzik.state.song import Song
 from disk0muzik.utils.database import (
+    ConnectionPool,
     init_db,
     add_song,
+    add_songs,
+    get_songs_updated_since,
     get_song,
     get_random_song,
     save_guild_state,
@@ -12,6 +18,13 @@ from disk0muzik.utils.database import (
 )
 
 
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    database._pool = ConnectionPool(max_size=2)
+    yield database._pool
+    database._pool = None
+
+
 @pytest.fixture
 def sample_song():
     return {
@@ -39,19 +52,20 @@ def sample_user_session():
     return {"session_key": "value"}
 
 
+@pytest.mark.asyncio
 @patch("disk0muzik.utils.database.get_db_connection")
-def test_init_db(mock_get_db_connection):
+async def test_init_db(mock_get_db_connection):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     # Mock the context manager return value
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_get_db_connection.return_value = mock_conn
 
-    init_db()
+    await init_db()
 
-    assert mock_cursor.execute.call_count == 4
+    assert mock_cursor.execute.call_count == 7
     mock_conn.commit.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()
 
 
 def normalize_query(query):
@@ -59,27 +73,31 @@ def normalize_query(query):
     return " ".join(query.split())
 
 
+@pytest.mark.asyncio
 @patch("disk0muzik.utils.database.get_db_connection")
-def test_add_song(mock_get_db_connection, sample_song):
+async def test_add_song(mock_get_db_connection, sample_song):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     # Mock the context manager return value
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.rowcount = 1
     mock_get_db_connection.return_value = mock_conn
 
-    add_song(sample_song)
+    changed = await add_song(Song.from_dict(sample_song))
 
     expected_query = """
         INSERT INTO songs (spotify_id, title, artist, thumbnail, youtube_url, requester)
         VALUES (%s, %s, %s, %s, %s, %s)
         ON CONFLICT (spotify_id) DO UPDATE 
-        SET youtube_url = EXCLUDED.youtube_url, thumbnail = EXCLUDED.thumbnail
+        SET youtube_url = EXCLUDED.youtube_url, thumbnail = EXCLUDED.thumbnail, updated_at = now()
+        WHERE songs.youtube_url IS NULL OR songs.youtube_url = ''
     """
 
     normalized_expected_query = normalize_query(expected_query)
     normalized_actual_query = normalize_query(mock_cursor.execute.call_args[0][0])
 
     assert normalized_actual_query == normalized_expected_query
+    assert changed
     mock_cursor.execute.assert_called_once_with(
         mock_cursor.execute.call_args[0][
             0
@@ -94,11 +112,63 @@ def test_add_song(mock_get_db_connection, sample_song):
         ),
     )
     mock_conn.commit.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()
 
 
+@pytest.mark.asyncio
 @patch("disk0muzik.utils.database.get_db_connection")
-def test_get_song(mock_get_db_connection, sample_song):
+async def test_add_song_unchanged(mock_get_db_connection, sample_song):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.rowcount = 0
+    mock_get_db_connection.return_value = mock_conn
+
+    assert not await add_song(Song.from_dict(sample_song))
+    mock_cursor.execute.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.database.get_db_connection")
+async def test_add_song_replace_url(mock_get_db_connection, sample_song):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.rowcount = 1
+    mock_get_db_connection.return_value = mock_conn
+
+    assert await add_song(Song.from_dict(sample_song), replace_url=True)
+
+    actual_query = normalize_query(mock_cursor.execute.call_args[0][0])
+    assert "WHERE" not in actual_query
+    assert actual_query.endswith(
+        "SET youtube_url = EXCLUDED.youtube_url, thumbnail = EXCLUDED.thumbnail, updated_at = now()"
+    )
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.database.execute_values")
+@patch("disk0muzik.utils.database.get_db_connection")
+async def test_add_songs(mock_get_db_connection, mock_execute_values, sample_song):
+    mock_conn = MagicMock()
+    mock_get_db_connection.return_value = mock_conn
+    mock_execute_values.side_effect = [[("1",), ("2",)], [("3",)]]
+    row = Song.from_dict(sample_song).as_row()
+
+    changed = await add_songs([row, row], [row])
+
+    assert changed == 3
+    fill_query = normalize_query(mock_execute_values.call_args_list[0][0][1])
+    replace_query = normalize_query(mock_execute_values.call_args_list[1][0][1])
+    assert "VALUES %s" in fill_query
+    assert "WHERE songs.youtube_url IS NULL" in fill_query
+    assert "WHERE" not in replace_query
+    mock_conn.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.database.get_db_connection")
+async def test_get_song(mock_get_db_connection, sample_song):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     # Mock the context manager return value
@@ -113,17 +183,48 @@ def test_get_song(mock_get_db_connection, sample_song):
     )
     mock_get_db_connection.return_value = mock_conn
 
-    song = get_song("123")
+    song = await get_song("123")
 
-    assert song == sample_song
+    assert song == Song.from_dict(sample_song)
     mock_cursor.execute.assert_called_once_with(
         "SELECT * FROM songs WHERE spotify_id = %s", ("123",)
     )
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.database.get_db_connection")
+async def test_get_songs_updated_since(mock_get_db_connection, sample_song):
+    from datetime import datetime, timezone
+
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    newest = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    mock_cursor.fetchall.return_value = [
+        (
+            sample_song["spotify_id"],
+            sample_song["title"],
+            sample_song["artist"],
+            sample_song["thumbnail"],
+            sample_song["youtube_url"],
+            sample_song["requester"],
+            newest,
+        )
+    ]
+    mock_get_db_connection.return_value = mock_conn
+
+    songs, watermark = await get_songs_updated_since(since)
+
+    assert songs == [Song.from_dict(sample_song)]
+    assert watermark == newest
+    assert mock_cursor.execute.call_args[0][1] == (since,)
 
 
+@pytest.mark.asyncio
 @patch("disk0muzik.utils.database.get_db_connection")
-def test_get_random_song(mock_get_db_connection, sample_song):
+async def test_get_random_song(mock_get_db_connection, sample_song):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     # Mock the context manager return value
@@ -138,24 +239,25 @@ def test_get_random_song(mock_get_db_connection, sample_song):
     )
     mock_get_db_connection.return_value = mock_conn
 
-    song = get_random_song()
+    song = await get_random_song()
 
-    assert song == sample_song
+    assert song == Song.from_dict(sample_song)
     mock_cursor.execute.assert_called_once_with(
         "SELECT * FROM songs ORDER BY RANDOM() LIMIT 1"
     )
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()
 
 
+@pytest.mark.asyncio
 @patch("disk0muzik.utils.database.get_db_connection")
-def test_save_guild_state(mock_get_db_connection, sample_guild_state):
+async def test_save_guild_state(mock_get_db_connection, sample_guild_state):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     # Mock the context manager return value
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_get_db_connection.return_value = mock_conn
 
-    save_guild_state(1, sample_guild_state)
+    await save_guild_state(1, sample_guild_state)
 
     expected_query = """
         INSERT INTO guild_states (guild_id, current_song, queue, is_paused, now_playing_message_id)
@@ -184,11 +286,12 @@ def test_save_guild_state(mock_get_db_connection, sample_guild_state):
         ),
     )
     mock_conn.commit.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()
 
 
+@pytest.mark.asyncio
 @patch("disk0muzik.utils.database.get_db_connection")
-def test_load_guild_state(mock_get_db_connection, sample_guild_state):
+async def test_load_guild_state(mock_get_db_connection, sample_guild_state):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     # Mock the context manager return value
@@ -202,7 +305,7 @@ def test_load_guild_state(mock_get_db_connection, sample_guild_state):
     )
     mock_get_db_connection.return_value = mock_conn
 
-    state = load_guild_state(1)
+    state = await load_guild_state(1)
 
     assert state == {
         "guild_id": 1,
@@ -214,18 +317,19 @@ def test_load_guild_state(mock_get_db_connection, sample_guild_state):
     mock_cursor.execute.assert_called_once_with(
         "SELECT * FROM guild_states WHERE guild_id = %s", (1,)
     )
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()
 
 
+@pytest.mark.asyncio
 @patch("disk0muzik.utils.database.get_db_connection")
-def test_save_user_session(mock_get_db_connection, sample_user_session):
+async def test_save_user_session(mock_get_db_connection, sample_user_session):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     # Mock the context manager return value
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_get_db_connection.return_value = mock_conn
 
-    save_user_session(1, sample_user_session)
+    await save_user_session(1, sample_user_session)
 
     expected_query = """
         INSERT INTO user_sessions (user_id, session_data)
@@ -245,11 +349,12 @@ def test_save_user_session(mock_get_db_connection, sample_user_session):
         (1, sample_user_session),
     )
     mock_conn.commit.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()
 
 
+@pytest.mark.asyncio
 @patch("disk0muzik.utils.database.get_db_connection")
-def test_load_user_session(mock_get_db_connection, sample_user_session):
+async def test_load_user_session(mock_get_db_connection, sample_user_session):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     # Mock the context manager return value
@@ -257,10 +362,73 @@ def test_load_user_session(mock_get_db_connection, sample_user_session):
     mock_cursor.fetchone.return_value = (sample_user_session,)
     mock_get_db_connection.return_value = mock_conn
 
-    session_data = load_user_session(1)
+    session_data = await load_user_session(1)
 
     assert session_data == sample_user_session
     mock_cursor.execute.assert_called_once_with(
         "SELECT session_data FROM user_sessions WHERE user_id = %s", (1,)
     )
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.database.get_db_connection")
+async def test_pool_reuses_connections(mock_get_db_connection, fresh_pool):
+    mock_conn = MagicMock(closed=False)
+    mock_conn.cursor.return_value.__enter__.return_value.fetchone.return_value = None
+    mock_get_db_connection.return_value = mock_conn
+
+    for _ in range(3):
+        await get_song("123")
+
+    mock_get_db_connection.assert_called_once()
+    # Reads end their implicit transaction before the connection is reused.
+    assert mock_conn.rollback.call_count == 3
+    stats = fresh_pool.stats()
+    assert stats["checkouts"] == 3
+    assert stats["connects"] == 1
+    assert stats["idle"] == 1
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.database.get_db_connection")
+async def test_pool_is_bounded(mock_get_db_connection, fresh_pool):
+    mock_get_db_connection.side_effect = lambda: MagicMock(closed=False)
+    release = asyncio.Event()
+    in_use = 0
+    peak = 0
+
+    async def hold():
+        nonlocal in_use, peak
+        async with fresh_pool.connection():
+            in_use += 1
+            peak = max(peak, in_use)
+            await release.wait()
+            in_use -= 1
+
+    tasks = [asyncio.create_task(hold()) for _ in range(5)]
+    await asyncio.sleep(0.05)
+    assert peak == 2
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert fresh_pool.stats()["connects"] == 2
+    assert fresh_pool.stats()["checkouts"] == 5
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.database.get_db_connection")
+async def test_pool_discards_broken_connections(mock_get_db_connection, fresh_pool):
+    from psycopg2 import OperationalError
+
+    broken_conn = MagicMock(closed=False)
+    broken_conn.cursor.return_value.__enter__.return_value.execute.side_effect = (
+        OperationalError("server closed the connection unexpectedly")
+    )
+    mock_get_db_connection.return_value = broken_conn
+
+    with pytest.raises(OperationalError):
+        await get_song("123")
+
+    broken_conn.close.assert_called_once()
+    assert fresh_pool.stats()["open"] == 0
@@ -1,5 +1,6 @@
 import pytest
 import discord
+from disk0muzik.state.song import Song
 from disk0muzik.utils.embed_helper import (
     create_embed_and_view,
     FOOTER_IMAGES,
@@ -9,21 +10,21 @@ from disk0muzik.utils.embed_helper import (
 
 @pytest.fixture
 def sample_song():
-    return {
-        "spotify_id": "123",
-        "title": "Test Song",
-        "artist": "Test Artist",
-        "thumbnail": "https://image.url/test.jpg",
-        "youtube_url": "https://youtube.com/test",
-        "requester": "test_user",
-    }
+    return Song(
+        spotify_id="123",
+        title="Test Song",
+        artist="Test Artist",
+        thumbnail="https://image.url/test.jpg",
+        youtube_url="https://youtube.com/test",
+        requester="test_user",
+    )
 
 
 @pytest.mark.asyncio
 async def test_create_embed_and_view(sample_song):
     footer_type = "now_playing"
     embed, view = create_embed_and_view(
-        sample_song, sample_song["requester"], footer_type, "❚❚"
+        sample_song, sample_song.requester, footer_type, "❚❚"
     )
 
     assert isinstance(embed, discord.Embed)
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+import pytest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch
+from disk0muzik.utils.extraction_service import ExtractionError, ExtractionService
+from disk0muzik.utils.upstream import UpstreamUnavailable
+
+INFO = {
+    "video_url": "https://www.youtube.com/watch?v=abcdefghijk",
+    "audio_url": "https://audio.url",
+    "title": "Test Video",
+    "thumbnail": "https://thumbnail.url",
+}
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.extraction_service.extract_youtube_info")
+async def test_extract_returns_info(mock_extract_youtube_info):
+    mock_extract_youtube_info.return_value = INFO
+    service = ExtractionService(max_workers=2, executor=ThreadPoolExecutor(2))
+
+    assert await service.extract("query") == INFO
+    mock_extract_youtube_info.assert_called_once_with("query")
+    stats = service.stats()
+    assert stats["completed"] == 1
+    assert stats["failures"] == 0
+    service.close()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.extraction_service.extract_youtube_info")
+async def test_extract_timeout_raises(mock_extract_youtube_info):
+    release = threading.Event()
+    mock_extract_youtube_info.side_effect = lambda query: release.wait(5)
+    service = ExtractionService(max_workers=1, executor=ThreadPoolExecutor(1))
+
+    # Timeouts are transient, so the YouTube upstream retries them and counts them against its breaker.
+    with pytest.raises(UpstreamUnavailable):
+        await service.extract("slow", timeout=0.05)
+    assert service.stats()["timeouts"] == 1
+    # The timed out job still holds its slot until the worker finishes.
+    assert service.stats()["running"] == 1
+
+    release.set()
+    for _ in range(100):
+        if service.stats()["running"] == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert service.stats()["running"] == 0
+    service.close()
+
+
+@pytest.mark.asyncio
+async def test_hung_worker_is_killed():
+    service = ExtractionService(max_workers=1, executor=ProcessPoolExecutor(1))
+
+    with pytest.raises(ExtractionError):
+        # A stand-in for a yt-dlp call that never returns.
+        await service._run(time.sleep, 30, timeout=0.5)
+
+    for _ in range(500):
+        if service.stats()["running"] == 0:
+            break
+        await asyncio.sleep(0.01)
+    stats = service.stats()
+    assert stats["running"] == 0
+    assert stats["recycles"] == 1
+    assert service._executor is None
+
+
+@pytest.mark.asyncio
+async def test_jobs_beside_a_hung_one_are_resubmitted():
+    service = ExtractionService(max_workers=2, executor=ProcessPoolExecutor(2))
+
+    # Stand-ins for a yt-dlp call that never returns and one that finishes after the pool is recycled.
+    hung = asyncio.create_task(service._run(time.sleep, 30, timeout=0.5))
+    healthy = asyncio.create_task(service._run(time.sleep, 1, timeout=30))
+
+    with pytest.raises(UpstreamUnavailable):
+        await hung
+    assert await healthy is None
+
+    stats = service.stats()
+    assert stats["recycles"] == 1
+    assert stats["resubmits"] == 1
+    assert stats["failures"] == 0
+    service.close()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.extraction_service.extract_youtube_info")
+async def test_extract_bounds_concurrency(mock_extract_youtube_info):
+    release = threading.Event()
+    active = []
+    peak = []
+
+    def extract(query):
+        active.append(query)
+        peak.append(len(active))
+        release.wait(5)
+        active.remove(query)
+        return INFO
+
+    mock_extract_youtube_info.side_effect = extract
+    service = ExtractionService(max_workers=2, executor=ThreadPoolExecutor(4))
+
+    jobs = [asyncio.create_task(service.extract(f"query {i}")) for i in range(5)]
+    await asyncio.sleep(0.1)
+    assert service.stats()["running"] == 2
+    assert service.stats()["queue_depth"] == 3
+
+    release.set()
+    assert await asyncio.gather(*jobs) == [INFO] * 5
+    assert max(peak) <= 2
+    assert service.stats()["queue_depth"] == 0
+    service.close()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.extraction_service.extract_youtube_info")
+async def test_extract_failure_raises(mock_extract_youtube_info):
+    mock_extract_youtube_info.side_effect = RuntimeError("boom")
+    service = ExtractionService(max_workers=1, executor=ThreadPoolExecutor(1))
+
+    with pytest.raises(ExtractionError):
+        await service.extract("query")
+    assert service.stats()["failures"] == 1
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.extraction_service.extract_youtube_info")
+async def test_extract_no_match_returns_none(mock_extract_youtube_info):
+    mock_extract_youtube_info.return_value = None
+    service = ExtractionService(max_workers=1, executor=ThreadPoolExecutor(1))
+
+    assert await service.extract("query") is None
+    assert service.stats()["no_match"] == 1
+    assert service.stats()["failures"] == 0
+    service.close()
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import time
+import pytest
+from disk0muzik.utils.ffmpeg_supervisor import (
+    FFmpegCapacityError,
+    FFmpegSupervisor,
+    read_process_cpu,
+    read_process_rss,
+)
+
+
+class FakeProcess:
+    """
+    Stands in for an ffmpeg process; reports this test process's usage from /proc.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.returncode = None
+        self.kills = 0
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        self.kills += 1
+        self.returncode = -9
+
+
+def test_read_process_usage():
+    assert read_process_cpu(os.getpid()) >= 0
+    assert read_process_rss(os.getpid()) > 0
+    assert read_process_cpu(2**22 + 1) is None
+    assert read_process_rss(2**22 + 1) is None
+
+
+@pytest.mark.asyncio
+async def test_guild_cap_waits_for_a_free_slot():
+    supervisor = FFmpegSupervisor(max_processes=10, max_per_guild=2, slot_timeout=1)
+    first = await supervisor.acquire(1, "stream")
+    await supervisor.acquire(1, "stream")
+
+    waiting = asyncio.create_task(supervisor.acquire(1, "stream"))
+    # Other guilds are not held up.
+    await supervisor.acquire(2, "stream")
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+    assert supervisor.stats()["waiting"] == 1
+
+    first.release()
+    third = await waiting
+
+    assert third.guild == 1
+    assert supervisor.guild_stats(1)["running"] == 2
+    assert supervisor.stats()["waits"] == 1
+    await supervisor.close()
+
+
+@pytest.mark.asyncio
+async def test_global_cap_refuses_after_timeout():
+    supervisor = FFmpegSupervisor(max_processes=1, max_per_guild=2, slot_timeout=0.01)
+    await supervisor.acquire(None, "cache")
+
+    with pytest.raises(FFmpegCapacityError):
+        await supervisor.acquire(1, "stream")
+
+    assert supervisor.stats()["rejected"] == 1
+    await supervisor.close()
+
+
+@pytest.mark.asyncio
+async def test_stalled_process_is_killed():
+    supervisor = FFmpegSupervisor(stall_timeout=5)
+    slot = await supervisor.acquire(1, "stream")
+    process = FakeProcess()
+    slot.attach(process)
+
+    slot.reading_since = time.monotonic()
+    supervisor.check()
+    assert process.kills == 0
+    assert slot.rss_bytes > 0
+
+    slot.reading_since = time.monotonic() - 10
+    supervisor.check()
+    assert process.kills == 1
+    assert supervisor.stats()["stalls"] == 1
+    await supervisor.close()
+
+
+@pytest.mark.asyncio
+async def test_abandoned_slot_is_freed():
+    supervisor = FFmpegSupervisor(stall_timeout=0.01)
+    slot = await supervisor.acquire(1, "stream")
+    process = FakeProcess()
+    slot.attach(process)
+    supervisor.check()
+    process.returncode = 0
+
+    supervisor.check()
+    assert supervisor.guild_stats(1)["running"] == 1
+    await asyncio.sleep(0.02)
+    supervisor.check()
+
+    stats = supervisor.stats()
+    assert stats["running"] == 0
+    assert stats["reaped"] == 1
+    assert stats["guilds"][1]["finished"] == 1
+    assert stats["guilds"][1]["cpu_seconds"] > 0
+    await supervisor.close()
+
+
+@pytest.mark.asyncio
+async def test_kill_guild_leaves_other_guilds_running():
+    supervisor = FFmpegSupervisor()
+    processes = []
+    for guild in (1, 1, 2):
+        slot = await supervisor.acquire(guild, "stream")
+        processes.append(FakeProcess())
+        slot.attach(processes[-1])
+
+    assert supervisor.kill_guild(1) == 2
+    assert [process.kills for process in processes] == [1, 1, 0]
+    await supervisor.close()
@@ -1,6 +1,8 @@
 import pytest
 import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
 from disk0muzik.state.guild_music_state import GuildMusicState
+from disk0muzik.state.song import Song
 
 
 def test_guild_music_state_initialization():
@@ -11,5 +13,24 @@ def test_guild_music_state_initialization():
     assert guild_state.current_song is None
     assert not guild_state.is_paused
     assert guild_state.now_playing_message is None
-    assert isinstance(guild_state.skip_event, asyncio.Event)
+    assert guild_state.player is None
     assert isinstance(guild_state.lock, asyncio.Lock)
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.state.guild_music_state.get_catalog")
+async def test_get_next_song_from_catalog(mock_get_catalog):
+    shared_song = Song(spotify_id="123", title="Test Song", artist="Test Artist", requester="test_user")
+    catalog = MagicMock()
+    catalog.ensure_loaded = AsyncMock()
+    catalog.__len__.return_value = 1
+    catalog.__getitem__.return_value = shared_song
+    mock_get_catalog.return_value = catalog
+    guild_state = GuildMusicState()
+
+    entry = await guild_state.get_next_song()
+
+    assert entry.song is shared_song
+    assert entry.from_playlist
+    assert entry.requester == "test_user"
+    assert list(guild_state.playlist.history) == [0]
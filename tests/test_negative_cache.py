@@ -0,0 +1,54 @@
+from unittest.mock import patch
+from disk0muzik.utils.negative_cache import ERROR, NO_MATCH, NegativeCache
+
+
+def test_negative_cache_remembers_reason():
+    cache = NegativeCache()
+    cache.put("spotify", "garbage", NO_MATCH)
+    cache.put("youtube", "garbage", ERROR)
+
+    assert cache.get("spotify", "garbage") == NO_MATCH
+    assert cache.get("youtube", "garbage") == ERROR
+    assert cache.get("spotify", "unknown") is None
+    assert cache.stats() == {
+        "size": 2,
+        "no_match_hits": 1,
+        "error_hits": 1,
+        "misses": 1,
+        "evictions": 0,
+    }
+
+
+@patch("disk0muzik.utils.negative_cache.time.monotonic")
+def test_negative_cache_uses_separate_ttls(mock_monotonic):
+    mock_monotonic.return_value = 1000.0
+    cache = NegativeCache(miss_ttl=600, error_ttl=30)
+    cache.put("spotify", "no match", NO_MATCH)
+    cache.put("spotify", "failed", ERROR)
+
+    mock_monotonic.return_value = 1031.0
+    assert cache.get("spotify", "no match") == NO_MATCH
+    assert cache.get("spotify", "failed") is None
+
+    mock_monotonic.return_value = 1601.0
+    assert cache.get("spotify", "no match") is None
+
+
+def test_negative_cache_is_bounded():
+    cache = NegativeCache(max_size=2)
+    cache.put("spotify", "a", NO_MATCH)
+    cache.put("spotify", "b", NO_MATCH)
+    cache.get("spotify", "a")
+    cache.put("spotify", "c", NO_MATCH)
+
+    assert cache.get("spotify", "b") is None
+    assert cache.get("spotify", "a") == NO_MATCH
+    assert cache.stats()["evictions"] == 1
+
+
+def test_negative_cache_discard():
+    cache = NegativeCache()
+    cache.put("spotify", "a", ERROR)
+    cache.discard("spotify", "a")
+
+    assert cache.get("spotify", "a") is None
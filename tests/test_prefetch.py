@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from disk0muzik.state.song import Song
+from disk0muzik.utils.prefetch import Prefetcher, resolve_song_stream
+
+
+def make_song(spotify_id, youtube_url):
+    return Song(
+        spotify_id=spotify_id,
+        title=f"Song {spotify_id}",
+        artist="Test Artist",
+        youtube_url=youtube_url,
+    )
+
+
+def make_info(video_url):
+    return {"video_url": video_url, "audio_url": f"{video_url}&audio", "title": "x", "thumbnail": None}
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.prefetch.get_song_writer")
+@patch("disk0muzik.utils.prefetch.get_stream_info", new_callable=AsyncMock)
+async def test_resolve_song_stream_repairs_broken_url(mock_get_stream_info, mock_get_song_writer):
+    song = make_song("1", "https://www.youtube.com/watch?v=brokenvideo")
+    repaired_info = make_info("https://www.youtube.com/watch?v=fixedvideo1")
+    mock_get_stream_info.side_effect = [None, repaired_info]
+
+    info, repaired = await resolve_song_stream(song)
+
+    assert info is repaired_info
+    assert repaired.youtube_url == "https://www.youtube.com/watch?v=fixedvideo1"
+    assert mock_get_stream_info.await_args_list[1][0][0] == "Song 1 Test Artist"
+    mock_get_song_writer.return_value.enqueue.assert_called_once_with(repaired, replace_url=True)
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.prefetch.get_audio_cache")
+@patch("disk0muzik.utils.prefetch.get_stream_info", new_callable=AsyncMock)
+async def test_resolve_joins_prefetch_in_flight(mock_get_stream_info, mock_get_audio_cache):
+    release = asyncio.Event()
+    calls = []
+
+    async def slow_get_stream_info(query):
+        calls.append(query)
+        await release.wait()
+        return make_info(query)
+
+    mock_get_stream_info.side_effect = slow_get_stream_info
+    song = make_song("1", "https://www.youtube.com/watch?v=aaaaaaaaaaa")
+    prefetcher = Prefetcher()
+
+    prefetcher.schedule(song)
+    prefetcher.schedule(song)
+    await asyncio.sleep(0)
+    resolving = asyncio.create_task(prefetcher.resolve(song))
+    await asyncio.sleep(0)
+    release.set()
+    info, _ = await resolving
+
+    assert info["video_url"] == song.youtube_url
+    # One prefetch plus the final cache re-check, never a second prefetch.
+    assert len(calls) == 2
+    assert prefetcher.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.prefetch.get_audio_cache")
+@patch("disk0muzik.utils.prefetch.get_stream_info", new_callable=AsyncMock)
+async def test_scheduling_another_song_cancels_prefetch(mock_get_stream_info, mock_get_audio_cache):
+    started = asyncio.Event()
+
+    async def hanging_get_stream_info(query):
+        started.set()
+        await asyncio.Event().wait()
+
+    mock_get_stream_info.side_effect = hanging_get_stream_info
+    prefetcher = Prefetcher()
+
+    prefetcher.schedule(make_song("1", "https://www.youtube.com/watch?v=aaaaaaaaaaa"))
+    first_task = prefetcher._task
+    await started.wait()
+    prefetcher.schedule(make_song("2", "https://www.youtube.com/watch?v=bbbbbbbbbbb"))
+    await asyncio.sleep(0)
+
+    assert first_task.cancelled()
+    prefetcher.cancel()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.prefetch.get_stream_info", new_callable=AsyncMock)
+async def test_resolve_without_prefetch(mock_get_stream_info):
+    song = make_song("1", "https://www.youtube.com/watch?v=aaaaaaaaaaa")
+    mock_get_stream_info.return_value = make_info(song.youtube_url)
+    prefetcher = Prefetcher()
+
+    info, resolved = await prefetcher.resolve(song)
+
+    assert resolved is song
+    assert prefetcher.stats()["misses"] == 1
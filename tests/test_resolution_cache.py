@@ -0,0 +1,62 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from disk0muzik.utils.resolution_cache import ResolutionCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  AC/DC -  Back In Black!! ") == "ac dc back in black"
+    assert normalize_query("Beyoncé_Halo") == normalize_query("beyoncé halo")
+    assert normalize_query("?!") == ""
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.resolution_cache.save_query_resolution", new_callable=AsyncMock)
+@patch("disk0muzik.utils.resolution_cache.get_query_resolution", new_callable=AsyncMock)
+async def test_put_then_get_hits_memory(mock_get_query_resolution, mock_save_query_resolution):
+    cache = ResolutionCache()
+
+    cache.put("Test Song", "123")
+    await cache.close()
+
+    assert await cache.get("test   song!") == "123"
+    mock_get_query_resolution.assert_not_awaited()
+    mock_save_query_resolution.assert_awaited_once_with("test song", "123")
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.resolution_cache.get_query_resolution", new_callable=AsyncMock)
+async def test_get_falls_back_to_database(mock_get_query_resolution):
+    mock_get_query_resolution.return_value = "123"
+    cache = ResolutionCache(ttl=60)
+
+    assert await cache.get("Test Song") == "123"
+    assert await cache.get("Test Song") == "123"
+
+    mock_get_query_resolution.assert_awaited_once_with("test song", 60)
+    assert cache.stats() == {"size": 1, "hits": 1, "db_hits": 1, "misses": 0}
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.resolution_cache.get_query_resolution", new_callable=AsyncMock)
+async def test_expired_entries_miss(mock_get_query_resolution):
+    mock_get_query_resolution.return_value = None
+    cache = ResolutionCache(ttl=-1)
+    cache._remember("test song", "123", 0)
+
+    assert await cache.get("Test Song") is None
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.resolution_cache.save_query_resolution", new_callable=AsyncMock)
+async def test_lru_is_bounded(mock_save_query_resolution):
+    cache = ResolutionCache(max_size=2)
+
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.put("c", "3")
+    await cache.close()
+
+    assert list(cache._entries) == ["b", "c"]
@@ -0,0 +1,59 @@
+import random
+from disk0muzik.state.shuffle import ShufflePlaylist
+
+
+def test_cycle_is_a_permutation():
+    playlist = ShufflePlaylist(10)
+
+    cycle = [playlist.next() for _ in range(10)]
+
+    assert sorted(cycle) == list(range(10))
+    assert playlist.remaining() == 0
+
+
+def test_no_repeat_across_cycles():
+    random.seed(1234)
+    playlist = ShufflePlaylist(3)
+
+    played = [playlist.next() for _ in range(300)]
+
+    assert all(a != b for a, b in zip(played, played[1:]))
+
+
+def test_single_song_repeats():
+    playlist = ShufflePlaylist(1)
+
+    assert [playlist.next() for _ in range(3)] == [0, 0, 0]
+
+
+def test_empty_playlist():
+    playlist = ShufflePlaylist()
+
+    assert playlist.next() is None
+
+
+def test_extend_mid_cycle():
+    playlist = ShufflePlaylist(5)
+    first = [playlist.next() for _ in range(3)]
+
+    playlist.extend(8)
+    rest = [playlist.next() for _ in range(5)]
+
+    assert sorted(first + rest) == list(range(8))
+
+
+def test_peek_matches_next():
+    playlist = ShufflePlaylist(5)
+
+    peeked = playlist.peek()
+
+    assert playlist.peek() == peeked
+    assert playlist.next() == peeked
+
+
+def test_history_is_bounded():
+    playlist = ShufflePlaylist(10, history_size=4)
+
+    played = [playlist.next() for _ in range(10)]
+
+    assert list(playlist.history) == played[-4:]
@@ -0,0 +1,77 @@
+import dataclasses
+import time
+import pytest
+from disk0muzik.state.song import Song, QueueEntry
+
+
+@pytest.fixture
+def sample_song():
+    return {
+        "spotify_id": "123",
+        "title": "Test Song",
+        "artist": "Test Artist",
+        "thumbnail": "https://image.url/test.jpg",
+        "youtube_url": "https://youtube.com/test",
+        "requester": "test_user",
+    }
+
+
+def test_song_round_trip(sample_song):
+    song = Song.from_dict(sample_song)
+
+    assert song.to_dict() == sample_song
+    assert song.as_row() == (
+        "123",
+        "Test Song",
+        "Test Artist",
+        "https://image.url/test.jpg",
+        "https://youtube.com/test",
+        "test_user",
+    )
+
+
+def test_song_is_immutable_and_slotted(sample_song):
+    song = Song.from_dict(sample_song)
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        song.title = "Other Song"
+    assert not hasattr(song, "__dict__")
+
+
+def test_song_strings_are_interned(sample_song):
+    first = Song.from_dict(sample_song)
+    second = Song.from_dict({**sample_song, "artist": "".join(["Test ", "Artist"])})
+
+    assert first.artist is second.artist
+
+
+def test_song_replace(sample_song):
+    song = Song.from_dict(sample_song)
+
+    repaired = song.replace(youtube_url="https://youtube.com/new")
+
+    assert repaired.youtube_url == "https://youtube.com/new"
+    assert song.youtube_url == "https://youtube.com/test"
+
+
+def test_queue_entries_do_not_share_runtime_state(sample_song):
+    song = Song.from_dict(sample_song)
+
+    first = QueueEntry(song=song, requester="a", requester_id=1)
+    second = QueueEntry(song=song, requester="b", from_playlist=True)
+    first.message = object()
+
+    assert second.message is None
+    assert first.song is second.song
+
+
+def test_queue_entry_stream_is_taken_once_while_valid(sample_song):
+    song = Song.from_dict(sample_song)
+    stream = {"audio_url": "https://youtube.com/audio-url"}
+
+    entry = QueueEntry(song=song, requester="test_user", stream=stream, stream_expires_at=time.time() + 3600)
+    assert entry.take_stream(margin=60) is stream
+    assert entry.take_stream(margin=60) is None
+
+    expiring = QueueEntry(song=song, requester="test_user", stream=stream, stream_expires_at=time.time() + 30)
+    assert expiring.take_stream(margin=60) is None
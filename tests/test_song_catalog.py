@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch, AsyncMock
+from disk0muzik.state.song import Song
+from disk0muzik.state.song_catalog import SongCatalog, WATERMARK_LOOKBACK
+
+
+def make_song(spotify_id, youtube_url="https://youtube.com/test"):
+    return Song(
+        spotify_id=spotify_id,
+        title=f"Song {spotify_id}",
+        artist="Test Artist",
+        thumbnail="https://image.url/test.jpg",
+        youtube_url=youtube_url,
+        requester="test_user",
+    )
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.state.song_catalog.get_songs_updated_since", new_callable=AsyncMock)
+async def test_catalog_loads_once(mock_get_songs_updated_since):
+    watermark = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    mock_get_songs_updated_since.return_value = ([make_song("1"), make_song("2")], watermark)
+    catalog = SongCatalog()
+
+    await catalog.ensure_loaded()
+    await catalog.ensure_loaded()
+
+    mock_get_songs_updated_since.assert_awaited_once_with(None)
+    assert len(catalog) == 2
+    assert catalog.get("2").title == "Song 2"
+    assert catalog.index_of("1") == 0
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.state.song_catalog.get_songs_updated_since", new_callable=AsyncMock)
+async def test_refresh_is_incremental_and_keeps_indices(mock_get_songs_updated_since):
+    first = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    second = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    mock_get_songs_updated_since.side_effect = [
+        ([make_song("1"), make_song("2")], first),
+        ([make_song("1", "https://youtube.com/new"), make_song("3")], second),
+    ]
+    catalog = SongCatalog()
+
+    await catalog.refresh()
+    await catalog.refresh()
+
+    assert mock_get_songs_updated_since.await_args_list[1][0][0] == first - WATERMARK_LOOKBACK
+    assert [song.spotify_id for song in catalog.songs] == ["1", "2", "3"]
+    assert catalog[0].youtube_url == "https://youtube.com/new"
+    assert catalog.stats()["watermark"] == second
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.state.song_catalog.get_songs_updated_since", new_callable=AsyncMock)
+async def test_request_refresh_wakes_background_task(mock_get_songs_updated_since):
+    mock_get_songs_updated_since.return_value = ([], None)
+    catalog = SongCatalog(poll_interval=60)
+    catalog.start()
+
+    catalog.request_refresh()
+    await asyncio.sleep(0.05)
+
+    mock_get_songs_updated_since.assert_awaited_once()
+    await catalog.close()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.state.song_catalog.get_songs_updated_since", new_callable=AsyncMock)
+async def test_catalog_search_honours_threshold(mock_get_songs_updated_since):
+    mock_get_songs_updated_since.return_value = ([make_song("1"), make_song("2")], None)
+    catalog = SongCatalog()
+    await catalog.ensure_loaded()
+
+    assert catalog.search("song 2 test artist").spotify_id == "2"
+    assert catalog.search("song 2 other band", threshold=0.9) is None
+    assert catalog.stats()["matches"] == 1
+    assert catalog.stats()["searches"] == 2
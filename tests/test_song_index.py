@@ -0,0 +1,50 @@
+from disk0muzik.state.song import Song
+from disk0muzik.state.song_index import SongIndex, similarity, trigrams
+
+SONGS = [
+    Song(spotify_id="1", title="Back In Black", artist="AC/DC"),
+    Song(spotify_id="2", title="Black", artist="Pearl Jam"),
+    Song(spotify_id="3", title="Back to Black", artist="Amy Winehouse"),
+    Song(spotify_id="4", title="Bohemian Rhapsody", artist="Queen"),
+]
+
+
+def make_index():
+    index = SongIndex()
+    for i, song in enumerate(SONGS):
+        index.put(i, song)
+    return index
+
+
+def test_trigrams_are_normalized():
+    assert trigrams("Back!") == trigrams("back")
+    assert trigrams("back") == {"  b", " ba", "bac", "ack", "ck "}
+    assert similarity(trigrams("back in black"), trigrams("Black in Back")) == 1.0
+
+
+def test_search_matches_title_with_or_without_artist():
+    index = make_index()
+
+    assert index.search("back in black") == (0, 1.0)
+    assert index.search("AC/DC - Back in Black") == (0, 1.0)
+    assert index.search("black pearl jam")[0] == 1
+    assert index.search("back to black amy")[0] == 2
+
+
+def test_search_tolerates_typos():
+    index, score = make_index().search("bohemian rapsody")
+
+    assert index == 3
+    assert 0.7 < score < 1.0
+
+
+def test_search_without_overlap():
+    assert make_index().search("xyz") is None
+
+
+def test_put_replaces_song_in_place():
+    index = make_index()
+    index.put(1, Song(spotify_id="2", title="Alive", artist="Pearl Jam"))
+
+    assert index.search("alive")[0] == 1
+    assert index.search("black")[0] != 1
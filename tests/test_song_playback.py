@@ -0,0 +1,317 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from disk0muzik.state.guild_music_state import GuildMusicState
+from disk0muzik.state.song import Song, QueueEntry
+from disk0muzik.utils.audio_source import GaplessSource
+from disk0muzik.utils.song_playback import GuildPlayer
+
+
+class FakeSource:
+    """
+    An Opus source with a few numbered frames.
+    """
+
+    def __init__(self, url, frames=3, duration=0.06):
+        self.url = url
+        self.duration = duration
+        self.audio_info = {"audio_url": url, "video_url": f"https://youtu.be/{url:_<11}"}
+        self._frames = [f"{url}#{i}".encode() for i in range(frames)]
+        self.cleaned_up = False
+
+    def read(self):
+        return self._frames.pop(0) if self._frames else b""
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+    def stats(self):
+        return {}
+
+
+class FakeVoiceClient:
+    """
+    Plays nothing; tests read frames the way discord.py's audio thread does.
+    """
+
+    def __init__(self):
+        self.sources = []
+        self._after = None
+        self.playing = False
+        self.paused = False
+
+    def play(self, source, after):
+        assert not self.playing and not self.paused, "already playing audio"
+        self.sources.append(source)
+        self._after = after
+        self.playing = True
+
+    def read(self):
+        frame = self.sources[-1].read()
+        if not frame:
+            self.finish()
+        return frame
+
+    def finish(self):
+        self.playing = self.paused = False
+        self._after(None)
+
+    def stop(self):
+        if self.playing or self.paused:
+            self.finish()
+
+    def pause(self):
+        self.playing, self.paused = False, True
+
+    def resume(self):
+        self.playing, self.paused = True, False
+
+    def is_playing(self):
+        return self.playing
+
+    def is_paused(self):
+        return self.paused
+
+
+def make_entry(title):
+    entry = QueueEntry(
+        song=Song(spotify_id=title, title=title, artist="Test Artist"),
+        requester="test_user",
+        requester_id=42,
+    )
+    entry.stream = {"audio_url": title}
+    entry.stream_expires_at = time.time() + 3600
+    return entry
+
+
+async def settle(player):
+    # Prebuffering reads frames on a worker thread.
+    for _ in range(500):
+        await asyncio.sleep(0.001)
+        if player._commands.empty() and not player._preloading:
+            break
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def player():
+    guild_state = GuildMusicState()
+    guild_state.voice_client = FakeVoiceClient()
+    guild_state.get_next_song = AsyncMock(return_value=None)
+    guild_state.prefetch_next_song = MagicMock()
+    channel = MagicMock()
+    channel.send = AsyncMock(return_value=MagicMock(edit=AsyncMock()))
+    create_audio_source = AsyncMock(side_effect=lambda info, guild: FakeSource(info["audio_url"], duration=info.get("duration", 0.06)))
+    with patch("disk0muzik.utils.song_playback.create_audio_source", create_audio_source), patch(
+        "disk0muzik.utils.song_playback.get_song_writer"
+    ), patch("disk0muzik.utils.song_playback.get_audio_cache"):
+        yield GuildPlayer(guild_state), channel
+
+
+@pytest.mark.asyncio
+async def test_player_switches_tracks_without_a_gap(player):
+    player, channel = player
+    voice_client = player.guild_state.voice_client
+
+    player.enqueue(channel, [make_entry("first"), make_entry("second")])
+    await settle(player)
+    task = player._task
+
+    assert isinstance(voice_client.sources[0], GaplessSource)
+    assert player.state == GuildPlayer.PLAYING
+    assert player.stats()["next_ready"]
+
+    frames = [voice_client.read() for _ in range(6)]
+    await settle(player)
+
+    # The second track follows the last frame of the first on the same output.
+    assert frames == [b"first#0", b"first#1", b"first#2", b"second#0", b"second#1", b"second#2"]
+    assert len(voice_client.sources) == 1
+    assert player.guild_state.current_song.song.title == "second"
+
+    assert voice_client.read() == b""
+    await settle(player)
+    assert player.state == GuildPlayer.IDLE
+    assert player.guild_state.current_song is None
+    assert player._task is task
+    assert player.stats()["tracks_played"] == 2
+    await player.close()
+
+
+@pytest.mark.asyncio
+async def test_next_track_of_unknown_length_waits_in_the_queue(player):
+    player, channel = player
+    first, second = make_entry("first"), make_entry("second")
+    first.stream["duration"] = None
+
+    with patch("disk0muzik.utils.song_playback.GAPLESS_UNKNOWN_PRELOAD_AFTER", 0.04):
+        player.enqueue(channel, [first, second])
+        for _ in range(20):
+            await asyncio.sleep(0)
+        # Not lined up yet, so the second entry is still in the queue.
+        assert player.guild_state.queue == [second]
+        assert not player.stats()["next_ready"]
+
+        player.guild_state.voice_client.read()
+        player.guild_state.voice_client.read()
+        await settle(player)
+
+    assert player.guild_state.queue == []
+    assert player.stats()["next_ready"]
+    await player.close()
+
+
+@pytest.mark.asyncio
+async def test_only_started_tracks_count_as_plays(player):
+    player, channel = player
+    voice_client = player.guild_state.voice_client
+    with patch("disk0muzik.utils.song_playback.get_audio_cache") as mock_get_audio_cache:
+        player.enqueue(channel, [make_entry("first"), make_entry("second")])
+        await settle(player)
+        # The second track is buffered but has not started.
+        record_play = mock_get_audio_cache.return_value.record_play
+        assert [call.args[0] for call in record_play.call_args_list] == ["first______"]
+
+        for _ in range(4):
+            voice_client.read()
+        await settle(player)
+        assert [call.args[0] for call in record_play.call_args_list] == ["first______", "second_____"]
+    await player.close()
+
+
+@pytest.mark.asyncio
+async def test_skip_switches_to_the_buffered_track(player):
+    player, channel = player
+    voice_client = player.guild_state.voice_client
+    player.enqueue(channel, [make_entry("first"), make_entry("second"), make_entry("third")])
+    await settle(player)
+
+    assert voice_client.read() == b"first#0"
+    player.skip()
+    await settle(player)
+    assert voice_client.read() == b"second#0"
+    await settle(player)
+
+    assert player.guild_state.current_song.song.title == "second"
+    assert player.stats()["tracks_skipped"] == 1
+    # The third track is lined up behind the second.
+    assert player.guild_state.queue == []
+    assert player.stats()["next_ready"]
+    await player.close()
+
+
+@pytest.mark.asyncio
+async def test_skip_during_a_pending_switch_skips_the_new_track(player):
+    player, channel = player
+    voice_client = player.guild_state.voice_client
+    player.enqueue(channel, [make_entry("first"), make_entry("second"), make_entry("third")])
+    await settle(player)
+
+    # The audio thread moves on to the second track; its switch is not handled yet.
+    frames = [voice_client.read() for _ in range(4)]
+    assert frames[-1] == b"second#0"
+    player.skip()
+    await settle(player)
+
+    assert player.guild_state.current_song.song.title == "third"
+    assert player.stats()["tracks_skipped"] == 1
+    await player.close()
+
+
+@pytest.mark.asyncio
+async def test_queued_songs_go_before_a_lined_up_playlist_song(player):
+    player, channel = player
+    voice_client = player.guild_state.voice_client
+    playlist_entry = make_entry("playlist")
+    playlist_entry.from_playlist = True
+    player.guild_state.get_next_song.return_value = playlist_entry
+    player.enqueue(channel, [make_entry("first")])
+    await settle(player)
+    assert player.stats()["next_ready"]
+
+    player.enqueue(channel, [make_entry("second")])
+    await settle(player)
+
+    assert [entry.song.title for entry in player.guild_state.queue] == ["playlist"]
+    frames = [voice_client.read() for _ in range(4)]
+    assert frames[-1] == b"second#0"
+    await player.close()
+
+
+@pytest.mark.asyncio
+async def test_playlist_song_that_already_started_is_not_requeued(player):
+    player, channel = player
+    voice_client = player.guild_state.voice_client
+    playlist_entry = make_entry("playlist")
+    playlist_entry.from_playlist = True
+    player.guild_state.get_next_song.side_effect = [playlist_entry, None]
+    player.enqueue(channel, [make_entry("first")])
+    await settle(player)
+
+    # The audio thread moves on to the playlist song; its switch is not handled yet.
+    frames = [voice_client.read() for _ in range(4)]
+    assert frames[-1] == b"playlist#0"
+    player.enqueue(channel, [make_entry("second")])
+    await settle(player)
+
+    assert player.guild_state.current_song is playlist_entry
+    assert [entry.song.title for entry in player.guild_state.queue] == []
+    assert voice_client.read() == b"playlist#1"
+    assert voice_client.read() == b"playlist#2"
+    assert voice_client.read() == b"second#0"
+    await player.close()
+
+
+@pytest.mark.asyncio
+async def test_stop_clears_the_queue(player):
+    player, channel = player
+    player.guild_id = 7
+    player.enqueue(channel, [make_entry("first"), make_entry("second"), make_entry("third")])
+    await settle(player)
+
+    with patch("disk0muzik.utils.song_playback.get_ffmpeg_supervisor") as mock_get_ffmpeg_supervisor:
+        player.stop()
+        await settle(player)
+
+    mock_get_ffmpeg_supervisor.return_value.kill_guild.assert_called_once_with(7)
+
+    assert player.state == GuildPlayer.IDLE
+    assert player.guild_state.current_song is None
+    assert player.guild_state.queue == []
+    assert not player.guild_state.voice_client.is_playing()
+    await player.close()
+
+
+@pytest.mark.asyncio
+async def test_skip_without_a_next_track_stops(player):
+    player, channel = player
+    player.enqueue(channel, [make_entry("first")])
+    await settle(player)
+
+    player.skip()
+    await settle(player)
+
+    assert player.state == GuildPlayer.IDLE
+    assert player.stats()["tracks_skipped"] == 1
+    await player.close()
+
+
+@pytest.mark.asyncio
+async def test_player_pause_and_resume(player):
+    player, channel = player
+    voice_client = player.guild_state.voice_client
+    player.enqueue(channel, [make_entry("first")])
+    await settle(player)
+
+    player.pause()
+    await settle(player)
+    assert player.state == GuildPlayer.PAUSED
+    assert voice_client.is_paused()
+
+    player.resume()
+    await settle(player)
+    assert player.state == GuildPlayer.PLAYING
+    assert voice_client.is_playing()
+    await player.close()
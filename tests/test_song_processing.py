@@ -1,27 +1,357 @@
+import asyncio
 import pytest
-from unittest.mock import patch
-from disk0muzik.utils.song_processing import process_song_query
+from unittest.mock import patch, AsyncMock
+from disk0muzik.state.song import Song, QueueEntry
+from disk0muzik.utils.song_processing import (
+    group_queries,
+    process_song_queries,
+    process_song_query,
+    process_spotify_collection,
+    process_youtube_playlist,
+    split_queries,
+)
 
 
 @pytest.mark.asyncio
-@patch("disk0muzik.utils.song_processing.search_spotify")
-@patch("disk0muzik.utils.song_processing.extract_youtube_info")
-async def test_process_song_query(mock_extract_youtube_info, mock_search_spotify):
+@patch("disk0muzik.utils.song_processing.get_resolution_cache")
+@patch("disk0muzik.utils.song_processing.get_song_writer")
+@patch("disk0muzik.utils.song_processing.get_song", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.search_spotify", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.get_stream_info", new_callable=AsyncMock)
+async def test_process_song_query(
+    mock_get_stream_info,
+    mock_search_spotify,
+    mock_get_song,
+    mock_get_song_writer,
+    mock_get_resolution_cache,
+):
+    mock_get_resolution_cache.return_value.get = AsyncMock(return_value=None)
+    mock_get_song.return_value = None
+    mock_get_song_writer.return_value.pending.return_value = None
     mock_search_spotify.return_value = {
         "spotify_id": "123",
         "title": "Test Song",
         "artist": "Test Artist",
         "album_art": "https://image.url/test.jpg",
     }
-    mock_extract_youtube_info.return_value = {
+    mock_get_stream_info.return_value = {
         "video_url": "https://youtube.com/video-url",
         "audio_url": "https://youtube.com/audio-url",
         "title": "Test Video",
         "thumbnail": "https://youtube.com/thumbnail.jpg",
     }
 
-    result = await process_song_query("Test Query", "test_user")
+    result = await process_song_query("Test Query", "test_user", 42)
 
-    assert result["spotify_id"] == "123"
-    assert result["title"] == "Test Song"
-    assert result["artist"] == "Test Artist"
+    assert result.song.spotify_id == "123"
+    assert result.song.title == "Test Song"
+    assert result.song.artist == "Test Artist"
+    assert result.song.youtube_url == "https://youtube.com/video-url"
+    assert result.requester == "test_user"
+    assert result.requester_id == 42
+    mock_get_song_writer.return_value.enqueue.assert_called_once_with(result.song)
+    mock_get_resolution_cache.return_value.put.assert_called_once_with("Test Query", "123")
+
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_processing.find_existing_song", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.get_resolution_cache")
+@patch("disk0muzik.utils.song_processing.search_spotify", new_callable=AsyncMock)
+async def test_process_song_query_cached_resolution(
+    mock_search_spotify, mock_get_resolution_cache, mock_find_existing_song
+):
+    song = Song(
+        spotify_id="123",
+        title="Test Song",
+        artist="Test Artist",
+        youtube_url="https://youtube.com/video-url",
+    )
+    mock_get_resolution_cache.return_value.get = AsyncMock(return_value="123")
+    mock_find_existing_song.return_value = song
+
+    result = await process_song_query("test   query!", "test_user", 42)
+
+    assert result.song is song
+    mock_search_spotify.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_processing.get_resolution_cache")
+@patch("disk0muzik.utils.song_processing.get_song_writer")
+@patch("disk0muzik.utils.song_processing.get_song", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.search_spotify", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.get_stream_info", new_callable=AsyncMock)
+async def test_process_song_query_coalesces_concurrent_queries(
+    mock_get_stream_info,
+    mock_search_spotify,
+    mock_get_song,
+    mock_get_song_writer,
+    mock_get_resolution_cache,
+):
+    mock_get_resolution_cache.return_value.get = AsyncMock(return_value=None)
+    mock_get_song.return_value = None
+    mock_get_song_writer.return_value.pending.return_value = None
+
+    async def search(query):
+        await asyncio.sleep(0.05)
+        return {
+            "spotify_id": "123",
+            "title": "Test Song",
+            "artist": "Test Artist",
+            "album_art": "https://image.url/test.jpg",
+        }
+
+    mock_search_spotify.side_effect = search
+    mock_get_stream_info.return_value = {
+        "video_url": "https://youtube.com/video-url",
+        "audio_url": "https://youtube.com/audio-url",
+        "title": "Test Video",
+        "thumbnail": "https://youtube.com/thumbnail.jpg",
+    }
+
+    results = await asyncio.gather(
+        process_song_query("Test Query", "first", 1),
+        process_song_query("test query!", "second", 2),
+        process_song_query("TEST  QUERY", "third", 3),
+    )
+
+    assert [entry.requester_id for entry in results] == [1, 2, 3]
+    assert len({id(entry.song) for entry in results}) == 1
+    mock_search_spotify.assert_awaited_once()
+    mock_get_song.assert_awaited_once()
+    mock_get_stream_info.assert_awaited_once()
+    mock_get_song_writer.return_value.enqueue.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_processing.get_song_writer")
+@patch("disk0muzik.utils.song_processing.get_song", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.search_spotify", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.get_stream_info", new_callable=AsyncMock)
+async def test_process_song_query_youtube_url_plays_before_spotify(
+    mock_get_stream_info, mock_search_spotify, mock_get_song, mock_get_song_writer
+):
+    mock_get_song.return_value = None
+    mock_get_song_writer.return_value.pending.return_value = None
+    spotify_found = asyncio.Event()
+
+    async def search(query):
+        await spotify_found.wait()
+        return {
+            "spotify_id": "123",
+            "title": "Test Song",
+            "artist": "Test Artist",
+            "album_art": "https://image.url/test.jpg",
+        }
+
+    mock_search_spotify.side_effect = search
+    stream = {
+        "video_url": "https://www.youtube.com/watch?v=abcdefghijk",
+        "audio_url": "https://rr1.googlevideo.com/videoplayback?expire=4102444800",
+        "title": "Test Video",
+        "artist": "Test Channel",
+        "thumbnail": "https://youtube.com/thumbnail.jpg",
+        "acodec": "opus",
+    }
+    mock_get_stream_info.return_value = stream
+
+    result = await process_song_query("https://youtu.be/abcdefghijk", "test_user", 42)
+
+    # The entry is playable while Spotify has not answered yet.
+    assert result.song.spotify_id == ""
+    assert result.song.title == "Test Video"
+    assert result.song.artist == "Test Channel"
+    assert result.stream_expires_at == 4102444800
+    assert result.take_stream(margin=900) is stream
+    # The stream is handed to playback once; replays resolve it again.
+    assert result.take_stream(margin=900) is None
+    assert not result.enrichment.done()
+
+    spotify_found.set()
+    song = await result.enrichment
+
+    assert song.spotify_id == "123"
+    assert song.title == "Test Song"
+    assert song.youtube_url == stream["video_url"]
+    mock_get_song_writer.return_value.enqueue.assert_called_once_with(song)
+    mock_get_stream_info.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_processing.get_catalog")
+@patch("disk0muzik.utils.song_processing.get_resolution_cache")
+@patch("disk0muzik.utils.song_processing.search_spotify", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.get_stream_info", new_callable=AsyncMock)
+async def test_process_song_query_local_match_skips_spotify(
+    mock_get_stream_info, mock_search_spotify, mock_get_resolution_cache, mock_get_catalog
+):
+    song = Song(
+        spotify_id="123",
+        title="Test Song",
+        artist="Test Artist",
+        youtube_url="https://youtube.com/video-url",
+    )
+    mock_get_resolution_cache.return_value.get = AsyncMock(return_value=None)
+    mock_get_catalog.return_value.search.return_value = song
+
+    result = await process_song_query("test song test artist", "test_user", 42)
+
+    assert result.song is song
+    mock_search_spotify.assert_not_awaited()
+    mock_get_stream_info.assert_not_awaited()
+    mock_get_resolution_cache.return_value.put.assert_called_once_with("test song test artist", "123")
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_processing.SPOTIFY_RESOLVE_CONCURRENCY", 3)
+@patch("disk0muzik.utils.song_processing.resolve_spotify_result", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.iter_spotify_collection")
+async def test_process_spotify_collection_streams_in_order(
+    mock_iter_spotify_collection, mock_resolve_spotify_result
+):
+    async def tracks(kind, collection_id):
+        for i in range(20):
+            yield {"spotify_id": f"playlist-{i}", "title": f"Song {i}", "artist": "Test Artist"}
+
+    active = []
+    peak = []
+
+    async def resolve(spotify_result, requester):
+        active.append(spotify_result["spotify_id"])
+        peak.append(len(active))
+        # Later tracks finish first, entries must still come out in order.
+        await asyncio.sleep(0.001 * (20 - int(spotify_result["spotify_id"].split("-")[1])))
+        active.remove(spotify_result["spotify_id"])
+        if spotify_result["spotify_id"] == "playlist-5":
+            return None
+        return Song(
+            spotify_id=spotify_result["spotify_id"],
+            title=spotify_result["title"],
+            artist=spotify_result["artist"],
+        )
+
+    mock_iter_spotify_collection.side_effect = tracks
+    mock_resolve_spotify_result.side_effect = resolve
+
+    entries = [
+        entry async for entry in process_spotify_collection("playlist", "abc", "test_user", 42)
+    ]
+
+    assert [entry.song.spotify_id for entry in entries] == [
+        f"playlist-{i}" for i in range(20) if i != 5
+    ]
+    assert all(entry.requester_id == 42 for entry in entries)
+    assert max(peak) <= 3
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_processing.resolve_spotify_result", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.iter_spotify_collection")
+async def test_process_spotify_collection_yields_first_entry_early(
+    mock_iter_spotify_collection, mock_resolve_spotify_result
+):
+    fetched = []
+
+    async def tracks(kind, collection_id):
+        for i in range(500):
+            fetched.append(i)
+            yield {"spotify_id": f"early-{i}", "title": f"Song {i}", "artist": "Test Artist"}
+
+    mock_iter_spotify_collection.side_effect = tracks
+    mock_resolve_spotify_result.side_effect = lambda result, requester: Song(
+        spotify_id=result["spotify_id"], title=result["title"], artist=result["artist"]
+    )
+
+    collection = process_spotify_collection("playlist", "abc", "test_user", 42)
+    first = await collection.__anext__()
+    await collection.aclose()
+
+    assert first.song.spotify_id == "early-0"
+    assert len(fetched) < 50
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_processing.get_stream_info", new_callable=AsyncMock)
+@patch("disk0muzik.utils.song_processing.get_extraction_service")
+async def test_process_youtube_playlist_defers_stream_resolution(
+    mock_get_extraction_service, mock_get_stream_info
+):
+    mock_extract_playlist = mock_get_extraction_service.return_value.extract_playlist = AsyncMock(
+        return_value=[
+            {
+                "video_url": f"https://www.youtube.com/watch?v=video{i:06d}",
+                "title": f"Video {i}",
+                "artist": "Test Channel",
+                "thumbnail": None,
+            }
+            for i in range(300)
+        ]
+    )
+
+    entries = await process_youtube_playlist(
+        "https://www.youtube.com/playlist?list=PL1234", "test_user", 42
+    )
+
+    assert len(entries) == 300
+    assert entries[0].song.youtube_url == "https://www.youtube.com/watch?v=video000000"
+    assert entries[0].song.spotify_id == ""
+    assert entries[299].requester_id == 42
+    mock_extract_playlist.assert_awaited_once()
+    mock_get_stream_info.assert_not_awaited()
+
+
+def test_split_queries():
+    assert split_queries("song a; song b\nsong c;;") == ["song a", "song b", "song c"]
+    assert split_queries("just one song") == ["just one song"]
+
+
+def test_group_queries_separates_collection_links():
+    queries = [
+        "song a",
+        "https://open.spotify.com/album/4aawyAB9vmqN3uQ7FjRGTy",
+        "song b",
+        "https://open.spotify.com/track/11dFghVXANMlKmJXsNCbNl",
+        "https://www.youtube.com/playlist?list=PL123",
+    ]
+
+    assert group_queries(queries) == [
+        ["song a"],
+        ["https://open.spotify.com/album/4aawyAB9vmqN3uQ7FjRGTy"],
+        ["song b", "https://open.spotify.com/track/11dFghVXANMlKmJXsNCbNl"],
+        ["https://www.youtube.com/playlist?list=PL123"],
+    ]
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_processing.MULTI_QUERY_CONCURRENCY", 2)
+@patch("disk0muzik.utils.song_processing.process_song_query", new_callable=AsyncMock)
+async def test_process_song_queries_keeps_order(mock_process_song_query):
+    active = []
+    peak = []
+
+    async def process(query, requester, requester_id):
+        active.append(query)
+        peak.append(len(active))
+        # The first query is the slowest; results must still come back in order.
+        await asyncio.sleep(0.02 if query == "song a" else 0.001)
+        active.remove(query)
+        if query == "missing":
+            return None
+        return QueueEntry(
+            song=Song(spotify_id=query, title=query, artist="Test Artist"),
+            requester=requester,
+            requester_id=requester_id,
+        )
+
+    mock_process_song_query.side_effect = process
+
+    results = await process_song_queries(["song a", "song b", "missing", "song c"], "test_user", 42)
+
+    assert [entry.song.title if entry else None for entry in results] == [
+        "song a",
+        "song b",
+        None,
+        "song c",
+    ]
+    assert max(peak) == 2
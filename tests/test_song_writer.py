@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from disk0muzik.state.song import Song
+from disk0muzik.utils.song_writer import SongWriter
+
+
+def make_song(spotify_id, youtube_url="https://youtube.com/test"):
+    return Song(
+        spotify_id=spotify_id,
+        title="Test Song",
+        artist="Test Artist",
+        thumbnail="https://image.url/test.jpg",
+        youtube_url=youtube_url,
+        requester="test_user",
+    )
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_writer.add_songs", new_callable=AsyncMock)
+async def test_enqueue_coalesces_and_flushes_batch(mock_add_songs):
+    mock_add_songs.return_value = 2
+    writer = SongWriter(batch_size=10, flush_interval=60)
+
+    writer.enqueue(make_song("1", "https://youtube.com/old"))
+    writer.enqueue(make_song("1", "https://youtube.com/new"))
+    writer.enqueue(make_song("2"), replace_url=True)
+    assert writer.stats()["queue_depth"] == 2
+    assert writer.pending("1").youtube_url == "https://youtube.com/new"
+
+    assert await writer.flush() == 2
+
+    fill_rows, replace_rows = mock_add_songs.call_args[0]
+    assert [row[0] for row in fill_rows] == ["1"]
+    assert fill_rows[0][4] == "https://youtube.com/new"
+    assert [row[0] for row in replace_rows] == ["2"]
+    assert writer.stats()["queue_depth"] == 0
+    assert writer.stats()["flushes"] == 1
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_writer.add_songs", new_callable=AsyncMock)
+async def test_repair_is_not_overwritten_by_plain_insert(mock_add_songs):
+    writer = SongWriter(batch_size=10, flush_interval=60)
+
+    writer.enqueue(make_song("1", "https://youtube.com/repaired"), replace_url=True)
+    writer.enqueue(make_song("1", "https://youtube.com/stale"))
+    await writer.flush()
+
+    fill_rows, replace_rows = mock_add_songs.call_args[0]
+    assert fill_rows == []
+    assert replace_rows[0][4] == "https://youtube.com/repaired"
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_writer.add_songs", new_callable=AsyncMock)
+async def test_batch_size_triggers_background_flush(mock_add_songs):
+    writer = SongWriter(batch_size=2, flush_interval=60)
+    writer.start()
+
+    writer.enqueue(make_song("1"))
+    writer.enqueue(make_song("2"))
+    await asyncio.sleep(0.05)
+
+    mock_add_songs.assert_awaited_once()
+    await writer.close()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.song_writer.add_songs", new_callable=AsyncMock)
+async def test_failed_flush_is_retried_on_close(mock_add_songs):
+    mock_add_songs.side_effect = [RuntimeError("database down"), 1]
+    writer = SongWriter(batch_size=10, flush_interval=60)
+    writer.start()
+
+    writer.enqueue(make_song("1"))
+    assert await writer.flush() == 0
+    assert writer.stats()["failures"] == 1
+    assert writer.stats()["queue_depth"] == 1
+
+    await writer.close()
+
+    assert mock_add_songs.await_count == 2
+    assert writer.stats()["queue_depth"] == 0
+
+
+def test_songs_without_spotify_id_are_not_stored():
+    writer = SongWriter(batch_size=10, flush_interval=60)
+
+    writer.enqueue(make_song(""))
+
+    assert writer.stats()["queue_depth"] == 0
@@ -1,24 +1,113 @@
+import asyncio
 import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 from unittest.mock import patch
-from disk0muzik.utils.spotify_helper import search_spotify
-
-
-@patch("disk0muzik.utils.spotify_helper.sp.search")
-def test_search_spotify(mock_spotify_search):
-    mock_spotify_search.return_value = {
-        "tracks": {
-            "items": [
-                {
-                    "name": "Test Song",
-                    "artists": [{"name": "Test Artist"}],
-                    "album": {"images": [{"url": "https://image.url/test.jpg"}]},
-                    "id": "123",
-                }
-            ]
-        }
-    }
-
-    result = search_spotify("Test Song")
+from disk0muzik.utils.spotify_helper import (
+    SpotifyClient,
+    iter_spotify_collection,
+    parse_spotify_url,
+    search_spotify,
+)
+from disk0muzik.utils.negative_cache import NegativeCache
+from disk0muzik.utils.upstream import Upstream
+
+TRACK = {
+    "name": "Test Song",
+    "artists": [{"name": "Test Artist"}],
+    "album": {"images": [{"url": "https://image.url/test.jpg"}]},
+    "id": "123",
+}
+
+
+class FakeSpotify:
+    """
+    A local stand-in for the Spotify token and search endpoints.
+    """
+
+    def __init__(self):
+        self.tokens_issued = 0
+        self.searches = 0
+        self.expires_in = 3600
+        self.reject_next = False
+        self.throttle_next = 0
+        self.items = [TRACK]
+        # Local files and removed tracks come back without a usable track.
+        self.playlist = [
+            {"track": dict(TRACK, id=f"track-{i}") if i % 60 else None} for i in range(250)
+        ]
+        self.track_batches = []
+
+    async def token(self, request):
+        form = await request.post()
+        assert form["grant_type"] == "client_credentials"
+        assert request.headers["Authorization"].startswith("Basic ")
+        self.tokens_issued += 1
+        return web.json_response(
+            {
+                "access_token": f"token-{self.tokens_issued}",
+                "token_type": "Bearer",
+                "expires_in": self.expires_in,
+            }
+        )
+
+    async def search(self, request):
+        if self.throttle_next:
+            self.throttle_next -= 1
+            return web.json_response({"error": "slow down"}, status=429, headers={"Retry-After": "0"})
+        if self.reject_next:
+            self.reject_next = False
+            return web.json_response({"error": "expired"}, status=401)
+        assert request.headers["Authorization"] == f"Bearer token-{self.tokens_issued}"
+        assert request.query["type"] == "track"
+        self.searches += 1
+        await asyncio.sleep(0.01)
+        return web.json_response({"tracks": {"items": self.items}})
+
+
+    async def tracks(self, request):
+        ids = request.query["ids"].split(",")
+        self.track_batches.append(len(ids))
+        return web.json_response({"tracks": [dict(TRACK, id=i) for i in ids]})
+
+    async def playlist_tracks(self, request):
+        offset = int(request.query["offset"])
+        limit = int(request.query["limit"])
+        items = self.playlist[offset : offset + limit]
+        more = offset + limit < len(self.playlist)
+        return web.json_response({"items": items, "next": "more" if more else None})
+
+
+@pytest_asyncio.fixture
+async def spotify():
+    fake = FakeSpotify()
+    app = web.Application()
+    app.router.add_post("/api/token", fake.token)
+    app.router.add_get("/v1/search", fake.search)
+    app.router.add_get("/v1/tracks", fake.tracks)
+    app.router.add_get("/v1/playlists/{playlist_id}/tracks", fake.playlist_tracks)
+    server = TestServer(app)
+    await server.start_server()
+    client = SpotifyClient(
+        client_id="id",
+        client_secret="secret",
+        api_url=str(server.make_url("/v1")),
+        token_url=str(server.make_url("/api/token")),
+        max_concurrency=2,
+        upstream=Upstream("spotify", rate=1000, burst=1000, backoff_base=0.001),
+    )
+    yield fake, client
+    await client.close()
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_search_spotify(spotify):
+    fake, client = spotify
+
+    with patch("disk0muzik.utils.spotify_helper.get_spotify_client", return_value=client):
+        result = await search_spotify("Test Song")
 
     assert result["title"] == "Test Song"
     assert result["artist"] == "Test Artist"
@@ -26,10 +115,96 @@ def test_search_spotify(mock_spotify_search):
     assert result["spotify_id"] == "123"
 
 
-@patch("disk0muzik.utils.spotify_helper.sp.search")
-def test_search_spotify_no_results(mock_spotify_search):
-    mock_spotify_search.return_value = {"tracks": {"items": []}}
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.spotify_helper.get_negative_cache")
+async def test_search_spotify_no_results(mock_get_negative_cache, spotify):
+    fake, client = spotify
+    fake.items = []
+    mock_get_negative_cache.return_value = NegativeCache()
+
+    with patch("disk0muzik.utils.spotify_helper.get_spotify_client", return_value=client):
+        assert await search_spotify("Non-existent Song") is None
+        # The repeat, in any spelling, is answered without asking Spotify.
+        assert await search_spotify("non-existent  song!") is None
+
+    assert fake.searches == 1
+    assert mock_get_negative_cache.return_value.stats()["no_match_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_token_is_fetched_once_for_concurrent_requests(spotify):
+    fake, client = spotify
+
+    results = await asyncio.gather(*(client.search_track(f"song {i}") for i in range(10)))
+
+    assert all(result["id"] == "123" for result in results)
+    assert fake.tokens_issued == 1
+    assert fake.searches == 10
+    assert client.stats()["token_refreshes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_token_is_refreshed_before_expiry(spotify):
+    fake, client = spotify
+    # Tokens that expire within the refresh margin are never reused.
+    fake.expires_in = 30
+
+    await client.search_track("first")
+    await client.search_track("second")
+
+    assert fake.tokens_issued == 2
+
+
+@pytest.mark.asyncio
+async def test_rejected_token_is_replaced(spotify):
+    fake, client = spotify
+    await client.search_track("first")
+    fake.reject_next = True
+
+    assert (await client.search_track("second"))["id"] == "123"
+    assert fake.tokens_issued == 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_request_is_retried(spotify):
+    fake, client = spotify
+    fake.throttle_next = 2
+
+    assert (await client.search_track("song"))["id"] == "123"
+    stats = client.upstream.stats()
+    assert stats["throttled"] == 2
+    assert stats["retries"] == 2
+
+
+def test_parse_spotify_url():
+    assert parse_spotify_url("https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M?si=abc") == (
+        "playlist",
+        "37i9dQZF1DXcBWIGoYBM5M",
+    )
+    assert parse_spotify_url("https://open.spotify.com/intl-de/album/4aawyAB9vmqN3uQ7FjRGTy") == (
+        "album",
+        "4aawyAB9vmqN3uQ7FjRGTy",
+    )
+    assert parse_spotify_url("spotify:track:11dFghVXANMlKmJXsNCbNl") == ("track", "11dFghVXANMlKmJXsNCbNl")
+    assert parse_spotify_url("back in black") is None
+
+
+@pytest.mark.asyncio
+async def test_get_tracks_is_batched(spotify):
+    fake, client = spotify
+
+    tracks = await client.get_tracks([f"id-{i}" for i in range(120)])
+
+    assert [track["id"] for track in tracks] == [f"id-{i}" for i in range(120)]
+    assert fake.track_batches == [50, 50, 20]
+
+
+@pytest.mark.asyncio
+async def test_iter_spotify_collection_pages_through_playlist(spotify):
+    fake, client = spotify
 
-    result = search_spotify("Non-existent Song")
+    with patch("disk0muzik.utils.spotify_helper.get_spotify_client", return_value=client):
+        tracks = [track async for track in iter_spotify_collection("playlist", "abc")]
 
-    assert result is None
+    assert [track["spotify_id"] for track in tracks] == [f"track-{i}" for i in range(250) if i % 60]
+    assert client.stats()["requests"] == 3
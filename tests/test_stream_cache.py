@@ -0,0 +1,111 @@
+import time
+import pytest
+from unittest.mock import patch, AsyncMock
+from disk0muzik.utils.negative_cache import NegativeCache
+from disk0muzik.utils.upstream import CircuitOpenError
+from disk0muzik.utils.stream_cache import (
+    StreamCache,
+    get_stream_expiry,
+    get_stream_info,
+    get_video_id,
+)
+
+
+def make_info(video_id, expire):
+    return {
+        "video_url": f"https://www.youtube.com/watch?v={video_id}",
+        "audio_url": f"https://rr1.googlevideo.com/videoplayback?expire={int(expire)}&id=x",
+        "title": "Test Video",
+        "thumbnail": None,
+    }
+
+
+def test_get_video_id():
+    assert get_video_id("https://www.youtube.com/watch?v=abcdefghijk&t=10") == "abcdefghijk"
+    assert get_video_id("https://youtu.be/abcdefghijk?si=xyz") == "abcdefghijk"
+    assert get_video_id("https://music.youtube.com/watch?v=abcdefghijk") == "abcdefghijk"
+    assert get_video_id("https://www.youtube.com/shorts/abcdefghijk") == "abcdefghijk"
+    assert get_video_id("https://www.youtube.com/playlist?list=PL123") is None
+    assert get_video_id("never gonna give you up") is None
+
+
+def test_get_stream_expiry():
+    assert get_stream_expiry("https://x.googlevideo.com/videoplayback?expire=1700000000") == 1700000000
+    assert get_stream_expiry("https://x.googlevideo.com/api/manifest/expire/1700000000/ei/x") == 1700000000
+    assert get_stream_expiry("https://example.com/audio.webm") is None
+
+
+def test_cache_honours_expiry_margin():
+    cache = StreamCache(margin=60)
+    cache.put("fresh", make_info("fresh", time.time() + 3600))
+    cache.put("stale", make_info("stale", time.time() + 30))
+
+    assert cache.get("fresh")["title"] == "Test Video"
+    assert cache.get("stale") is None
+    # Still valid, so it can be served as a last resort.
+    assert cache.get("stale", margin=0)["title"] == "Test Video"
+
+    cache.put("gone", make_info("gone", time.time() - 1))
+    assert cache.get("gone", margin=0) is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_cache_is_bounded():
+    cache = StreamCache(max_size=2)
+    expire = time.time() + 3600
+    for video_id in ("a", "b", "c"):
+        cache.put(video_id, make_info(video_id, expire))
+
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.stream_cache.get_stream_cache")
+@patch("disk0muzik.utils.stream_cache.get_extraction_service")
+async def test_get_stream_info_reuses_extraction(mock_get_extraction_service, mock_get_stream_cache):
+    mock_get_stream_cache.return_value = StreamCache()
+    mock_extract = mock_get_extraction_service.return_value.extract = AsyncMock(
+        return_value=make_info("abcdefghijk", time.time() + 3600)
+    )
+    url = "https://www.youtube.com/watch?v=abcdefghijk"
+
+    first = await get_stream_info(url)
+    second = await get_stream_info(url)
+
+    assert first is second
+    mock_extract.assert_awaited_once_with(url)
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.stream_cache.get_negative_cache")
+@patch("disk0muzik.utils.stream_cache.get_upstream")
+@patch("disk0muzik.utils.stream_cache.get_stream_cache")
+async def test_get_stream_info_serves_stale_url_while_youtube_is_down(
+    mock_get_stream_cache, mock_get_upstream, mock_get_negative_cache
+):
+    mock_get_negative_cache.return_value = NegativeCache()
+    cache = StreamCache(margin=60)
+    cache.put("abcdefghijk", make_info("abcdefghijk", time.time() + 30))
+    mock_get_stream_cache.return_value = cache
+    mock_get_upstream.return_value.call = AsyncMock(side_effect=CircuitOpenError("open"))
+
+    url = "https://www.youtube.com/watch?v=abcdefghijk"
+    assert (await get_stream_info(url))["title"] == "Test Video"
+    # The failure is remembered, so the retry does not wait on YouTube again.
+    assert (await get_stream_info(url))["title"] == "Test Video"
+    mock_get_upstream.return_value.call.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch("disk0muzik.utils.stream_cache.get_negative_cache")
+@patch("disk0muzik.utils.stream_cache.get_extraction_service")
+async def test_get_stream_info_remembers_no_match(mock_get_extraction_service, mock_get_negative_cache):
+    mock_get_negative_cache.return_value = NegativeCache()
+    mock_extract = mock_get_extraction_service.return_value.extract = AsyncMock(return_value=None)
+
+    assert await get_stream_info("no such song") is None
+    assert await get_stream_info("No such song!") is None
+
+    mock_extract.assert_awaited_once()
@@ -0,0 +1,196 @@
+import asyncio
+import time
+import pytest
+from disk0muzik.utils.upstream import (
+    CircuitBreaker,
+    CircuitOpenError,
+    TokenBucket,
+    Upstream,
+    UpstreamThrottled,
+    UpstreamUnavailable,
+)
+
+
+def make_upstream(**kwargs):
+    options = dict(
+        rate=1000,
+        burst=1000,
+        max_retries=2,
+        backoff_base=0.001,
+        backoff_max=0.01,
+        failure_threshold=3,
+        reset_timeout=0.05,
+    )
+    options.update(kwargs)
+    return Upstream("test", **options)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=100, burst=2)
+    started = time.monotonic()
+
+    for _ in range(4):
+        await bucket.acquire()
+
+    # Two tokens come from the burst, the other two take 10ms each.
+    assert time.monotonic() - started >= 0.015
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_pause():
+    bucket = TokenBucket(rate=1000, burst=10)
+    bucket.pause(0.05)
+    started = time.monotonic()
+
+    await bucket.acquire()
+
+    assert time.monotonic() - started >= 0.04
+
+
+def test_circuit_breaker_opens_and_probes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Only one probe is let through once the reset timeout passed.
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.trips == 1
+
+
+@pytest.mark.asyncio
+async def test_call_retries_transient_errors():
+    upstream = make_upstream()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise UpstreamUnavailable("temporarily down")
+        return "ok"
+
+    assert await upstream.call(flaky) == "ok"
+    assert len(attempts) == 3
+    assert upstream.stats()["retries"] == 2
+    assert upstream.stats()["state"] == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_call_does_not_retry_other_errors():
+    upstream = make_upstream(max_retries=0)
+    attempts = []
+
+    async def down():
+        raise UpstreamUnavailable("down")
+
+    async def broken():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(UpstreamUnavailable):
+        await upstream.call(down)
+    with pytest.raises(ValueError):
+        await upstream.call(broken)
+    assert len(attempts) == 1
+    # Neither a failure nor a success as far as the breaker is concerned.
+    assert upstream.stats()["consecutive_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_call_honours_retry_after():
+    upstream = make_upstream()
+    attempts = []
+
+    async def throttled():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise UpstreamThrottled("slow down", retry_after=0.05)
+        return "ok"
+
+    assert await upstream.call(throttled) == "ok"
+    assert attempts[1] - attempts[0] >= 0.04
+    assert upstream.stats()["throttled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast():
+    upstream = make_upstream(max_retries=0, failure_threshold=2, reset_timeout=10)
+    attempts = []
+
+    async def down():
+        attempts.append(1)
+        raise UpstreamUnavailable("down")
+
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailable):
+            await upstream.call(down)
+    with pytest.raises(CircuitOpenError):
+        await upstream.call(down)
+
+    assert len(attempts) == 2
+    stats = upstream.stats()
+    assert stats["state"] == CircuitBreaker.OPEN
+    assert stats["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_once_circuit_opens():
+    upstream = make_upstream(max_retries=10, failure_threshold=3, reset_timeout=10)
+    attempts = []
+
+    async def down():
+        attempts.append(1)
+        raise UpstreamUnavailable("down")
+
+    with pytest.raises(UpstreamUnavailable):
+        await upstream.call(down)
+    assert len(attempts) == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_breaker():
+    upstream = make_upstream(max_retries=0, failure_threshold=1, reset_timeout=0)
+
+    async def down():
+        raise UpstreamUnavailable("down")
+
+    with pytest.raises(UpstreamUnavailable):
+        await upstream.call(down)
+
+    probe = asyncio.create_task(upstream.call(lambda: asyncio.sleep(10)))
+    await asyncio.sleep(0.01)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert await upstream.call(lambda: asyncio.sleep(0, result="ok")) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_probe_cancelled_while_waiting_for_a_token_releases_breaker():
+    upstream = make_upstream(max_retries=0, failure_threshold=1, reset_timeout=0)
+
+    async def down():
+        raise UpstreamUnavailable("down")
+
+    with pytest.raises(UpstreamUnavailable):
+        await upstream.call(down)
+
+    upstream.bucket.pause(10)
+    probe = asyncio.create_task(upstream.call(lambda: asyncio.sleep(0, result="ok")))
+    await asyncio.sleep(0.01)
+    assert upstream.stats()["state"] == CircuitBreaker.HALF_OPEN
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    upstream.bucket = TokenBucket(rate=1000, burst=1000)
+    assert await upstream.call(lambda: asyncio.sleep(0, result="ok")) == "ok"
+    assert upstream.stats()["state"] == CircuitBreaker.CLOSED
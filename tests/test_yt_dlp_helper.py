@@ -1,6 +1,10 @@
 import pytest
 from unittest.mock import patch
-from disk0muzik.utils.yt_dlp_helper import extract_youtube_info
+from disk0muzik.utils.yt_dlp_helper import (
+    extract_youtube_info,
+    extract_youtube_playlist,
+    is_youtube_playlist,
+)
 
 
 @patch("disk0muzik.utils.yt_dlp_helper.yt_dlp.YoutubeDL.extract_info")
@@ -27,3 +31,41 @@ def test_extract_youtube_info_no_results(mock_extract_info):
     result = extract_youtube_info("Invalid Query")
 
     assert result is None
+
+
+def test_is_youtube_playlist():
+    assert is_youtube_playlist("https://www.youtube.com/playlist?list=PL1234")
+    assert is_youtube_playlist("https://www.youtube.com/watch?v=abcdefghijk&list=RDabcdefghijk")
+    assert not is_youtube_playlist("https://www.youtube.com/watch?v=abcdefghijk")
+    assert not is_youtube_playlist("https://example.com/?list=PL1234")
+
+
+@patch("disk0muzik.utils.yt_dlp_helper.yt_dlp.YoutubeDL.extract_info")
+def test_extract_youtube_playlist(mock_extract_info):
+    mock_extract_info.return_value = {
+        "entries": [
+            {"id": "abcdefghijk", "title": "First", "channel": "Test Channel"},
+            {"id": "bcdefghijkl", "title": "[Deleted video]"},
+            {"id": "cdefghijklm", "title": "Third", "uploader": "Uploader"},
+        ]
+    }
+
+    result = extract_youtube_playlist("https://www.youtube.com/playlist?list=PL1234")
+
+    assert result == [
+        {
+            "video_url": "https://www.youtube.com/watch?v=abcdefghijk",
+            "title": "First",
+            "artist": "Test Channel",
+            "thumbnail": "https://i.ytimg.com/vi/abcdefghijk/hqdefault.jpg",
+        },
+        {
+            "video_url": "https://www.youtube.com/watch?v=cdefghijklm",
+            "title": "Third",
+            "artist": "Uploader",
+            "thumbnail": "https://i.ytimg.com/vi/cdefghijklm/hqdefault.jpg",
+        },
+    ]
+    mock_extract_info.assert_called_once_with(
+        "https://www.youtube.com/playlist?list=PL1234", download=False
+    )